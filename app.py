@@ -13,23 +13,136 @@
 """
 
 import os
+import re
+import gzip
+import html
 import json
+import queue
+import atexit
+import base64
+import hashlib
 import secrets
 import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import Flask, request, jsonify, session, redirect, Response
+from flask import Flask, request, jsonify, session, redirect, Response, g
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import validates
+from sqlalchemy.pool import QueuePool
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 
+# Vor den lokalen Modulen laden - sie lesen ihre Konfiguration beim Import
 load_dotenv()
 
+from gdpr_compliance import register_gdpr_blueprints, with_cookie_banner
+from login_guard import LoginGuard, PasswordHashPolicy
+from whatsapp_webhook import (register_whatsapp_webhook, attach_conversation_log, attach_flow_recorder,
+                              inbound_queue, deduplicator, outbound, conversation_sessions, webhook_metrics)
+from http_client import http_client
+from inbound_queue import InboundQueueConfig, SQLiteFile
+from whatsapp_setup import template_registry
+from phone_numbers import normalize_phone
+from voice_agent import (register_voice_blueprint, attach_caller_lookup, attach_call_log, agent_registry,
+                         caller_directory)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('WestMoneyOS')
 
+# =============================================================================
+# DATABASE ENGINE
+# =============================================================================
+class PoolMetrics:
+    """Wartezeiten beim Auschecken einer DB-Verbindung aus dem Pool"""
+
+    SLOW_MS = float(os.getenv('DB_POOL_SLOW_CHECKOUT_MS', '50'))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.timeouts = 0
+
+    def observe(self, wait_ms, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if wait_ms >= self.SLOW_MS:
+                self.slow_checkouts += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts, 'slow_checkouts': self.slow_checkouts, 'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3)
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_metrics.observe(0, timed_out=True)
+            raise
+        pool_metrics.observe((time.perf_counter() - start) * 1000)
+        return conn
+
+
+def engine_options(uri):
+    if uri.startswith('sqlite'):
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        return {
+            'poolclass': MeteredQueuePool,
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        }
+    return {
+        'poolclass': MeteredQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+    }
+
+
+def apply_sqlite_pragmas(dbapi_conn, connection_record):
+    # Wie open_sqlite() in import_claude_to_westmoney.py: WAL lässt Leser parallel zum Schreiber zu
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode = WAL;")
+    cursor.execute("PRAGMA synchronous = NORMAL;")
+    cursor.execute(f"PRAGMA busy_timeout = {int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))};")
+    cursor.execute(f"PRAGMA mmap_size = {int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))};")
+    cursor.close()
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -37,6 +150,7 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', secrets.token_hex(32))
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///westmoney.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     WHATSAPP_TOKEN = os.getenv('WHATSAPP_TOKEN', '')
     WHATSAPP_PHONE_ID = os.getenv('WHATSAPP_PHONE_ID', '')
     STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
@@ -44,14 +158,29 @@ class Config:
     ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY', '')
     REVOLUT_API_KEY = os.getenv('REVOLUT_API_KEY', '')
     MOLLIE_API_KEY = os.getenv('MOLLIE_API_KEY', '')
+    # Anzahl vertrauenswürdiger Reverse Proxies vor der App. Standard 0: gunicorn ist direkt erreichbar,
+    # X-Forwarded-* kämen dann vom Client. Nur in der Installation hinter nginx auf 1 setzen.
+    TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
 
 config = Config()
 
 app = Flask(__name__)
 app.config.from_object(config)
+if config.TRUSTED_PROXY_HOPS:
+    # remote_addr = echte Client-IP (Login Guard, Security Events); nur so viele X-Forwarded-For-Einträge wie Proxies
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.TRUSTED_PROXY_HOPS, x_proto=config.TRUSTED_PROXY_HOPS,
+                            x_host=config.TRUSTED_PROXY_HOPS)
 app.permanent_session_lifetime = timedelta(days=30)
 CORS(app, supports_credentials=True)
 db = SQLAlchemy(app)
+migrate = Migrate(app, db)
+with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        event.listen(db.engine, 'connect', apply_sqlite_pragmas)
+register_gdpr_blueprints(app)
+register_whatsapp_webhook(app)
+login_guard = LoginGuard()
+password_policy = PasswordHashPolicy()
 
 # =============================================================================
 # DATABASE MODELS
@@ -71,12 +200,14 @@ class User(db.Model):
     tokens_tower = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    # Version für UserCache: jede Änderung (Rolle, Plan, ...) in irgendeinem Worker setzt sie neu
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_policy.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_policy.verify(self.password_hash, password)
     
     def to_dict(self):
         return {
@@ -87,10 +218,18 @@ class User(db.Model):
 
 class Contact(db.Model):
     __tablename__ = 'contacts'
+    __table_args__ = (
+        db.Index('ix_contacts_created_at_id', 'created_at', 'id'),
+        db.Index('ix_contacts_whatsapp_consent', 'whatsapp_consent'),
+        db.Index('ix_contacts_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('uq_contacts_phone_normalized', 'phone_normalized', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     email = db.Column(db.String(120))
     phone = db.Column(db.String(50))
+    # E.164-Form von phone, gepflegt über _normalize_phone (Suche, Unique-Index)
+    phone_normalized = db.Column(db.String(20))
     company = db.Column(db.String(120))
     whatsapp_consent = db.Column(db.Boolean, default=False)
     tags = db.Column(db.Text)
@@ -99,6 +238,11 @@ class Contact(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_normalized = normalize_phone(phone)
+        return phone
+    
     def to_dict(self):
         return {'id': self.id, 'name': self.name, 'email': self.email, 'phone': self.phone, 
                 'company': self.company, 'whatsapp_consent': self.whatsapp_consent,
@@ -106,6 +250,12 @@ class Contact(db.Model):
 
 class Lead(db.Model):
     __tablename__ = 'leads'
+    __table_args__ = (
+        db.Index('ix_leads_created_at_id', 'created_at', 'id'),
+        db.Index('ix_leads_status_created_at', 'status', 'created_at'),
+        db.Index('ix_leads_contact_id', 'contact_id'),
+        db.Index('ix_leads_assigned_to_status', 'assigned_to', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     contact_id = db.Column(db.Integer, db.ForeignKey('contacts.id'))
@@ -127,12 +277,34 @@ class Campaign(db.Model):
     status = db.Column(db.String(50), default='draft')
     sent_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Versand-Lease: nur ein Worker speist die Empfänger ein
+    lease_owner = db.Column(db.String(64))
+    lease_until = db.Column(db.DateTime)
     
     def to_dict(self):
         return {'id': self.id, 'name': self.name, 'type': self.type, 'status': self.status, 'sent_count': self.sent_count}
 
+class CampaignRecipient(db.Model):
+    __tablename__ = 'campaign_recipients'
+    __table_args__ = (
+        db.UniqueConstraint('campaign_id', 'contact_id', name='uq_campaign_recipients_campaign_contact'),
+        db.Index('ix_campaign_recipients_campaign_id_status_id', 'campaign_id', 'status', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), nullable=False)
+    contact_id = db.Column(db.Integer, db.ForeignKey('contacts.id'), nullable=False)
+    phone = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='pending')
+    wa_message_id = db.Column(db.String(128))
+    error = db.Column(db.String(300))
+    sent_at = db.Column(db.DateTime)
+
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_status_created_at', 'status', 'created_at'),
+        db.Index('ix_tasks_assigned_to_status', 'assigned_to', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -160,18 +332,37 @@ class Invoice(db.Model):
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_contact_id_timestamp', 'contact_id', 'timestamp'),
+        db.Index('uq_messages_wa_message_id', 'wa_message_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     contact_id = db.Column(db.Integer, db.ForeignKey('contacts.id'))
     direction = db.Column(db.String(20))
     content = db.Column(db.Text)
     status = db.Column(db.String(50))
+    wa_message_id = db.Column(db.String(128))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
         return {'id': self.id, 'direction': self.direction, 'content': self.content, 'status': self.status}
 
+class PendingStatus(db.Model):
+    """Status-Updates, deren Nachricht (noch) nicht in messages steht"""
+    __tablename__ = 'pending_statuses'
+    __table_args__ = (
+        db.Index('ix_pending_statuses_received_at', 'received_at'),
+    )
+    wa_message_id = db.Column(db.String(128), primary_key=True)
+    status = db.Column(db.String(50), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_read', 'user_id', 'read'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     title = db.Column(db.String(200))
@@ -184,6 +375,11 @@ class Notification(db.Model):
 
 class SecurityEvent(db.Model):
     __tablename__ = 'security_events'
+    __table_args__ = (
+        db.Index('ix_security_events_timestamp', 'timestamp'),
+        db.Index('ix_security_events_event_type_timestamp', 'event_type', 'timestamp'),
+        db.Index('ix_security_events_ip_address_timestamp', 'ip_address', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     event_type = db.Column(db.String(50))
     severity = db.Column(db.String(20))
@@ -191,13 +387,600 @@ class SecurityEvent(db.Model):
     ip_address = db.Column(db.String(50))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+class VoiceAgent(db.Model):
+    __tablename__ = 'voice_agents'
+    id = db.Column(db.Integer, primary_key=True)
+    agent_type = db.Column(db.String(50), unique=True, nullable=False)
+    agent_id = db.Column(db.String(100))
+    name = db.Column(db.String(100))
+    status = db.Column(db.String(20), default='creating')  # creating, active
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CallEvent(db.Model):
+    __tablename__ = 'call_events'
+    __table_args__ = (
+        # Twilio wiederholt Status-Callbacks: pro Anruf und Status nur ein Event
+        db.Index('uq_call_events_call_sid_status', 'call_sid', 'status', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    call_sid = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    agent_type = db.Column(db.String(50))
+    direction = db.Column(db.String(20))
+    from_number = db.Column(db.String(20))
+    to_number = db.Column(db.String(20))
+    duration = db.Column(db.Integer)
+    contact_id = db.Column(db.Integer, db.ForeignKey('contacts.id'))
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Call(db.Model):
+    __tablename__ = 'calls'
+    __table_args__ = (
+        db.Index('ix_calls_started_at', 'started_at'),
+        db.Index('ix_calls_contact_id_started_at', 'contact_id', 'started_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    call_sid = db.Column(db.String(64), unique=True, nullable=False)
+    direction = db.Column(db.String(20))
+    from_number = db.Column(db.String(20))
+    to_number = db.Column(db.String(20))
+    agent_type = db.Column(db.String(50))
+    contact_id = db.Column(db.Integer, db.ForeignKey('contacts.id'))
+    status = db.Column(db.String(20))
+    answered = db.Column(db.Boolean, default=False)
+    duration = db.Column(db.Integer)
+    started_at = db.Column(db.DateTime)
+    ended_at = db.Column(db.DateTime)
+    # Schon in call_stats_daily gezählt
+    counted = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {'sid': self.call_sid, 'status': self.status, 'direction': self.direction,
+                'from': self.from_number, 'to': self.to_number, 'agent_type': self.agent_type,
+                'contact_id': self.contact_id, 'answered': self.answered, 'duration': self.duration,
+                'start_time': self.started_at.isoformat() if self.started_at else None,
+                'end_time': self.ended_at.isoformat() if self.ended_at else None}
+
+class CallStatsDaily(db.Model):
+    __tablename__ = 'call_stats_daily'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'agent_type', name='uq_call_stats_daily_day_agent_type'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    agent_type = db.Column(db.String(50), nullable=False)
+    calls = db.Column(db.Integer, default=0)
+    answered = db.Column(db.Integer, default=0)
+    duration_total = db.Column(db.Integer, default=0)
+
+# =============================================================================
+# SECURITY EVENT SINK
+# =============================================================================
+class BatchWriter:
+    """Puffert Zeilen und schreibt sie gebündelt aus einem Hintergrund-Thread"""
+
+    THREAD_NAME = 'batch-writer'
+
+    def __init__(self, app, max_queue=10000, batch_size=200, flush_interval=0.5):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self.metrics = {'enqueued': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'failures': 0, 'max_depth': 0}
+
+    def emit(self, **row):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.metrics['dropped'] += 1
+            return False
+        self.metrics['enqueued'] += 1
+        self.metrics['max_depth'] = max(self.metrics['max_depth'], self._queue.qsize())
+        return True
+
+    def stats(self):
+        return {**self.metrics, 'depth': self._queue.qsize(), 'capacity': self._queue.maxsize}
+
+    def _ensure_worker(self):
+        # Nach einem fork() läuft der Thread des Elternprozesses nicht mit
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=self.THREAD_NAME, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            engine = db.engine
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._write(engine, batch)
+
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, engine, batch):
+        try:
+            self.write_batch(engine, batch)
+            self.metrics['written'] += len(batch)
+            self.metrics['batches'] += 1
+        except Exception as e:
+            self.metrics['failures'] += 1
+            self.metrics['dropped'] += len(batch)
+            logger.error(f"{type(self).__name__} batch write failed ({len(batch)} rows): {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def write_batch(self, engine, batch):
+        raise NotImplementedError
+
+    def flush(self, timeout=5.0):
+        """Wartet, bis alle gepufferten Events geschrieben sind"""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def shutdown(self, timeout=5.0):
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+class SecurityEventSink(BatchWriter):
+    """SecurityEvents gebündelt per executemany-INSERT"""
+
+    THREAD_NAME = 'security-event-sink'
+
+    def write_batch(self, engine, batch):
+        with engine.begin() as conn:
+            conn.execute(db.insert(SecurityEvent), batch)
+
+
+security_events = SecurityEventSink(
+    app,
+    max_queue=int(os.getenv('SECURITY_EVENT_QUEUE_SIZE', '10000')),
+    batch_size=int(os.getenv('SECURITY_EVENT_BATCH_SIZE', '200')),
+    flush_interval=float(os.getenv('SECURITY_EVENT_FLUSH_MS', '500')) / 1000
+)
+atexit.register(security_events.shutdown)
+
+# =============================================================================
+# CONVERSATION LOG
+# =============================================================================
+def dialect_insert(conn, model):
+    """INSERT mit ON CONFLICT (SQLite/PostgreSQL); None bei anderen Datenbanken"""
+    if conn.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    if conn.dialect.name == 'sqlite':
+        return sqlite.insert(model)
+    return None
+
+
+class ContactDirectory:
+    """LRU normalisierte Telefonnummer -> contact_id; Fehlgriffe gebündelt per IN-Abfrage"""
+
+    IN_CHUNK = 500
+
+    def __init__(self, max_size=10000, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'created': 0}
+
+    def _get(self, phone):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(phone)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(phone)
+                return entry[0]
+        return None
+
+    def _put(self, phone, contact_id):
+        with self._lock:
+            self._entries[phone] = (contact_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(phone)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, conn, phones):
+        found = {}
+        for i in range(0, len(phones), self.IN_CHUNK):
+            rows = conn.execute(db.select(Contact.phone_normalized, Contact.id)
+                                .where(Contact.phone_normalized.in_(phones[i:i + self.IN_CHUNK])))
+            found.update(rows.all())
+        return found
+
+    def resolve_many(self, engine, wanted):
+        """{phone_normalized: Profilname} -> {phone_normalized: contact_id}; legt Unbekannte an"""
+        resolved, missing = {}, []
+        for phone in wanted:
+            contact_id = self._get(phone)
+            if contact_id is None:
+                missing.append(phone)
+            else:
+                resolved[phone] = contact_id
+        self.metrics['hits'] += len(resolved)
+        self.metrics['misses'] += len(missing)
+        if not missing:
+            return resolved
+
+        with engine.connect() as conn:
+            found = self._lookup(conn, missing)
+        new = [phone for phone in missing if phone not in found]
+        if new:
+            rows = [{'name': wanted[phone] or phone, 'phone': phone, 'phone_normalized': phone,
+                     'source': 'whatsapp', 'created_at': datetime.utcnow()} for phone in new]
+            try:
+                with engine.begin() as conn:
+                    conn.execute(db.insert(Contact), rows)
+            except IntegrityError:
+                # Ein anderer Worker war schneller - einzeln anlegen, Konflikte überspringen
+                for row in rows:
+                    try:
+                        with engine.begin() as conn:
+                            conn.execute(db.insert(Contact), [row])
+                    except IntegrityError:
+                        pass
+            self.metrics['created'] += len(new)
+            with engine.connect() as conn:
+                found.update(self._lookup(conn, new))
+        for phone, contact_id in found.items():
+            self._put(phone, contact_id)
+        resolved.update(found)
+        return resolved
+
+
+class ConversationLog(BatchWriter):
+    """WhatsApp-Nachrichten und Zustellstatus gebündelt in Message schreiben
+
+    Ein Status, dessen Nachricht noch nicht gespeichert ist (Status-Webhook vor
+    dem eigenen Insert oder aus einem anderen Worker), wird in pending_statuses
+    geparkt und angewendet, sobald die Nachricht existiert. Als gesehen markiert
+    der Deduplicator einen Status erst nach dem Commit.
+    """
+
+    THREAD_NAME = 'conversation-log'
+    # Status nur vorwärts setzen: ein spätes 'delivered' überschreibt kein 'read'
+    STATUS_RANK = {'received': 0, 'sent': 1, 'delivered': 2, 'read': 3, 'failed': 4}
+    IN_CHUNK = 500
+    # Geparkte Status ohne Nachricht (z.B. außerhalb des CRM gesendet) werden irgendwann verworfen
+    PENDING_STATUS_TTL = timedelta(days=7)
+
+    def __init__(self, app, contacts, deduplicator=None, **kwargs):
+        super().__init__(app, **kwargs)
+        self.contacts = contacts
+        self.deduplicator = deduplicator
+        self.metrics.update(statuses_parked=0, statuses_unparked=0)
+
+    @staticmethod
+    def _timestamp(value):
+        try:
+            return datetime.utcfromtimestamp(int(value))
+        except (TypeError, ValueError):
+            return datetime.utcnow()
+
+    def inbound(self, phone, name, text, wa_message_id, timestamp=None):
+        return self.emit(kind='inbound', phone=normalize_phone(phone), name=name, text=text,
+                         wa_message_id=wa_message_id, status='received', timestamp=self._timestamp(timestamp))
+
+    def outbound(self, phone, text, wa_message_id, status='sent'):
+        return self.emit(kind='outbound', phone=normalize_phone(phone), name=None, text=text,
+                         wa_message_id=wa_message_id, status=status, timestamp=datetime.utcnow())
+
+    def status(self, wa_message_id, status, seen_key=None):
+        # None: nicht protokolliert (unbekannter Status), False: Puffer voll
+        if not wa_message_id or status not in self.STATUS_RANK:
+            return None
+        return self.emit(kind='status', wa_message_id=wa_message_id, status=status, seen_key=seen_key)
+
+    def _apply_statuses(self, conn, statuses):
+        """Ein UPDATE pro Zielstatus statt einer Abfrage pro Status-Event"""
+        by_status = {}
+        for wa_message_id, status in statuses.items():
+            by_status.setdefault(status, []).append(wa_message_id)
+        for status, ids in by_status.items():
+            lower = [s for s, rank in self.STATUS_RANK.items() if rank < self.STATUS_RANK[status]]
+            for i in range(0, len(ids), self.IN_CHUNK):
+                conn.execute(db.update(Message)
+                             .where(Message.wa_message_id.in_(ids[i:i + self.IN_CHUNK]),
+                                    db.or_(Message.status.is_(None), Message.status.in_(lower)))
+                             .values(status=status))
+
+    def _park(self, conn, statuses):
+        now = datetime.utcnow()
+        rows = [{'wa_message_id': wa_message_id, 'status': status, 'rank': self.STATUS_RANK[status], 'received_at': now}
+                for wa_message_id, status in statuses.items()]
+        insert = dialect_insert(conn, PendingStatus)
+        if insert is not None:
+            conn.execute(insert.on_conflict_do_update(
+                index_elements=['wa_message_id'],
+                set_={'status': insert.excluded.status, 'rank': insert.excluded.rank},
+                where=PendingStatus.rank < insert.excluded.rank), rows)
+        else:
+            for row in rows:
+                updated = conn.execute(db.update(PendingStatus).where(
+                    PendingStatus.wa_message_id == row['wa_message_id'], PendingStatus.rank < row['rank']
+                ).values(status=row['status'], rank=row['rank'])).rowcount
+                if not updated and not conn.execute(db.select(PendingStatus.rank).where(
+                        PendingStatus.wa_message_id == row['wa_message_id'])).first():
+                    conn.execute(db.insert(PendingStatus), [row])
+        self.metrics['statuses_parked'] += len(rows)
+
+    def _unpark(self, conn):
+        """Geparkte Status anwenden, deren Nachricht inzwischen existiert (auch aus anderen Workern)"""
+        parked = dict(conn.execute(
+            db.select(PendingStatus.wa_message_id, PendingStatus.status)
+            .join(Message, Message.wa_message_id == PendingStatus.wa_message_id)
+            .limit(self.IN_CHUNK * 2)).all())
+        if parked:
+            self._apply_statuses(conn, parked)
+            ids = list(parked)
+            for i in range(0, len(ids), self.IN_CHUNK):
+                conn.execute(db.delete(PendingStatus).where(PendingStatus.wa_message_id.in_(ids[i:i + self.IN_CHUNK])))
+            self.metrics['statuses_unparked'] += len(parked)
+        conn.execute(db.delete(PendingStatus).where(
+            PendingStatus.received_at < datetime.utcnow() - self.PENDING_STATUS_TTL))
+
+    def write_batch(self, engine, batch):
+        messages = [row for row in batch if row['kind'] != 'status']
+        statuses = {}
+        for row in batch:
+            if row['kind'] == 'status':
+                current = statuses.get(row['wa_message_id'])
+                if current is None or self.STATUS_RANK[row['status']] > self.STATUS_RANK[current]:
+                    statuses[row['wa_message_id']] = row['status']
+
+        contact_ids = {}
+        if messages:
+            wanted = {}
+            for row in messages:
+                if row['phone'] and not wanted.get(row['phone']):
+                    wanted[row['phone']] = row['name']
+            contact_ids = self.contacts.resolve_many(engine, wanted)
+
+        with engine.begin() as conn:
+            if messages:
+                wa_ids = [row['wa_message_id'] for row in messages if row['wa_message_id']]
+                existing = set()
+                for i in range(0, len(wa_ids), self.IN_CHUNK):
+                    existing.update(conn.execute(db.select(Message.wa_message_id).where(
+                        Message.wa_message_id.in_(wa_ids[i:i + self.IN_CHUNK]))).scalars())
+                rows = [{'contact_id': contact_ids.get(row['phone']), 'direction': row['kind'], 'content': row['text'],
+                         'status': row['status'], 'wa_message_id': row['wa_message_id'], 'timestamp': row['timestamp']}
+                        for row in messages if row['wa_message_id'] not in existing]
+                if rows:
+                    conn.execute(db.insert(Message), rows)
+
+            if statuses:
+                ids, known = list(statuses), set()
+                for i in range(0, len(ids), self.IN_CHUNK):
+                    known.update(conn.execute(db.select(Message.wa_message_id).where(
+                        Message.wa_message_id.in_(ids[i:i + self.IN_CHUNK]))).scalars())
+                self._apply_statuses(conn, {k: v for k, v in statuses.items() if k in known})
+                unknown = {k: v for k, v in statuses.items() if k not in known}
+                if unknown:
+                    self._park(conn, unknown)
+            self._unpark(conn)
+
+        if self.deduplicator is not None:
+            for row in batch:
+                if row.get('seen_key'):
+                    self.deduplicator.first_seen(row['seen_key'])
+
+
+contact_directory = ContactDirectory(
+    max_size=int(os.getenv('CONTACT_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('CONTACT_CACHE_TTL', '300'))
+)
+conversation_log = ConversationLog(
+    app, contact_directory, deduplicator=deduplicator,
+    max_queue=int(os.getenv('CONVERSATION_LOG_QUEUE_SIZE', '20000')),
+    batch_size=int(os.getenv('CONVERSATION_LOG_BATCH_SIZE', '500')),
+    flush_interval=float(os.getenv('CONVERSATION_LOG_FLUSH_MS', '250')) / 1000
+)
+attach_conversation_log(conversation_log)
+atexit.register(conversation_log.shutdown)
+
+FLOW_FIELD_LABELS = {
+    'wish_date': 'Wunschtermin', 'concern': 'Anliegen', 'property': 'Objekt',
+    'scope': 'Umfang', 'contact': 'Kontaktdaten'
+}
+
+
+def record_conversation_flow(flow, phone, name, fields):
+    """Abgeschlossener WhatsApp-Ablauf: Termin -> Task, Angebot -> Lead (läuft im Queue-Worker)"""
+    phone = normalize_phone(phone) or phone
+    label = name or phone
+    details = '\n'.join(f"{FLOW_FIELD_LABELS.get(key, key)}: {value}" for key, value in fields.items())
+    details = f"WhatsApp {phone}\n{details}"
+    if flow == 'appointment':
+        db.session.add(Task(title=f"WhatsApp Termin: {label}"[:200], description=details, priority='high'))
+    elif flow == 'quote_request':
+        contact_id = contact_directory.resolve_many(db.engine, {phone: name}).get(phone)
+        db.session.add(Lead(title=f"WhatsApp Angebot: {label}"[:200], contact_id=contact_id,
+                            status='new', source='whatsapp', notes=details))
+    else:
+        return
+    db.session.commit()
+
+
+attach_flow_recorder(record_conversation_flow)
+
 # =============================================================================
 # AUTH HELPERS
 # =============================================================================
+UserSnapshot = namedtuple('UserSnapshot', ['id', 'username', 'email', 'name', 'role', 'plan',
+                                           'tokens_god', 'tokens_dedsec', 'tokens_og', 'tokens_tower'])
+
+class UserInvalidations(SQLiteFile):
+    """Geänderte User-IDs für alle Worker: nach dem Commit anhängen, von jedem Prozess nachlesen"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS user_invalidations (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            invalidated_at REAL NOT NULL
+        );
+    """
+    # Länger als jede Cache-TTL - ältere Einträge braucht kein Worker mehr
+    KEEP_SECONDS = 3600
+
+    def publish(self, user_ids):
+        now = time.time()
+        conn = self._conn()
+        conn.executemany("INSERT INTO user_invalidations (user_id, invalidated_at) VALUES (?, ?)",
+                         [(user_id, now) for user_id in user_ids])
+        conn.execute("DELETE FROM user_invalidations WHERE invalidated_at < ?", (now - self.KEEP_SECONDS,))
+
+    def since(self, seq):
+        """(user_ids, letzte seq) nach seq; seq None liefert nur die aktuelle Position"""
+        conn = self._conn()
+        if seq is None:
+            return [], conn.execute("SELECT coalesce(max(seq), 0) FROM user_invalidations").fetchone()[0]
+        rows = conn.execute("SELECT seq, user_id FROM user_invalidations WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        return [user_id for _, user_id in rows], (rows[-1][0] if rows else seq)
+
+
+class UserCache:
+    """Prozessweiter LRU-Cache unveränderlicher User-Snapshots mit kurzer TTL
+
+    Treffer kommen ohne Datenbankabfrage aus. Änderungen an User werden nach dem
+    Commit lokal verworfen und in UserInvalidations veröffentlicht; die anderen
+    Worker lesen das höchstens einmal pro POLL_SECONDS nach.
+    """
+
+    POLL_SECONDS = float(os.getenv('USER_CACHE_POLL_SECONDS', '1'))
+
+    def __init__(self, max_size=1024, ttl=30.0, invalidations=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.invalidations = invalidations
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._seq = None
+        self._polled = 0.0
+        self.metrics = {'hits': 0, 'misses': 0, 'remote_invalidations': 0, 'store_errors': 0}
+
+    def _poll(self, now):
+        if self.invalidations is None or now - self._polled < self.POLL_SECONDS:
+            return
+        self._polled = now
+        try:
+            user_ids, self._seq = self.invalidations.since(self._seq)
+        except Exception as e:
+            # Ohne Datei bleibt die TTL die Obergrenze
+            self.metrics['store_errors'] += 1
+            logger.error(f"User cache invalidation poll failed: {e}")
+            return
+        for user_id in user_ids:
+            self.invalidate(user_id)
+        self.metrics['remote_invalidations'] += len(user_ids)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        self._poll(now)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.metrics['hits'] += 1
+                return entry[0]
+        self.metrics['misses'] += 1
+        user = get_current_user() if session.get('user_id') == user_id else db.session.get(User, user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        snapshot = UserSnapshot(*(getattr(user, f) for f in UserSnapshot._fields))
+        with self._lock:
+            self._entries[user_id] = (snapshot, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def publish(self, user_ids):
+        """Nach dem Commit: lokal sofort, in den anderen Workern beim nächsten Poll"""
+        for user_id in user_ids:
+            self.invalidate(user_id)
+        if self.invalidations is None or not user_ids:
+            return
+        try:
+            self.invalidations.publish(user_ids)
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"User cache invalidation publish failed: {e}")
+
+
+user_cache = UserCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '30')),
+    invalidations=UserInvalidations(os.getenv('USER_CACHE_INVALIDATION_PATH', os.path.join(
+        os.path.dirname(os.path.abspath(InboundQueueConfig.SQLITE_PATH)), 'user_cache.db')))
+)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_users_dirty(session, flush_context):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            session.info.setdefault('user_cache_dirty', set()).add(obj.id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_users(session):
+    user_ids = session.info.pop('user_cache_dirty', None)
+    if user_ids:
+        user_cache.publish(sorted(user_ids))
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_users_mark(session):
+    session.info.pop('user_cache_dirty', None)
+
+
 def get_current_user():
     if 'user_id' not in session:
         return None
-    return User.query.get(session['user_id'])
+    if '_current_user' not in g:
+        g._current_user = db.session.get(User, session['user_id'])
+    return g._current_user
+
+def get_current_user_snapshot():
+    if 'user_id' not in session:
+        return None
+    return user_cache.get(session['user_id'])
 
 def login_required(f):
     @wraps(f)
@@ -208,26 +991,600 @@ def login_required(f):
     return decorated
 
 def log_security_event(event_type, severity, details=None):
+    security_events.emit(event_type=event_type, severity=severity,
+                         details=json.dumps(details) if details else None,
+                         ip_address=request.remote_addr, timestamp=datetime.utcnow())
+
+# =============================================================================
+# DASHBOARD STATS
+# =============================================================================
+class DashboardStats:
+    """Aggregierte Dashboard-Zähler: ein SQL-Statement, prozesslokal gecacht"""
+
+    TTL = float(os.getenv('DASHBOARD_STATS_TTL', '30'))
+    MODELS = (Contact, Lead, Task, Campaign)
+
+    _lock = threading.Lock()
+    _stats = None
+    _expires = 0.0
+    _generation = 0
+
+    @classmethod
+    def _query(cls):
+        count = db.func.count
+        row = db.session.execute(db.select(
+            db.select(count(Contact.id)).scalar_subquery(),
+            db.select(count(Contact.id)).where(Contact.whatsapp_consent.is_(True)).scalar_subquery(),
+            db.select(count(Lead.id)).scalar_subquery(),
+            db.select(db.func.coalesce(db.func.sum(Lead.value), 0)).scalar_subquery(),
+            db.select(count(Task.id)).where(Task.status == 'pending').scalar_subquery(),
+            db.select(count(Campaign.id)).scalar_subquery(),
+        )).one()
+        contacts, with_consent, leads, total_value, pending, campaigns = row
+        return {
+            'contacts': {'total': contacts, 'with_consent': with_consent},
+            'leads': {'total': leads, 'total_value': float(total_value or 0)},
+            'tasks': {'pending': pending},
+            'campaigns': {'total': campaigns}
+        }
+
+    @classmethod
+    def get(cls):
+        now = time.monotonic()
+        with cls._lock:
+            if cls._stats is not None and now < cls._expires:
+                return cls._stats
+            generation = cls._generation
+        stats = cls._query()
+        with cls._lock:
+            # Nur speichern, wenn zwischenzeitlich nichts invalidiert wurde
+            if generation == cls._generation:
+                cls._stats = stats
+                cls._expires = now + cls.TTL
+        return stats
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._generation += 1
+            cls._stats = None
+
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_stats_dirty(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, DashboardStats.MODELS):
+            session.info['dashboard_stats_dirty'] = True
+            return
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_stats(session):
+    if session.info.pop('dashboard_stats_dirty', False):
+        DashboardStats.invalidate()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_stats_mark(session):
+    session.info.pop('dashboard_stats_dirty', None)
+
+# =============================================================================
+# KEYSET PAGINATION
+# =============================================================================
+PAGE_LIMIT_DEFAULT = 100
+PAGE_LIMIT_MAX = 500
+
+CONTACT_FIELDS = {
+    'id': Contact.id, 'name': Contact.name, 'email': Contact.email, 'phone': Contact.phone,
+    'company': Contact.company, 'whatsapp_consent': Contact.whatsapp_consent, 'tags': Contact.tags,
+    'source': Contact.source, 'notes': Contact.notes, 'user_id': Contact.user_id, 'created_at': Contact.created_at
+}
+CONTACT_DEFAULT_FIELDS = ('id', 'name', 'email', 'phone', 'company', 'whatsapp_consent', 'tags', 'source')
+
+LEAD_FIELDS = {
+    'id': Lead.id, 'title': Lead.title, 'value': Lead.value, 'status': Lead.status, 'source': Lead.source,
+    'contact_id': Lead.contact_id, 'assigned_to': Lead.assigned_to, 'notes': Lead.notes, 'created_at': Lead.created_at
+}
+LEAD_DEFAULT_FIELDS = ('id', 'title', 'value', 'status', 'source')
+
+FIELD_FORMATTERS = {
+    'tags': lambda v: json.loads(v) if v else [],
+    'created_at': lambda v: v.isoformat() if v else None
+}
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+        # None: Cursor steht schon in den Zeilen ohne created_at (am Ende der Liste)
+        return (datetime.fromisoformat(created_at) if created_at is not None else None), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Ungültiger Cursor')
+
+def keyset_page(model, columns, default_fields):
+    """Seite nach (created_at, id) absteigend; lädt nur die angefragten Spalten
+
+    Zeilen ohne created_at kommen zuletzt (nach id absteigend), der Cursor kodiert sie als None.
+    """
+    limit = min(max(request.args.get('limit', PAGE_LIMIT_DEFAULT, type=int), 1), PAGE_LIMIT_MAX)
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(default_fields)
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        raise ValueError(f"Unbekannte Felder: {', '.join(unknown)}")
+
+    query = db.select(model.created_at, model.id, *(columns[f] for f in fields))
+    cursor = request.args.get('cursor')
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.where(model.created_at.is_(None), model.id < row_id)
+        else:
+            query = query.where(db.or_(model.created_at < created_at,
+                                       db.and_(model.created_at == created_at, model.id < row_id),
+                                       model.created_at.is_(None)))
+    query = query.order_by(model.created_at.desc().nulls_last(), model.id.desc()).limit(limit + 1)
+    rows = db.session.execute(query).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+
+    items = []
+    for row in rows:
+        item = {}
+        for name, value in zip(fields, row[2:]):
+            formatter = FIELD_FORMATTERS.get(name)
+            item[name] = formatter(value) if formatter else value
+        items.append(item)
+    return items, next_cursor
+
+# =============================================================================
+# CAMPAIGN SENDING
+# =============================================================================
+CAMPAIGN_FEED_CHUNK = 1000
+# Verlängert bei jeder Seite und jedem Ergebnis-Flush; stirbt der Worker, ist Fortsetzen danach möglich
+CAMPAIGN_LEASE = timedelta(seconds=int(os.getenv('CAMPAIGN_LEASE_SECONDS', '120')))
+
+
+def campaign_payload(data):
+    """Kampagnen-Nachricht aus dem Request: Meta-Template oder (im 24h-Fenster) Freitext"""
+    if data.get('template'):
+        language = data.get('language', 'de')
+        # Nur aus dem Speicher: unbekannte Templates nicht blockieren, Meta prüft beim Versand
+        template = template_registry.get(data['template'], language)
+        if template is not None and template.get('status') not in (None, 'APPROVED'):
+            raise ValueError(f"Template {data['template']} ({language}) ist {template.get('status')}")
+        return {'type': 'template', 'template': {'name': data['template'], 'language': {'code': language}}}
+    if data.get('text'):
+        return {'type': 'text', 'text': {'body': data['text']}}
+    raise ValueError('template oder text erforderlich')
+
+
+def acquire_campaign_lease(campaign_id, owner, renew=False):
+    """Bedingtes UPDATE: frei/abgelaufen (bzw. beim Verlängern: eigenes Lease) -> True"""
+    now = datetime.utcnow()
+    condition = Campaign.lease_owner == owner
+    if not renew:
+        condition = db.or_(Campaign.lease_until.is_(None), Campaign.lease_until < now, condition)
+    claimed = db.session.execute(db.update(Campaign).where(Campaign.id == campaign_id, condition)
+                                 .values(lease_owner=owner, lease_until=now + CAMPAIGN_LEASE)).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def release_campaign_lease(campaign_id, owner):
+    db.session.execute(db.update(Campaign).where(Campaign.id == campaign_id, Campaign.lease_owner == owner)
+                       .values(lease_owner=None, lease_until=None))
+
+
+def prepare_campaign_recipients(campaign):
+    """Empfänger einmalig per INSERT ... SELECT anlegen (Kontakte mit WhatsApp-Einwilligung)"""
+    already = db.session.execute(
+        db.select(db.func.count(CampaignRecipient.id)).where(CampaignRecipient.campaign_id == campaign.id)
+    ).scalar()
+    if not already:
+        source = db.select(db.literal(campaign.id), Contact.id, Contact.phone, db.literal('pending')).where(
+            Contact.whatsapp_consent.is_(True), Contact.phone.is_not(None), Contact.phone != '')
+        db.session.execute(db.insert(CampaignRecipient).from_select(
+            ['campaign_id', 'contact_id', 'phone', 'status'], source))
+    return db.session.execute(
+        db.select(db.func.count(CampaignRecipient.id))
+        .where(CampaignRecipient.campaign_id == campaign.id, CampaignRecipient.status == 'pending')
+    ).scalar()
+
+
+def set_recipient_status(ids, status, current):
+    db.session.execute(db.update(CampaignRecipient).where(
+        CampaignRecipient.id.in_(ids), CampaignRecipient.status == current).values(status=status))
+    db.session.commit()
+
+
+def pending_campaign_recipients(campaign_id, content, owner):
+    """Offene Empfänger seitenweise (Keyset auf id), eigener App-Kontext pro Seite
+
+    Jede Seite wird vor dem Einspeisen als 'queued' markiert, solange das Lease
+    gehalten wird - ein Fortsetzen sendet sie nicht erneut. Bricht der Feeder ab,
+    gehen die noch nicht gelieferten Empfänger zurück auf 'pending'.
+    """
+    last_id, unsent = 0, []
     try:
-        event = SecurityEvent(event_type=event_type, severity=severity, 
-                             details=json.dumps(details) if details else None,
-                             ip_address=request.remote_addr)
-        db.session.add(event)
+        while True:
+            with app.app_context():
+                if not acquire_campaign_lease(campaign_id, owner, renew=True):
+                    logger.warning(f"Campaign {campaign_id}: lease lost, feeder stops")
+                    return
+                rows = db.session.execute(
+                    db.select(CampaignRecipient.id, CampaignRecipient.phone, CampaignRecipient.contact_id)
+                    .where(CampaignRecipient.campaign_id == campaign_id, CampaignRecipient.status == 'pending',
+                           CampaignRecipient.id > last_id)
+                    .order_by(CampaignRecipient.id).limit(CAMPAIGN_FEED_CHUNK)
+                ).all()
+                if rows:
+                    set_recipient_status([row[0] for row in rows], 'queued', 'pending')
+            if not rows:
+                return
+            unsent = [row[0] for row in rows]
+            for recipient_id, phone, contact_id in rows:
+                unsent.pop(0)
+                yield phone, (campaign_id, recipient_id, contact_id, content, owner)
+            last_id = rows[-1][0]
+    finally:
+        if unsent:
+            with app.app_context():
+                set_recipient_status(unsent, 'pending', 'queued')
+
+
+def record_campaign_results(results):
+    """Versandergebnisse gebündelt: executemany-UPDATE/INSERT, ein sent_count-UPDATE pro Kampagne
+
+    'released' (beim Herunterfahren nicht gesendet) geht zurück auf 'pending'
+    und gibt das Lease frei, damit sofort fortgesetzt werden kann. 'retry'
+    (429/5xx nach allen Versuchen) geht ebenfalls auf 'pending' - das nächste
+    Fortsetzen sendet erneut; 'failed' bleibt dauerhaften 4xx-Fehlern vorbehalten.
+    """
+    now = datetime.utcnow()
+    updates, released, retried, messages, sent, owners = [], [], [], [], {}, {}
+    for (campaign_id, recipient_id, contact_id, content, owner), result in results:
+        sent.setdefault(campaign_id, 0)
+        owners.setdefault((campaign_id, owner), False)
+        if result.get('released'):
+            released.append({'id': recipient_id, 'status': 'pending'})
+            owners[(campaign_id, owner)] = True
+            continue
+        if result.get('retry'):
+            retried.append({'id': recipient_id, 'status': 'pending', 'error': result['error']})
+            continue
+        updates.append({'id': recipient_id, 'status': 'sent' if result['ok'] else 'failed',
+                        'wa_message_id': result['message_id'], 'error': result['error'], 'sent_at': now})
+        if result['ok']:
+            sent[campaign_id] += 1
+            messages.append({'contact_id': contact_id, 'direction': 'outbound', 'content': content,
+                             'status': 'sent', 'wa_message_id': result['message_id'], 'timestamp': now})
+    with app.app_context():
+        for rows in (updates, released, retried):
+            if rows:
+                db.session.execute(db.update(CampaignRecipient), rows)
+        if messages:
+            db.session.execute(db.insert(Message), messages)
+        for campaign_id, count in sent.items():
+            done = not db.session.execute(db.select(CampaignRecipient.id).where(
+                CampaignRecipient.campaign_id == campaign_id,
+                CampaignRecipient.status.in_(('pending', 'queued'))).limit(1)).first()
+            values = {'sent_count': db.func.coalesce(Campaign.sent_count, 0) + count}
+            if done:
+                values.update(status='sent', lease_owner=None, lease_until=None)
+            db.session.execute(db.update(Campaign).where(Campaign.id == campaign_id).values(**values))
+        for (campaign_id, owner), give_up in owners.items():
+            if give_up:
+                release_campaign_lease(campaign_id, owner)
+            else:
+                db.session.execute(db.update(Campaign).where(Campaign.id == campaign_id, Campaign.lease_owner == owner)
+                                   .values(lease_until=now + CAMPAIGN_LEASE))
         db.session.commit()
-    except: pass
+
+
+outbound.on_campaign_results = record_campaign_results
+atexit.register(outbound.shutdown)
+
+# =============================================================================
+# VOICE AGENT REGISTRY
+# =============================================================================
+class VoiceAgentStore:
+    """voice_agents als gemeinsamer Stand der Agent-Registry; die Zeile 'creating' ist die Sperre zwischen Workern"""
+
+    # create_agent hat 30 s Timeout - ältere 'creating'-Zeilen stammen von abgestürzten Workern
+    STALE_CLAIM_SECONDS = 120
+
+    def __init__(self, app):
+        self.app = app
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self.app.app_context():
+                self._engine = db.engine
+        return self._engine
+
+    def load(self):
+        query = db.select(VoiceAgent.agent_type, VoiceAgent.agent_id).where(
+            VoiceAgent.status == 'active', VoiceAgent.agent_id.isnot(None))
+        with self.engine.connect() as conn:
+            return dict(conn.execute(query).all())
+
+    def claim(self, agent_type):
+        now = datetime.utcnow()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(db.insert(VoiceAgent).values(agent_type=agent_type, status='creating',
+                                                          created_at=now, updated_at=now))
+            return True
+        except IntegrityError:
+            pass
+        # Verwaiste Sperre übernehmen - das UPDATE gewinnt nur ein Worker
+        with self.engine.begin() as conn:
+            result = conn.execute(db.update(VoiceAgent).where(
+                VoiceAgent.agent_type == agent_type, VoiceAgent.status == 'creating',
+                VoiceAgent.updated_at < now - timedelta(seconds=self.STALE_CLAIM_SECONDS)
+            ).values(updated_at=now))
+            return result.rowcount == 1
+
+    def save(self, agent_type, agent_id, name):
+        values = {'agent_id': agent_id, 'name': name, 'status': 'active', 'updated_at': datetime.utcnow()}
+        with self.engine.begin() as conn:
+            result = conn.execute(db.update(VoiceAgent).where(VoiceAgent.agent_type == agent_type).values(**values))
+            if result.rowcount == 0:
+                conn.execute(db.insert(VoiceAgent).values(agent_type=agent_type, created_at=values['updated_at'],
+                                                          **values))
+
+    def release(self, agent_type):
+        with self.engine.begin() as conn:
+            conn.execute(db.delete(VoiceAgent).where(VoiceAgent.agent_type == agent_type,
+                                                     VoiceAgent.status == 'creating'))
+
+    def forget(self, agent_type):
+        with self.engine.begin() as conn:
+            conn.execute(db.delete(VoiceAgent).where(VoiceAgent.agent_type == agent_type))
+
+CLOSED_LEAD_STATUSES = ('won', 'lost')
+
+
+def lookup_caller(phone):
+    """Caller-ID für eingehende Anrufe: Kontakt über uq_contacts_phone_normalized, dazu offene Leads und letzte Nachrichten"""
+    with app.app_context():
+        engine = db.engine
+    with engine.connect() as conn:
+        contact = conn.execute(db.select(Contact.id, Contact.name)
+                               .where(Contact.phone_normalized == phone)).first()
+        if contact is None:
+            return None
+        leads = conn.execute(db.select(Lead.title, Lead.status)
+                             .where(Lead.contact_id == contact.id,
+                                    db.or_(Lead.status.is_(None), Lead.status.notin_(CLOSED_LEAD_STATUSES)))
+                             .order_by(Lead.created_at.desc()).limit(3)).all()
+        messages = conn.execute(db.select(Message.direction, Message.content, Message.timestamp)
+                                .where(Message.contact_id == contact.id)
+                                .order_by(Message.timestamp.desc()).limit(3)).all()
+    return {
+        'contact_id': contact.id,
+        'name': contact.name,
+        'open_leads': [{'title': lead.title, 'status': lead.status or 'new'} for lead in leads],
+        'last_messages': [{'direction': m.direction, 'content': m.content,
+                           'timestamp': m.timestamp.isoformat() if m.timestamp else None} for m in messages],
+    }
+
+
+attach_caller_lookup(lookup_caller)
+
+# =============================================================================
+# CALL LOG
+# =============================================================================
+class CallLog(BatchWriter):
+    """Twilio Status-Callbacks gebündelt nach call_events; pro Batch Rollup in calls und Tageszähler
+
+    Abgeschlossene Anrufe werden genau einmal in call_stats_daily gezählt, damit
+    Auswertungen und Anrufdetails ohne Twilio-Abfrage auskommen.
+    """
+
+    THREAD_NAME = 'call-log'
+    STATUS_RANK = {'queued': 0, 'initiated': 1, 'routed': 1, 'ringing': 2, 'in-progress': 3,
+                   'completed': 4, 'busy': 4, 'no-answer': 4, 'failed': 4, 'canceled': 4}
+    FINAL_STATUSES = frozenset({'completed', 'busy', 'no-answer', 'failed', 'canceled'})
+    IN_CHUNK = 500
+
+    def record(self, call_sid, status, agent_type=None, direction=None, from_number=None, to_number=None,
+               duration=None, contact_id=None):
+        if not call_sid or status not in self.STATUS_RANK:
+            return False
+        try:
+            duration = int(duration) if duration not in (None, '') else None
+        except (TypeError, ValueError):
+            duration = None
+        return self.emit(call_sid=call_sid, status=status, agent_type=agent_type, direction=direction,
+                         from_number=normalize_phone(from_number) or from_number,
+                         to_number=normalize_phone(to_number) or to_number,
+                         duration=duration, contact_id=contact_id, timestamp=datetime.utcnow())
+
+    def write_batch(self, engine, batch):
+        unique = {}
+        for row in batch:
+            unique.setdefault((row['call_sid'], row['status']), row)
+        rows = list(unique.values())
+        with engine.begin() as conn:
+            # Wiederholte Callbacks oder ein anderer Worker: die Unique-Regel entscheidet, nicht ein SELECT vorher
+            insert = dialect_insert(conn, CallEvent)
+            if insert is not None:
+                conn.execute(insert.on_conflict_do_nothing(index_elements=['call_sid', 'status']), rows)
+            else:
+                for row in rows:
+                    try:
+                        with conn.begin_nested():
+                            conn.execute(db.insert(CallEvent), [row])
+                    except IntegrityError:
+                        pass
+
+            # Rollup aus allen gespeicherten Events des Anrufs - unabhängig von der Reihenfolge der Callbacks
+            touched = sorted({row['call_sid'] for row in rows})
+            events = {}
+            for i in range(0, len(touched), self.IN_CHUNK):
+                for event in conn.execute(db.select(CallEvent)
+                                          .where(CallEvent.call_sid.in_(touched[i:i + self.IN_CHUNK]))
+                                          .order_by(CallEvent.timestamp, CallEvent.id)).mappings():
+                    events.setdefault(event['call_sid'], []).append(event)
+            finished = [self._store_rollup(conn, sid, self._rollup(events[sid])) for sid in touched]
+            self._count(conn, [rollup for rollup in finished if rollup is not None])
+
+    def _rollup(self, events):
+        rollup = {'direction': None, 'from_number': None, 'to_number': None, 'agent_type': None,
+                  'contact_id': None, 'status': None, 'answered': False, 'duration': None,
+                  'started_at': events[0]['timestamp'], 'ended_at': None}
+        for event in events:
+            for field in ('direction', 'from_number', 'to_number', 'agent_type', 'contact_id'):
+                if event[field] is not None:
+                    rollup[field] = event[field]
+            if rollup['status'] is None or self.STATUS_RANK[event['status']] >= self.STATUS_RANK[rollup['status']]:
+                rollup['status'] = event['status']
+            if event['duration'] is not None:
+                rollup['duration'] = event['duration']
+            if event['status'] == 'in-progress' or (event['status'] == 'completed' and event['duration']):
+                rollup['answered'] = True
+            if event['status'] in self.FINAL_STATUSES:
+                rollup['ended_at'] = event['timestamp']
+        return rollup
+
+    def _store_rollup(self, conn, call_sid, rollup):
+        """Rollup schreiben; liefert ihn zurück, wenn der Anruf jetzt erstmals gezählt werden muss"""
+        values = {**rollup, 'updated_at': datetime.utcnow()}
+        # Nur vorwärts: ein parallel berechneter, älterer Stand überschreibt keinen Endstatus
+        rank = self.STATUS_RANK[rollup['status']]
+        not_ahead = [status for status, r in self.STATUS_RANK.items() if r <= rank]
+        update = db.update(Call).where(Call.call_sid == call_sid,
+                                       db.or_(Call.status.is_(None), Call.status.in_(not_ahead))).values(**values)
+        if conn.execute(update).rowcount == 0:
+            try:
+                with conn.begin_nested():
+                    conn.execute(db.insert(Call).values(call_sid=call_sid, counted=False, **values))
+            except IntegrityError:
+                # Ein anderer Worker hat die Zeile gerade angelegt
+                conn.execute(update)
+        if rollup['status'] not in self.FINAL_STATUSES:
+            return None
+        # Nur einer gewinnt das Umschalten von counted - kein Anruf wird doppelt gezählt
+        claimed = conn.execute(db.update(Call).where(Call.call_sid == call_sid, Call.counted.is_(False))
+                               .values(counted=True))
+        return rollup if claimed.rowcount == 1 else None
+
+    def _count(self, conn, rollups):
+        totals = {}
+        for rollup in rollups:
+            key = (rollup['started_at'].date(), rollup['agent_type'] or 'unknown')
+            calls, answered, duration = totals.get(key, (0, 0, 0))
+            totals[key] = (calls + 1, answered + int(rollup['answered']),
+                           duration + ((rollup['duration'] or 0) if rollup['answered'] else 0))
+        for (day, agent_type), (calls, answered, duration) in totals.items():
+            update = (db.update(CallStatsDaily)
+                      .where(CallStatsDaily.day == day, CallStatsDaily.agent_type == agent_type)
+                      .values(calls=CallStatsDaily.calls + calls, answered=CallStatsDaily.answered + answered,
+                              duration_total=CallStatsDaily.duration_total + duration))
+            if conn.execute(update).rowcount:
+                continue
+            try:
+                with conn.begin_nested():
+                    conn.execute(db.insert(CallStatsDaily).values(day=day, agent_type=agent_type, calls=calls,
+                                                                  answered=answered, duration_total=duration))
+            except IntegrityError:
+                conn.execute(update)
+
+    def get(self, call_sid):
+        with self.app.app_context():
+            call = db.session.execute(db.select(Call).where(Call.call_sid == call_sid)).scalar_one_or_none()
+            return call.to_dict() if call else None
+
+    def analytics(self, days=30):
+        """Anrufe, Annahmequote und Ø Dauer pro Agent-Typ und Tag aus call_stats_daily"""
+        since = (datetime.utcnow() - timedelta(days=days - 1)).date()
+        with self.app.app_context():
+            rows = db.session.execute(db.select(CallStatsDaily).where(CallStatsDaily.day >= since)
+                                      .order_by(CallStatsDaily.day, CallStatsDaily.agent_type)).scalars().all()
+
+        def summary(calls, answered, duration):
+            return {'calls': calls, 'answered': answered,
+                    'answer_rate': round(answered / calls, 3) if calls else None,
+                    'avg_duration': round(duration / answered, 1) if answered else None}
+
+        by_agent, by_day, total = {}, [], [0, 0, 0]
+        for row in rows:
+            counts = (row.calls or 0, row.answered or 0, row.duration_total or 0)
+            by_day.append({'day': row.day.isoformat(), 'agent_type': row.agent_type, **summary(*counts)})
+            agent = by_agent.setdefault(row.agent_type, [0, 0, 0])
+            for i, value in enumerate(counts):
+                agent[i] += value
+                total[i] += value
+        return {'since': since.isoformat(), 'days': days, 'total': summary(*total),
+                'by_agent_type': {agent_type: summary(*counts) for agent_type, counts in by_agent.items()},
+                'by_day': by_day}
+
+
+call_log = CallLog(
+    app,
+    max_queue=int(os.getenv('CALL_LOG_QUEUE_SIZE', '10000')),
+    batch_size=int(os.getenv('CALL_LOG_BATCH_SIZE', '200')),
+    flush_interval=float(os.getenv('CALL_LOG_FLUSH_MS', '500')) / 1000
+)
+attach_call_log(call_log)
+atexit.register(call_log.shutdown)
 
 # =============================================================================
 # INITIALIZE DATABASE
 # =============================================================================
-with app.app_context():
-    db.create_all()
-    if not User.query.filter_by(username='admin').first():
-        admin = User(username='admin', email='admin@west-money.com', name='Administrator', 
-                    role='admin', plan='enterprise', tokens_god=1000, tokens_dedsec=500)
-        admin.set_password('WestMoney2025!')
-        db.session.add(admin)
-        db.session.commit()
-    logger.info("Database initialized")
+register_voice_blueprint(app, login_required, agent_store=VoiceAgentStore(app))
+
+
+def initialize_app():
+    """Tabellen, Admin-Seeding und Agent-Registry - nicht beim Import
+
+    Läuft einmal beim Start (gunicorn on_starting, Entwicklungsserver) oder per
+    `flask --app app init-db`. `flask db upgrade` importiert die App, bevor die
+    Migrationen laufen; Abfragen auf neue Spalten würden dort scheitern.
+    """
+    with app.app_context():
+        db.create_all()
+        if not User.query.filter_by(username='admin').first():
+            admin = User(username='admin', email='admin@west-money.com', name='Administrator', 
+                        role='admin', plan='enterprise', tokens_god=1000, tokens_dedsec=500)
+            admin.set_password('WestMoney2025!')
+            db.session.add(admin)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Parallel gestartete Instanz hat den Admin gerade angelegt
+                db.session.rollback()
+        logger.info("Database initialized")
+    # Bekannte Agents laden - der erste Anruf wartet nicht auf ElevenLabs
+    agent_registry.warm()
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Tabellen anlegen und Admin-Benutzer seeden"""
+    initialize_app()
+
+
+def start_background_workers():
+    """Worker dieses Prozesses starten: gunicorn post_fork bzw. Entwicklungsserver
+
+    Ausstehende und wartende Jobs der Inbound Queue laufen nach einem Neustart
+    oder Worker-Recycling weiter, auch wenn kein neuer Webhook eintrifft.
+    """
+    inbound_queue.start()
+
+
+atexit.register(inbound_queue.shutdown)
 
 # =============================================================================
 # HTML TEMPLATES
@@ -937,29 +2294,107 @@ Content-Type: application/json
 </body>
 </html>'''
 
+DASHBOARD_PAGES = {"contacts": "Kontakte", "leads": "Leads", "campaigns": "Kampagnen", "invoices": "Rechnungen", "whatsapp": "WhatsApp", "messages": "Nachrichten", "ai": "AI Chat", "broly": "Broly Taskforce", "einstein": "Einstein Agency", "dedsec": "DedSec Security", "tokens": "Token Economy", "loxone": "LOXONE", "automations": "Z Automations", "settings": "Einstellungen"}
+
+def render_module_page(title):
+    return f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>{title} - West Money OS</title><style>*{{margin:0;padding:0;box-sizing:border-box}}body{{font-family:Inter,sans-serif;background:#0f0f1a;color:#fff;min-height:100vh;display:flex}}.sidebar{{width:260px;background:#1a1a2e;padding:1.5rem;position:fixed;height:100vh}}.logo{{font-size:1.25rem;font-weight:700;margin-bottom:2rem}}.nav-item{{display:block;padding:0.75rem 1rem;color:#fff;text-decoration:none;border-radius:10px;margin-bottom:0.25rem}}.nav-item:hover{{background:rgba(102,126,234,0.2)}}.main{{margin-left:260px;padding:2rem;flex:1}}.content{{background:rgba(255,255,255,0.05);border-radius:20px;padding:3rem;text-align:center}}.btn{{display:inline-block;padding:0.75rem 1.5rem;background:linear-gradient(135deg,#667eea,#764ba2);border-radius:10px;color:#fff;text-decoration:none;margin-top:1rem}}</style></head><body><nav class="sidebar"><div class="logo">💰 West Money OS</div><a href="/dashboard" class="nav-item">📊 Dashboard</a><a href="/dashboard/contacts" class="nav-item">👥 Kontakte</a><a href="/dashboard/leads" class="nav-item">🎯 Leads</a><a href="/dashboard/campaigns" class="nav-item">📧 Kampagnen</a><a href="/dashboard/invoices" class="nav-item">📄 Rechnungen</a><a href="/dashboard/whatsapp" class="nav-item">📱 WhatsApp</a><a href="/dashboard/ai" class="nav-item">🤖 AI Chat</a><a href="/dashboard/broly" class="nav-item">💪 Broly</a><a href="/dashboard/einstein" class="nav-item">🧠 Einstein</a><a href="/dashboard/dedsec" class="nav-item">🔐 DedSec</a><a href="/dashboard/tokens" class="nav-item">🪙 Tokens</a><a href="/dashboard/settings" class="nav-item">⚙️ Settings</a><a href="/logout" class="nav-item">🚪 Logout</a></nav><main class="main"><h1 style="font-size:2rem;margin-bottom:2rem">{title}</h1><div class="content"><h2>🚧 {title} Modul</h2><p style="margin:1rem 0">Dieses Modul wird entwickelt!</p><a href="/dashboard" class="btn">← Zurück</a></div></main></body></html>"""
+
+# =============================================================================
+# PAGE CACHE
+# =============================================================================
+class PageCache:
+    """Statische Seiten: einmal gerendert (inkl. Cookie-Banner), vorkomprimiert, mit ETag"""
+
+    ENCODINGS = ('br', 'gzip')
+
+    def __init__(self):
+        self._pages = {}
+        self._templates = {}
+
+    def add(self, name, page_html):
+        body = with_cookie_banner(page_html).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        variants = {'identity': body, 'gzip': gzip.compress(body, 9)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(body, quality=11)
+        self._pages[name] = {enc: (data, f'{digest}-{enc}') for enc, data in variants.items()}
+
+    def add_template(self, name, page_html, fields):
+        # Vorab in statische Segmente und Platzhalter zerlegen
+        pattern = '|'.join(re.escape('{' + f + '}') for f in fields)
+        self._templates[name] = re.split(f'({pattern})', with_cookie_banner(page_html))
+
+    def response(self, name, status=200):
+        variants = self._pages[name]
+        encoding = next((enc for enc in self.ENCODINGS if enc in variants and enc in request.accept_encodings), 'identity')
+        body, etag = variants[encoding]
+        if status == 200 and request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, status=status, mimetype='text/html')
+            if encoding != 'identity':
+                response.content_encoding = encoding
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.no_cache = True
+        return response
+
+    def render(self, name, **values):
+        parts = self._templates[name]
+        out = list(parts)
+        for i in range(1, len(parts), 2):
+            out[i] = html.escape(str(values[parts[i][1:-1]]))
+        return Response(''.join(out), mimetype='text/html')
+
+
+pages = PageCache()
+pages.add('landing', LANDING_HTML)
+pages.add('wiki', WIKI_HTML)
+pages.add('login', LOGIN_HTML.replace('{error}', ''))
+pages.add('login_error', LOGIN_HTML.replace('{error}', '<div class="error">❌ Ungültige Anmeldedaten</div>'))
+pages.add('login_throttled', LOGIN_HTML.replace('{error}', '<div class="error">⏳ Zu viele Anmeldeversuche. Bitte später erneut versuchen.</div>'))
+pages.add('register', REGISTER_HTML.replace('{message}', ''))
+pages.add('register_username_taken', REGISTER_HTML.replace('{message}', '<div class="error">❌ Benutzername bereits vergeben</div>'))
+pages.add('register_email_taken', REGISTER_HTML.replace('{message}', '<div class="error">❌ E-Mail bereits registriert</div>'))
+pages.add('register_success', REGISTER_HTML.replace('{message}', '<div class="success">✅ Konto erstellt! <a href="/login">Jetzt einloggen</a></div>'))
+for _page, _title in DASHBOARD_PAGES.items():
+    pages.add(f'dashboard_{_page}', render_module_page(_title))
+pages.add_template('dashboard', DASHBOARD_HTML, ('username', 'tokens_god', 'tokens_dedsec'))
+
 # =============================================================================
 # PAGE ROUTES
 # =============================================================================
 @app.route('/')
 def landing():
-    return Response(LANDING_HTML, mimetype='text/html')
+    return pages.response('landing')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username', '')
         password = request.form.get('password', '')
+        ip = request.remote_addr
+        retry_after = login_guard.retry_after(ip, username)
+        if retry_after:
+            log_security_event('login_throttled', 'warning', {'username': username, 'retry_after': retry_after})
+            response = pages.response('login_throttled', status=429)
+            response.headers['Retry-After'] = str(retry_after)
+            return response
         user = User.query.filter((User.username == username) | (User.email == username)).first()
         if user and user.check_password(password):
+            login_guard.register_success(ip, username)
+            if password_policy.needs_rehash(user.password_hash):
+                user.set_password(password)
             session['user_id'] = user.id
             session.permanent = True
             user.last_login = datetime.utcnow()
             db.session.commit()
             log_security_event('login', 'info', {'user_id': user.id})
             return redirect('/dashboard')
+        login_guard.register_failure(ip, username)
         log_security_event('failed_login', 'warning', {'username': username})
-        return Response(LOGIN_HTML.replace('{error}', '<div class="error">❌ Ungültige Anmeldedaten</div>'), mimetype='text/html')
-    return Response(LOGIN_HTML.replace('{error}', ''), mimetype='text/html')
+        return pages.response('login_error')
+    return pages.response('login')
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -972,9 +2407,9 @@ def register():
         plan = request.form.get('plan', 'free')
         
         if User.query.filter_by(username=username).first():
-            return Response(REGISTER_HTML.replace('{message}', '<div class="error">❌ Benutzername bereits vergeben</div>'), mimetype='text/html')
+            return pages.response('register_username_taken')
         if User.query.filter_by(email=email).first():
-            return Response(REGISTER_HTML.replace('{message}', '<div class="error">❌ E-Mail bereits registriert</div>'), mimetype='text/html')
+            return pages.response('register_email_taken')
         
         user = User(username=username, email=email, name=f"{firstname} {lastname}", plan=plan, tokens_god=100)
         user.set_password(password)
@@ -982,18 +2417,19 @@ def register():
         db.session.commit()
         
         log_security_event('registration', 'info', {'user_id': user.id})
-        return Response(REGISTER_HTML.replace('{message}', '<div class="success">✅ Konto erstellt! <a href="/login">Jetzt einloggen</a></div>'), mimetype='text/html')
-    return Response(REGISTER_HTML.replace('{message}', ''), mimetype='text/html')
+        return pages.response('register_success')
+    return pages.response('register')
 
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
         return redirect('/login')
-    user = get_current_user()
-    html = DASHBOARD_HTML.replace('{username}', user.name or user.username)
-    html = html.replace('{tokens_god}', str(user.tokens_god))
-    html = html.replace('{tokens_dedsec}', str(user.tokens_dedsec))
-    return Response(html, mimetype='text/html')
+    user = get_current_user_snapshot()
+    if user is None:
+        session.clear()
+        return redirect('/login')
+    return pages.render('dashboard', username=user.name or user.username,
+                        tokens_god=user.tokens_god, tokens_dedsec=user.tokens_dedsec)
 
 @app.route('/pricing')
 def pricing():
@@ -1001,7 +2437,7 @@ def pricing():
 
 @app.route('/wiki')
 def wiki():
-    return Response(WIKI_HTML, mimetype='text/html')
+    return pages.response('wiki')
 
 @app.route('/logout')
 def logout():
@@ -1014,19 +2450,16 @@ def logout():
 @app.route('/api/dashboard/stats')
 @login_required
 def api_dashboard_stats():
-    stats = {
-        'contacts': {'total': Contact.query.count(), 'with_consent': Contact.query.filter_by(whatsapp_consent=True).count()},
-        'leads': {'total': Lead.query.count(), 'total_value': float(db.session.query(db.func.sum(Lead.value)).scalar() or 0)},
-        'tasks': {'pending': Task.query.filter_by(status='pending').count()},
-        'campaigns': {'total': Campaign.query.count()}
-    }
-    return jsonify({'success': True, 'stats': stats})
+    return jsonify({'success': True, 'stats': DashboardStats.get()})
 
 @app.route('/api/contacts', methods=['GET'])
 @login_required
 def api_get_contacts():
-    contacts = Contact.query.order_by(Contact.created_at.desc()).limit(100).all()
-    return jsonify({'success': True, 'contacts': [c.to_dict() for c in contacts]})
+    try:
+        contacts, next_cursor = keyset_page(Contact, CONTACT_FIELDS, CONTACT_DEFAULT_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'contacts': contacts, 'next_cursor': next_cursor})
 
 @app.route('/api/contacts', methods=['POST'])
 @login_required
@@ -1035,14 +2468,21 @@ def api_create_contact():
     contact = Contact(name=data.get('name'), email=data.get('email'), phone=data.get('phone'), 
                      company=data.get('company'), user_id=session.get('user_id'))
     db.session.add(contact)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'Telefonnummer bereits vergeben'}), 409
     return jsonify({'success': True, 'contact': contact.to_dict()})
 
 @app.route('/api/leads', methods=['GET'])
 @login_required
 def api_get_leads():
-    leads = Lead.query.order_by(Lead.created_at.desc()).all()
-    return jsonify({'success': True, 'leads': [l.to_dict() for l in leads]})
+    try:
+        leads, next_cursor = keyset_page(Lead, LEAD_FIELDS, LEAD_DEFAULT_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'leads': leads, 'next_cursor': next_cursor})
 
 @app.route('/api/leads', methods=['POST'])
 @login_required
@@ -1053,6 +2493,52 @@ def api_create_lead():
     db.session.commit()
     return jsonify({'success': True, 'lead': lead.to_dict()})
 
+@app.route('/api/campaigns/<int:campaign_id>/send', methods=['POST'])
+@login_required
+def api_send_campaign(campaign_id):
+    campaign = db.session.get(Campaign, campaign_id)
+    if campaign is None:
+        return jsonify({'success': False, 'error': 'Kampagne nicht gefunden'}), 404
+    data = request.get_json(silent=True) or {}
+    # Nach einem Neustart: {"resume": true} speist die noch offenen Empfänger erneut ein
+    if campaign.status == 'sending' and not data.get('resume'):
+        return jsonify({'success': False, 'error': 'Kampagne wird bereits versendet'}), 409
+    try:
+        payload = campaign_payload(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    owner = f'{os.getpid()}:{secrets.token_hex(8)}'
+    if not acquire_campaign_lease(campaign_id, owner):
+        return jsonify({'success': False, 'error': 'Kampagne wird von einem anderen Worker versendet'}), 409
+    # 'queued' eines abgelaufenen Leases: Versand ungewiss, nicht erneut senden
+    unconfirmed = db.session.execute(db.update(CampaignRecipient).where(
+        CampaignRecipient.campaign_id == campaign_id, CampaignRecipient.status == 'queued'
+    ).values(status='unconfirmed')).rowcount
+    pending = prepare_campaign_recipients(campaign)
+    campaign.status = 'sending' if pending else 'sent'
+    if not pending:
+        release_campaign_lease(campaign_id, owner)
+    db.session.commit()
+    if pending:
+        content = f"[Kampagne {campaign.name}] " + (data.get('template') or data.get('text', ''))
+        outbound.submit_campaign(pending_campaign_recipients(campaign_id, content, owner), payload)
+    return jsonify({'success': True, 'campaign': campaign.to_dict(), 'queued': pending,
+                    'unconfirmed': unconfirmed}), 202
+
+@app.route('/api/whatsapp/templates')
+@login_required
+def api_whatsapp_templates():
+    # ?refresh=1 stößt nur den Hintergrund-Sync an; die Antwort kommt immer aus dem Speicher
+    if request.args.get('refresh'):
+        template_registry.request_refresh()
+    return jsonify({'success': True, 'templates': template_registry.all(), 'registry': template_registry.stats()})
+
+@app.route('/api/calls/analytics')
+@login_required
+def api_call_analytics():
+    days = min(max(request.args.get('days', 30, type=int), 1), 366)
+    return jsonify({'success': True, **call_log.analytics(days)})
+
 @app.route('/api/health')
 def api_health():
     return jsonify({
@@ -1064,16 +2550,36 @@ def api_health():
         }
     })
 
+@app.route('/api/health/details')
+@login_required
+def api_health_details():
+    # Interne Kennzahlen (Pools, Queues, Login-Sperren) nur für angemeldete Benutzer
+    return jsonify({
+        'status': 'healthy', 'timestamp': datetime.utcnow().isoformat(),
+        'security_event_sink': security_events.stats(),
+        'login_guard': login_guard.metrics,
+        'user_cache': user_cache.metrics,
+        'db_pool': {**pool_metrics.stats(), 'status': db.engine.pool.status()},
+        'inbound_queue': inbound_queue.stats(),
+        'inbound_dedup': deduplicator.metrics,
+        'whatsapp_webhook': webhook_metrics,
+        'http_upstreams': http_client.metrics(),
+        'conversation_log': {**conversation_log.stats(), 'contacts': contact_directory.metrics},
+        'conversation_sessions': conversation_sessions.stats(),
+        'outbound': outbound.stats(),
+        'whatsapp_templates': template_registry.stats(),
+        'voice_agents': agent_registry.stats(),
+        'voice_callers': caller_directory.stats(),
+        'call_log': call_log.stats()
+    })
+
 @app.route("/dashboard/<page>")
 def dashboard_page(page):
     if "user_id" not in session:
         return redirect("/login")
-    user = get_current_user()
-    pages = {"contacts": "Kontakte", "leads": "Leads", "campaigns": "Kampagnen", "invoices": "Rechnungen", "whatsapp": "WhatsApp", "messages": "Nachrichten", "ai": "AI Chat", "broly": "Broly Taskforce", "einstein": "Einstein Agency", "dedsec": "DedSec Security", "tokens": "Token Economy", "loxone": "LOXONE", "automations": "Z Automations", "settings": "Einstellungen"}
-    if page not in pages:
+    if page not in DASHBOARD_PAGES:
         return redirect("/dashboard")
-    title = pages[page]
-    return Response(f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>{title} - West Money OS</title><style>*{{margin:0;padding:0;box-sizing:border-box}}body{{font-family:Inter,sans-serif;background:#0f0f1a;color:#fff;min-height:100vh;display:flex}}.sidebar{{width:260px;background:#1a1a2e;padding:1.5rem;position:fixed;height:100vh}}.logo{{font-size:1.25rem;font-weight:700;margin-bottom:2rem}}.nav-item{{display:block;padding:0.75rem 1rem;color:#fff;text-decoration:none;border-radius:10px;margin-bottom:0.25rem}}.nav-item:hover{{background:rgba(102,126,234,0.2)}}.main{{margin-left:260px;padding:2rem;flex:1}}.content{{background:rgba(255,255,255,0.05);border-radius:20px;padding:3rem;text-align:center}}.btn{{display:inline-block;padding:0.75rem 1.5rem;background:linear-gradient(135deg,#667eea,#764ba2);border-radius:10px;color:#fff;text-decoration:none;margin-top:1rem}}</style></head><body><nav class="sidebar"><div class="logo">💰 West Money OS</div><a href="/dashboard" class="nav-item">📊 Dashboard</a><a href="/dashboard/contacts" class="nav-item">👥 Kontakte</a><a href="/dashboard/leads" class="nav-item">🎯 Leads</a><a href="/dashboard/campaigns" class="nav-item">📧 Kampagnen</a><a href="/dashboard/invoices" class="nav-item">📄 Rechnungen</a><a href="/dashboard/whatsapp" class="nav-item">📱 WhatsApp</a><a href="/dashboard/ai" class="nav-item">🤖 AI Chat</a><a href="/dashboard/broly" class="nav-item">💪 Broly</a><a href="/dashboard/einstein" class="nav-item">🧠 Einstein</a><a href="/dashboard/dedsec" class="nav-item">🔐 DedSec</a><a href="/dashboard/tokens" class="nav-item">🪙 Tokens</a><a href="/dashboard/settings" class="nav-item">⚙️ Settings</a><a href="/logout" class="nav-item">🚪 Logout</a></nav><main class="main"><h1 style="font-size:2rem;margin-bottom:2rem">{title}</h1><div class="content"><h2>🚧 {title} Modul</h2><p style="margin:1rem 0">Dieses Modul wird entwickelt!</p><a href="/dashboard" class="btn">← Zurück</a></div></main></body></html>""", mimetype="text/html")
+    return pages.response(f"dashboard_{page}")
 
 # Error handlers
 @app.errorhandler(404)
@@ -1085,5 +2591,8 @@ def server_error(e):
     return jsonify({'success': False, 'error': 'Interner Serverfehler'}), 500
 
 if __name__ == '__main__':
+    # Nur für lokale Entwicklung - Produktion: python run_server.py (gunicorn, siehe gunicorn.conf.py)
     print("🚀 West Money OS v10.0 GODMODE ULTIMATE starting...")
+    initialize_app()
+    start_background_workers()
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Query-plan benchmark for the hot-query indexes on the core models.
+#
+# - Builds two throwaway SQLite databases from the app's model metadata: one without the
+#   ix_* indexes (state before migration b7ffd0732af6) and one with them.
+# - Seeds both with the same synthetic rows, then prints EXPLAIN QUERY PLAN and the median
+#   runtime of each hot query for both variants.
+#
+# Usage:
+#   ./venv/bin/python bench_indexes.py
+#   ./venv/bin/python bench_indexes.py --rows 200000 --repeat 20
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+HOT_QUERIES = {
+    "leads page (keyset)": (
+        "SELECT created_at, id, title, value, status FROM leads "
+        "WHERE created_at < ? OR (created_at = ? AND id < ?) ORDER BY created_at DESC, id DESC LIMIT 101",
+        lambda now: (now - timedelta(days=30), now - timedelta(days=30), 10**9),
+    ),
+    "leads by status": (
+        "SELECT id FROM leads WHERE status = ? ORDER BY created_at DESC LIMIT 50",
+        lambda now: ("won",),
+    ),
+    "contacts with consent": (
+        "SELECT count(id) FROM contacts WHERE whatsapp_consent = 1",
+        lambda now: (),
+    ),
+    "pending tasks": (
+        "SELECT count(id) FROM tasks WHERE status = 'pending'",
+        lambda now: (),
+    ),
+    "messages of contact": (
+        "SELECT id, content FROM messages WHERE contact_id = ? ORDER BY timestamp DESC LIMIT 50",
+        lambda now: (42,),
+    ),
+    "unread notifications": (
+        "SELECT count(id) FROM notifications WHERE user_id = ? AND read = 0",
+        lambda now: (7,),
+    ),
+    "failed logins per ip": (
+        "SELECT count(id) FROM security_events WHERE ip_address = ? AND timestamp > ?",
+        lambda now: ("10.0.0.42", now - timedelta(minutes=15)),
+    ),
+}
+
+
+def build_db(path: Path, rows: int, with_indexes: bool, seed: int) -> sqlite3.Connection:
+    from app import db
+
+    engine = db.create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(str(path), detect_types=sqlite3.PARSE_DECLTYPES)
+    if not with_indexes:
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'").fetchall():
+            conn.execute(f"DROP INDEX {name}")
+
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    ts = lambda: now - timedelta(minutes=rnd.randrange(0, 60 * 24 * 365))
+    conn.executemany(
+        "INSERT INTO contacts (name, phone, whatsapp_consent, user_id, created_at) VALUES (?, ?, ?, ?, ?)",
+        ((f"Kontakt {i}", f"+49151{i:07d}", rnd.random() < 0.1, rnd.randrange(1, 50), ts()) for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO leads (title, contact_id, value, status, assigned_to, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"Lead {i}", rnd.randrange(1, rows), rnd.random() * 50000,
+          rnd.choice(["new", "new", "new", "qualified", "won", "lost"]), rnd.randrange(1, 50), ts())
+         for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO tasks (title, status, assigned_to, created_at) VALUES (?, ?, ?, ?)",
+        ((f"Task {i}", "pending" if rnd.random() < 0.05 else "done", rnd.randrange(1, 50), ts())
+         for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO messages (contact_id, direction, content, status, timestamp) VALUES (?, ?, ?, ?, ?)",
+        ((rnd.randrange(1, rows // 10 or 2), rnd.choice(["inbound", "outbound"]), "Hallo", "delivered", ts())
+         for _ in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO notifications (user_id, title, read, created_at) VALUES (?, ?, ?, ?)",
+        ((rnd.randrange(1, 50), "Info", rnd.random() < 0.8, ts()) for _ in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO security_events (event_type, severity, ip_address, timestamp) VALUES (?, ?, ?, ?)",
+        ((rnd.choice(["login", "failed_login"]), "info", f"10.0.{rnd.randrange(4)}.{rnd.randrange(256)}", ts())
+         for _ in range(rows)),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+def run_query(conn: sqlite3.Connection, sql: str, params: tuple, repeat: int) -> tuple[list[str], float]:
+    plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append(time.perf_counter() - start)
+    return plan, statistics.median(timings) * 1000
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN before/after the hot-query indexes.")
+    ap.add_argument("--rows", type=int, default=50000, help="rows per table (default: 50000)")
+    ap.add_argument("--repeat", type=int, default=10, help="runs per query for the median (default: 10)")
+    ap.add_argument("--seed", type=int, default=1, help="random seed for the synthetic data")
+    args = ap.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="westmoney_bench_"))
+    # app.py legt beim Import seine eigene Datenbank an - nicht die echte anfassen.
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'app.db'}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    now = datetime.utcnow()
+    print(f"Seeding {args.rows} rows per table in {workdir} ...")
+    before = build_db(workdir / "before.db", args.rows, with_indexes=False, seed=args.seed)
+    after = build_db(workdir / "after.db", args.rows, with_indexes=True, seed=args.seed)
+
+    for label, (sql, params) in HOT_QUERIES.items():
+        params = params(now)
+        plan_before, ms_before = run_query(before, sql, params, args.repeat)
+        plan_after, ms_after = run_query(after, sql, params, args.repeat)
+        print()
+        print(f"== {label}")
+        print(f"   before: {ms_before:8.2f} ms  | {'; '.join(plan_before)}")
+        print(f"   after:  {ms_after:8.2f} ms  | {'; '.join(plan_after)}")
+
+    before.close()
+    after.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Micro-benchmark for the WhatsApp intent matcher.
+#
+# - Runs a corpus of typical German customer messages through the old get_response logic
+#   (linear substring scan over MESSAGE_HANDLERS) and through intent_matcher.IntentMatcher.
+# - Repeats both with the intent table padded by synthetic keywords, to show that the
+#   compiled matcher does not slow down as intents are added.
+# - Lists messages where the two disagree (word boundaries, priorities).
+#
+# Usage:
+#   ./venv/bin/python bench_intents.py
+#   ./venv/bin/python bench_intents.py --repeat 2000 --sizes 10,100,1000,5000
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+CORPUS = [
+    "Hallo",
+    "Hi, ich interessiere mich für Smart Home",
+    "Guten Tag, was kostet eine Loxone Installation für ein Einfamilienhaus?",
+    "Können wir einen Termin nächste Woche Dienstag vereinbaren?",
+    "Ich hätte gern ein Angebot für barrierefreies Wohnen nach DIN 18040",
+    "1",
+    "2",
+    "Preis?",
+    "Hilfe",
+    "Mein KNX Taster reagiert nicht mehr, bitte um Rückruf",
+    "Kann ich bitte mit einem Mitarbeiter sprechen?",
+    "Wir ziehen im Sommer nach Michigan, geht das auch dort?",
+    "Ich brauche einen Menschen, der Bot versteht mich nicht",
+    "Danke für die schnelle Antwort!",
+    "Wie lange dauert die Installation ungefähr?",
+    "Ist die Sprachsteuerung mit Alexa kompatibel?",
+    "Hallo, ich habe am 12.5. ein Angebot bekommen und hätte noch Fragen zum Preis",
+    "Unsere Heizung soll per App steuerbar sein, was würde das kosten",
+    "Gibt es eine Finanzierung oder Förderung für altersgerechten Umbau?",
+    "Termin am Freitag um 14 Uhr passt mir",
+    "Ich bin Hausverwalter und betreue 40 Wohnungen, Preisliste?",
+    "Schicken Sie mir bitte Unterlagen per E-Mail",
+    "Wo sitzt Ihre Firma? Frankfurt?",
+    "Mein Name ist Thiel, ich hatte gestern angerufen",
+    "Die Visualisierung auf dem Tablet hängt seit dem Update",
+    "help",
+    "Geht auch ein Angebot für ein Mehrfamilienhaus mit 6 Parteien?",
+    "Ich möchte meinen Termin leider absagen",
+    "Welche Pakete gibt es für die West Money OS Software?",
+    "Hi 👋",
+]
+
+WORDS = ["solar", "wallbox", "rollladen", "alarmanlage", "kamera", "zutritt", "beleuchtung", "klima",
+         "lüftung", "sauna", "pool", "garten", "bewässerung", "türsprechanlage", "netzwerk", "server"]
+
+
+def legacy_get_response(text: str, handlers: dict, handoff_words: list) -> str:
+    """get_response before the compiled matcher: exact, substring scan, handoff words"""
+    text = text.lower().strip()
+    if text in handlers:
+        return handlers[text]
+    for keyword, handler in handlers.items():
+        if keyword in text:
+            return handler
+    if any(word.rstrip("*") in text for word in handoff_words):
+        return "human_handoff"
+    return "default"
+
+
+def padded_handlers(base: dict, size: int) -> dict:
+    handlers = dict(base)
+    i = 0
+    while len(handlers) < size:
+        handlers[f"{WORDS[i % len(WORDS)]}{i}"] = f"synthetic_{i}"
+        i += 1
+    return handlers
+
+
+def time_per_message(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in CORPUS:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(CORPUS)) * 1e6
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Legacy substring scan vs. compiled intent matcher.")
+    ap.add_argument("--repeat", type=int, default=500, help="passes over the corpus (default: 500)")
+    ap.add_argument("--sizes", default="11,100,1000", help="intent table sizes (default: 11,100,1000)")
+    args = ap.parse_args()
+
+    # whatsapp_webhook legt beim Import seine Inbound-Queue an - nicht die echte anfassen.
+    workdir = tempfile.mkdtemp(prefix="westmoney_bench_")
+    os.environ.setdefault("INBOUND_QUEUE_PATH", os.path.join(workdir, "inbound_queue.db"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from intent_matcher import IntentMatcher
+    from whatsapp_webhook import HANDOFF_WORDS, INTENT_PRIORITIES, MESSAGE_HANDLERS, default_intent_table
+
+    print(f"{len(CORPUS)} messages x {args.repeat} passes")
+    print(f"{'intents':>8} {'legacy µs/msg':>14} {'compiled µs/msg':>16}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        handlers = padded_handlers(MESSAGE_HANDLERS, size)
+        table = default_intent_table() + [
+            {"intent": intent, "priority": 0, "keywords": [keyword]}
+            for keyword, intent in handlers.items() if keyword not in MESSAGE_HANDLERS
+        ]
+        matcher = IntentMatcher(table)
+        legacy = time_per_message(lambda m: legacy_get_response(m, handlers, HANDOFF_WORDS), args.repeat)
+        compiled = time_per_message(matcher.match, args.repeat)
+        print(f"{size:>8} {legacy:>14.2f} {compiled:>16.2f}")
+
+    matcher = IntentMatcher(default_intent_table())
+    print()
+    print("Differences (legacy -> compiled):")
+    for message in CORPUS:
+        old = legacy_get_response(message, MESSAGE_HANDLERS, HANDOFF_WORDS)
+        new = matcher.match(message) or "default"
+        if old != new:
+            print(f"   {message[:60]!r:<64} {old} -> {new} (prio {INTENT_PRIORITIES.get(new, 0)})")
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -24,9 +24,10 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
-import requests
 import psutil
 
+from http_client import http_client
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -122,8 +123,9 @@ Sei präzise und technisch korrekt. Antworte auf Deutsch."""
         ]
         
         try:
-            response = requests.post(
+            response = http_client.post(
                 self.API_URL,
+                upstream='anthropic',
                 headers=self._headers(),
                 json={
                     'model': self.config.claude_model,
@@ -509,7 +511,7 @@ class AlertManager:
         }
         
         try:
-            requests.post(self.config.slack_webhook, json=payload, timeout=10)
+            http_client.post(self.config.slack_webhook, json=payload, upstream='slack', timeout=10)
         except Exception as e:
             logger.error(f"Slack alert failed: {e}")
     
@@ -534,7 +536,7 @@ class AlertManager:
         }
         
         try:
-            requests.post(self.config.discord_webhook, json=payload, timeout=10)
+            http_client.post(self.config.discord_webhook, json=payload, upstream='discord', timeout=10)
         except Exception as e:
             logger.error(f"Discord alert failed: {e}")
     
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+💬 WEST MONEY OS - CONVERSATION SESSIONS 💬
+Gesprächszustand pro Absender für den WhatsApp-Bot
+
+Features:
+- Mehrstufige Abläufe (Termin, Angebot): aktueller Schritt + gesammelte Felder
+- Geteilt von allen Worker-Prozessen: SQLite neben inbound_queue.db oder Redis
+- In-Process-LRU mit TTL (nur Entwicklung mit einem Worker), begrenzt nach Anzahl und Speicher
+- O(1) pro Nachricht, keine Datenbankabfrage bis der Ablauf abgeschlossen ist
+- Metriken: Treffer, Verdrängungen (LRU, TTL, Speicher)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from inbound_queue import InboundQueueConfig, SQLiteFile
+
+logger = logging.getLogger('ConversationSessions')
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class SessionConfig:
+    """Conversation Session Konfiguration"""
+
+    # 'sqlite' oder 'redis' (alle Worker sehen dieselbe Session); 'memory' nur mit einem Worker
+    BACKEND = os.getenv('CONVERSATION_SESSION_BACKEND', InboundQueueConfig.BACKEND)
+    SQLITE_PATH = os.getenv('CONVERSATION_SESSION_PATH', os.path.join(
+        os.path.dirname(os.path.abspath(InboundQueueConfig.SQLITE_PATH)), 'conversation_sessions.db'))
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+    TTL_SECONDS = int(os.getenv('CONVERSATION_SESSION_TTL', '1800'))
+    MAX_SESSIONS = int(os.getenv('CONVERSATION_SESSION_MAX', '10000'))
+    MAX_BYTES = int(os.getenv('CONVERSATION_SESSION_MAX_BYTES', str(16 * 1024 * 1024)))
+    # Einzelne Antworten werden gekürzt, damit eine Session klein bleibt
+    MAX_FIELD_CHARS = int(os.getenv('CONVERSATION_SESSION_MAX_FIELD_CHARS', '1000'))
+
+
+# =============================================================================
+# STORES
+# =============================================================================
+
+class MemorySessionStore:
+    """LRU mit TTL; Sessions als JSON-Strings, damit der Speicherbedarf messbar bleibt"""
+
+    def __init__(self, ttl: float, max_sessions: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'evicted_lru': 0, 'evicted_ttl': 0, 'evicted_memory': 0}
+
+    def _drop(self, key: str):
+        raw, _ = self._entries.pop(key)
+        self._bytes -= len(raw)
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.metrics['misses'] += 1
+                return None
+            if entry[1] <= now:
+                self._drop(key)
+                self.metrics['evicted_ttl'] += 1
+                self.metrics['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics['hits'] += 1
+            return json.loads(entry[0])
+
+    def set(self, key: str, session: dict):
+        raw = json.dumps(session, separators=(',', ':'))
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (raw, time.monotonic() + self.ttl)
+            self._bytes += len(raw)
+            while len(self._entries) > self.max_sessions:
+                self._drop(next(iter(self._entries)))
+                self.metrics['evicted_lru'] += 1
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+                self.metrics['evicted_memory'] += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.metrics, 'sessions': len(self._entries), 'bytes': self._bytes}
+
+
+class SQLiteSessionStore(SQLiteFile):
+    """Sessions geteilt zwischen Worker-Prozessen in einer WAL-Datei; abgelaufene werden nebenbei gelöscht"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS conversation_sessions (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS ix_conversation_sessions_expires_at ON conversation_sessions (expires_at);
+    """
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._writes = 0
+        self.metrics = {'hits': 0, 'misses': 0}
+        super().__init__(path)
+
+    def get(self, key: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT data FROM conversation_sessions WHERE key = ? AND expires_at > ?",
+                                   (key, time.time())).fetchone()
+        self.metrics['hits' if row else 'misses'] += 1
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, session: dict):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO conversation_sessions (key, data, expires_at) VALUES (?, ?, ?)",
+                     (key, json.dumps(session, separators=(',', ':')), now + self.ttl))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM conversation_sessions WHERE expires_at <= ?", (now,))
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM conversation_sessions WHERE key = ?", (key,))
+
+    def stats(self) -> dict:
+        sessions = self._conn().execute("SELECT count(*) FROM conversation_sessions WHERE expires_at > ?",
+                                        (time.time(),)).fetchone()[0]
+        return {**self.metrics, 'sessions': sessions}
+
+
+class RedisSessionStore:
+    """Sessions geteilt zwischen Workern; Redis übernimmt TTL und Verdrängung (maxmemory)"""
+
+    PREFIX = 'conversation:'
+
+    def __init__(self, url: str, ttl: float):
+        import redis
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.ttl = int(ttl)
+        self.metrics = {'hits': 0, 'misses': 0}
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self.redis.get(self.PREFIX + key)
+        self.metrics['hits' if raw else 'misses'] += 1
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, session: dict):
+        self.redis.set(self.PREFIX + key, json.dumps(session, separators=(',', ':')), ex=self.ttl)
+
+    def delete(self, key: str):
+        self.redis.delete(self.PREFIX + key)
+
+    def stats(self) -> dict:
+        return dict(self.metrics)
+
+
+# =============================================================================
+# STATE MACHINE
+# =============================================================================
+
+class Flow:
+    """Ein Ablauf: Felder der Reihe nach abfragen, am Ende on_complete aufrufen"""
+
+    def __init__(self, name: str, steps: list, completed_message: str):
+        self.name = name
+        self.steps = steps  # [(feld, frage), ...]
+        self.completed_message = completed_message
+
+
+class ConversationSessions:
+    """Führt Absender durch Abläufe; on_complete(flow, sender, name, fields) speichert das Ergebnis"""
+
+    CANCEL_WORDS = frozenset({'abbrechen', 'abbruch', 'stop', 'stopp', 'cancel'})
+
+    def __init__(self, flows: dict, store=None, config=SessionConfig,
+                 on_complete: Optional[Callable[[str, str, str, dict], None]] = None):
+        self.flows = flows
+        self.config = config
+        self.store = store or self._create_store()
+        self.on_complete = on_complete
+        self.metrics = {'started': 0, 'completed': 0, 'cancelled': 0, 'store_errors': 0, 'complete_errors': 0}
+
+    def _create_store(self):
+        if self.config.BACKEND == 'redis':
+            try:
+                return RedisSessionStore(self.config.REDIS_URL, self.config.TTL_SECONDS)
+            except ImportError:
+                logger.warning("redis nicht installiert - Sessions in SQLite")
+        if self.config.BACKEND == 'memory':
+            logger.warning("Sessions nur im Prozessspeicher - nur für einen einzelnen Worker geeignet")
+            return MemorySessionStore(self.config.TTL_SECONDS, self.config.MAX_SESSIONS, self.config.MAX_BYTES)
+        return SQLiteSessionStore(self.config.SQLITE_PATH, self.config.TTL_SECONDS)
+
+    def start(self, sender: str, flow_name: str, name: str = None, message_id: str = None,
+              intro: str = None) -> str:
+        """Startet einen Ablauf und gibt die erste Frage zurück (mit intro davor)
+
+        Die Antwort wird mit message_id gespeichert: wird dieselbe Nachricht
+        erneut zugestellt, liefert handle() sie unverändert noch einmal.
+        """
+        flow = self.flows[flow_name]
+        reply = f"{intro}\n\n{flow.steps[0][1]}" if intro else flow.steps[0][1]
+        self._save(sender, {'flow': flow_name, 'step': 0, 'name': name, 'fields': {},
+                            'last': message_id, 'reply': reply})
+        self.metrics['started'] += 1
+        return reply
+
+    def handle(self, sender: str, text: str, message_id: str = None) -> Optional[str]:
+        """Antwort, wenn der Absender in einem Ablauf steckt, sonst None
+
+        message_id macht Wiederholungen der Inbound Queue idempotent: dieselbe
+        Nachricht bekommt dieselbe Antwort, ohne einen Schritt weiterzuzählen.
+        Ein abgeschlossener Ablauf bleibt bis zur TTL als Marker stehen, damit
+        auch die letzte Antwort wiederholt wird, ohne on_complete erneut
+        auszulösen.
+        """
+        try:
+            session = self.store.get(sender)
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Conversation session store error: {e}")
+            return None
+        if session is not None and 'completed' in session:
+            if message_id is not None and session['completed'] == message_id:
+                return session['reply']
+            return None
+        if session is None or session.get('flow') not in self.flows:
+            return None
+
+        if text.strip().lower() in self.CANCEL_WORDS:
+            self._delete(sender)
+            self.metrics['cancelled'] += 1
+            return 'Alles klar, ich habe die Anfrage abgebrochen. Schreiben Sie "hilfe" für alle Optionen.'
+
+        flow = self.flows[session['flow']]
+        if message_id is not None and session.get('last') == message_id:
+            return session.get('reply') or flow.steps[session['step']][1]
+        field, _ = flow.steps[session['step']]
+        session['fields'][field] = text.strip()[:self.config.MAX_FIELD_CHARS]
+        session['step'] += 1
+        if session['step'] < len(flow.steps):
+            session['last'], session['reply'] = message_id, flow.steps[session['step']][1]
+            self._save(sender, session)
+            return session['reply']
+
+        # Marker vor on_complete: eine erneut zugestellte Nachricht legt keinen zweiten Lead/Task an
+        self._save(sender, {'completed': message_id, 'reply': flow.completed_message})
+        if self.on_complete is not None:
+            try:
+                self.on_complete(flow.name, sender, session.get('name'), session['fields'])
+            except Exception:
+                # Ablauf nicht verlieren: erneut zugestellte Nachricht beginnt ihn neu
+                self.metrics['complete_errors'] += 1
+                self._save(sender, {**session, 'step': session['step'] - 1, 'last': None})
+                raise
+        self.metrics['completed'] += 1
+        return flow.completed_message
+
+    def _save(self, sender: str, session: dict):
+        try:
+            self.store.set(sender, session)
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Conversation session store error: {e}")
+
+    def _delete(self, sender: str):
+        try:
+            self.store.delete(sender)
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Conversation session store error: {e}")
+
+    def stats(self) -> dict:
+        return {**self.metrics, **self.store.stats()}
+
+
+if __name__ == '__main__':
+    print("Conversation Sessions Module loaded")
+    print(f"Backend: {SessionConfig.BACKEND}")
+    print(f"TTL: {SessionConfig.TTL_SECONDS}s, max {SessionConfig.MAX_SESSIONS} Sessions")
@@ -591,8 +591,10 @@ def datenschutz():
 # COOKIE BANNER COMPONENT
 # =============================================================================
 
+COOKIE_BANNER_MARKER = 'id="cookie-banner-js"'
+
 COOKIE_BANNER_JS = """
-<script>
+<script id="cookie-banner-js">
 (function() {
     const COOKIE_NAME = 'cookie_consent';
     
@@ -684,14 +686,111 @@ COOKIE_BANNER_JS = """
 """
 
 
-def inject_cookie_banner(response):
-    """Injiziert Cookie-Banner in HTML-Responses"""
-    if response.content_type and 'text/html' in response.content_type:
-        data = response.get_data(as_text=True)
-        if '</body>' in data:
-            data = data.replace('</body>', COOKIE_BANNER_JS + '</body>')
-            response.set_data(data)
-    return response
+def with_cookie_banner(html: str) -> str:
+    """Fügt den Cookie-Banner vor </body> ein, sofern noch nicht vorhanden"""
+    if COOKIE_BANNER_MARKER in html or '</body>' not in html:
+        return html
+    head, _, tail = html.rpartition('</body>')
+    return head + COOKIE_BANNER_JS + '</body>' + tail
+
+
+class CookieBannerMiddleware:
+    """WSGI-Middleware: fügt den Cookie-Banner direkt im Byte-Stream vor </body> ein
+
+    Gesucht wird nur im letzten TAIL_WINDOW Bytes des Bodys. Komprimierte,
+    gestreamte (ohne Content-Length) und Nicht-HTML-Responses sowie Seiten,
+    die den Banner bereits enthalten, werden unverändert durchgereicht.
+    """
+
+    TAIL_WINDOW = 256 * 1024
+    BANNER = COOKIE_BANNER_JS.encode('utf-8')
+    MARKER = COOKIE_BANNER_MARKER.encode('utf-8')
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        deferred = {}
+
+        def capture(status, headers, exc_info=None):
+            length = self._injectable(environ, status, headers)
+            if length is None:
+                return start_response(status, headers, exc_info)
+            deferred.update(status=status, headers=headers, exc_info=exc_info, length=length)
+            return deferred.setdefault('written', []).append
+
+        app_iter = self.wsgi_app(environ, capture)
+        if not deferred:
+            return app_iter
+        return self._inject(app_iter, deferred, start_response)
+
+    def _injectable(self, environ, status, headers):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or not status.startswith('200'):
+            return None
+        content_type = length = None
+        for name, value in headers:
+            key = name.lower()
+            if key == 'content-encoding':
+                return None
+            if key == 'content-type':
+                content_type = value.lower()
+            elif key == 'content-length':
+                length = value
+        if not content_type or 'text/html' not in content_type:
+            return None
+        if 'charset' in content_type and 'utf-8' not in content_type:
+            return None
+        if length is None or not length.isdigit():
+            return None
+        return int(length)
+
+    def _inject(self, app_iter, deferred, start_response):
+        length = deferred['length']
+        tail_start = max(length - self.TAIL_WINDOW, 0)
+        tail = []
+        offset = 0
+        started = False
+        try:
+            chunks = deferred.get('written', [])
+            for chunk in (*chunks, *app_iter) if chunks else app_iter:
+                if not chunk:
+                    continue
+                end = offset + len(chunk)
+                if end <= tail_start:
+                    # Vor dem Tail-Fenster: unverändert weiterreichen
+                    if not started:
+                        self._start(start_response, deferred, None)
+                        started = True
+                    yield chunk
+                elif offset >= tail_start:
+                    tail.append(chunk)
+                else:
+                    if not started:
+                        self._start(start_response, deferred, None)
+                        started = True
+                    cut = tail_start - offset
+                    yield chunk[:cut]
+                    tail.append(chunk[cut:])
+                offset = end
+
+            body = b''.join(tail)
+            pos = body.rfind(b'</body>')
+            if pos != -1 and self.MARKER not in body:
+                body = body[:pos] + self.BANNER + body[pos:]
+            if not started:
+                self._start(start_response, deferred, len(body))
+            if body:
+                yield body
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    @staticmethod
+    def _start(start_response, deferred, length):
+        headers = [(k, v) for k, v in deferred['headers'] if k.lower() != 'content-length']
+        if length is not None:
+            headers.append(('Content-Length', str(length)))
+        start_response(deferred['status'], headers, deferred['exc_info'])
 
 
 # =============================================================================
@@ -802,7 +901,7 @@ def register_gdpr_blueprints(app):
     app.register_blueprint(legal_bp)
     
     # Cookie Banner für alle HTML-Responses
-    app.after_request(inject_cookie_banner)
+    app.wsgi_app = CookieBannerMiddleware(app.wsgi_app)
     
     print("✅ GDPR & Legal Blueprints registered")
 
@@ -0,0 +1,55 @@
+# =============================================================================
+# WEST MONEY OS - GUNICORN PRODUCTION CONFIG
+# =============================================================================
+# Start:      python run_server.py            (oder: gunicorn -c gunicorn.conf.py app:app)
+# Reload:     kill -HUP <master-pid>          Worker werden nacheinander ersetzt
+# Code-Update mit preload_app: kill -USR2 <master-pid>, danach -QUIT an den alten Master
+#
+# Alle Werte lassen sich per Umgebungsvariable überschreiben.
+
+import os
+import multiprocessing
+
+_cpus = multiprocessing.cpu_count()
+
+# Direkt erreichbar: TRUSTED_PROXY_HOPS=0 lassen; hinter nginx auf 127.0.0.1 binden und TRUSTED_PROXY_HOPS=1 setzen
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+# Worker: 2 x CPU + 1 (gunicorn-Empfehlung), gedeckelt damit SQLite/Postgres nicht überlaufen
+workers = int(os.getenv('WEB_CONCURRENCY', min(_cpus * 2 + 1, int(os.getenv('WEB_MAX_WORKERS', '12')))))
+# Threads pro Worker fangen I/O-Wartezeiten ab (DB, Graph API, ElevenLabs)
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '4'))
+
+# Verbindungen und Zeitlimits
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+timeout = int(os.getenv('WEB_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+limit_request_line = 8190
+limit_request_fields = 100
+
+# Worker regelmäßig recyceln (Speicherlecks in Fremdbibliotheken)
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', '500'))
+
+# App einmal im Master laden; on_starting legt Tabellen an und seedet den Admin nur einmal
+preload_app = True
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+proc_name = 'westmoney'
+
+
+def on_starting(server):
+    """Einmal im Master vor dem Forken: Tabellen, Admin-Seeding, Agent-Registry"""
+    from app import initialize_app
+    initialize_app()
+
+
+def post_fork(server, worker):
+    """Vom Master geerbte DB-Verbindungen nicht im Worker weiterverwenden, Hintergrund-Worker starten"""
+    from app import app, db, start_background_workers
+    with app.app_context():
+        db.engine.dispose(close=False)
+    start_background_workers()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+🌐 WEST MONEY OS - HTTP CLIENT 🌐
+Gemeinsamer ausgehender HTTP-Client für Graph API, ElevenLabs, Anthropic und Alerts
+
+Features:
+- Eine requests.Session pro Prozess: Connection-Pool pro Host, Keep-Alive
+- Connect- und Read-Timeout als Standard (kein Aufruf ohne Timeout)
+- Wiederholungen bei 429/5xx und Verbindungsfehlern mit Jitter, Retry-After wird beachtet
+  (POST nur bei 429/503 mit Retry-After oder wenn die Verbindung nie zustande kam)
+- Latenz-Histogramme pro Upstream (für /api/health/details)
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger('HttpClient')
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class HttpClientConfig:
+    """HTTP Client Konfiguration"""
+
+    CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))
+    READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '15'))
+
+    # Anzahl gepoolter Hosts und Verbindungen pro Host
+    POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '16'))
+    POOL_SIZE_PER_HOST = int(os.getenv('HTTP_POOL_SIZE_PER_HOST', '20'))
+
+    MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+    BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.25'))
+    BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '5'))
+
+    RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+    # POST & Co.: nur wenn der Server ausdrücklich 'nicht verarbeitet, später erneut' meldet
+    NON_IDEMPOTENT_RETRY_STATUS = frozenset({429, 503})
+    IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+class LatencyHistogram:
+    """Feste Buckets in Millisekunden, wie Prometheus 'le'"""
+
+    BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.status = {}
+
+    def observe(self, ms: float, status: Optional[int]):
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total_ms += ms
+        self.requests += 1
+        key = f'{status // 100}xx' if status else 'error'
+        self.status[key] = self.status.get(key, 0) + 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Obere Bucket-Grenze, unter der p Prozent der Anfragen liegen"""
+        if not self.requests:
+            return None
+        rank, seen = p / 100 * self.requests, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else '+Inf'
+        return '+Inf'
+
+    def snapshot(self) -> dict:
+        buckets = {f'le_{b}': c for b, c in zip(self.BUCKETS_MS, self.counts)}
+        buckets['le_inf'] = self.counts[-1]
+        return {
+            'requests': self.requests, 'errors': self.errors, 'retries': self.retries, 'status': dict(self.status),
+            'avg_ms': round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+            'p50_ms': self.percentile(50), 'p99_ms': self.percentile(99),
+            'buckets': buckets
+        }
+
+
+# =============================================================================
+# CLIENT
+# =============================================================================
+
+class HttpClient:
+    """Gepoolter Client; eine Instanz pro Prozess teilen"""
+
+    def __init__(self, config=HttpClientConfig):
+        self.config = config
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    @property
+    def session(self) -> requests.Session:
+        # Nach fork() keine Sockets des Elternprozesses weiterverwenden
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.config.POOL_HOSTS,
+                        pool_maxsize=self.config.POOL_SIZE_PER_HOST,
+                        max_retries=0
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session, self._pid = session, os.getpid()
+        return self._session
+
+    def _histogram(self, upstream: str) -> LatencyHistogram:
+        histogram = self._histograms.get(upstream)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(upstream, LatencyHistogram())
+        return histogram
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.config.BACKOFF_MAX)
+        ceiling = min(self.config.BACKOFF_MAX, self.config.BACKOFF_BASE * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def _before_send(error: requests.RequestException) -> bool:
+        """Fehler beim Verbindungsaufbau: die Anfrage hat die Gegenseite sicher nicht erreicht"""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if not isinstance(error, requests.ConnectionError):
+            return False
+        reason = error.args[0] if error.args else None
+        reason = getattr(reason, 'reason', reason)
+        return isinstance(reason, NewConnectionError)
+
+    def _retryable_response(self, method: str, response: requests.Response) -> bool:
+        if method in self.config.IDEMPOTENT_METHODS:
+            return response.status_code in self.config.RETRY_STATUS
+        # 500/502/504 nach einem POST: die Gegenseite hat evtl. schon gesendet/gebucht
+        return (response.status_code in self.config.NON_IDEMPOTENT_RETRY_STATUS
+                and bool(response.headers.get('Retry-After', '').strip()))
+
+    def request(self, method: str, url: str, upstream: str = None, timeout=None,
+                retries: int = None, **kwargs) -> requests.Response:
+        """Wie requests.request, mit Standard-Timeout, Wiederholungen und Metriken
+
+        Nicht-idempotente Anfragen (POST) werden nur wiederholt, wenn die
+        Verbindung gar nicht zustande kam oder die Antwort 429/503 mit
+        Retry-After ist. Nach einem Read-Timeout, einem Verbindungsabbruch
+        (z.B. veraltetes Keep-Alive-Socket) oder 500/502/504 hat die Gegenseite
+        sie evtl. schon verarbeitet.
+        """
+        method = method.upper()
+        upstream = upstream or urlsplit(url).hostname or 'unknown'
+        timeout = timeout or (self.config.CONNECT_TIMEOUT, self.config.READ_TIMEOUT)
+        if isinstance(timeout, (int, float)):
+            timeout = (self.config.CONNECT_TIMEOUT, timeout)
+        retries = self.config.MAX_RETRIES if retries is None else retries
+        histogram = self._histogram(upstream)
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                histogram.observe((time.perf_counter() - start) * 1000, None)
+                histogram.errors += 1
+                if method in self.config.IDEMPOTENT_METHODS:
+                    retryable = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                else:
+                    retryable = self._before_send(e)
+                if attempt >= retries or not retryable:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                histogram.observe((time.perf_counter() - start) * 1000, response.status_code)
+                if attempt >= retries or not self._retryable_response(method, response):
+                    return response
+                delay = self._backoff(attempt, response)
+                response.close()
+            attempt += 1
+            histogram.retries += 1
+            logger.warning(f"{upstream}: retry {attempt}/{retries} for {method} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def metrics(self) -> dict:
+        return {name: histogram.snapshot() for name, histogram in list(self._histograms.items())}
+
+
+# Prozessweit geteilte Instanz
+http_client = HttpClient()
+
+
+if __name__ == '__main__':
+    print("HTTP Client Module loaded")
+    print(f"Timeouts: connect={HttpClientConfig.CONNECT_TIMEOUT}s read={HttpClientConfig.READ_TIMEOUT}s")
+    print(f"Pool: {HttpClientConfig.POOL_HOSTS} Hosts x {HttpClientConfig.POOL_SIZE_PER_HOST} Verbindungen")
@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""
+📥 WEST MONEY OS - INBOUND QUEUE 📥
+Persistente Warteschlange für eingehende Webhook-Nachrichten
+
+Features:
+- Webhook bestätigt sofort (200), Verarbeitung läuft im Hintergrund
+- SQLite-Datei als Standard, optional Redis (mehrere Server)
+- Worker-Pool mit Reihenfolge pro Absender (ein Job pro Absender gleichzeitig)
+- Wiederholungen mit exponentiellem Backoff, danach 'dead' zur Nachkontrolle
+- Leases: Jobs abgestürzter Worker werden nach Ablauf erneut vergeben
+- Deduplizierung nach Nachrichten-ID (rotierendes Set + SQLite/Redis, begrenzte TTL)
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import sqlite3
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger('InboundQueue')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class InboundQueueConfig:
+    """Inbound Queue Konfiguration"""
+
+    # 'sqlite' oder 'redis'
+    BACKEND = os.getenv('INBOUND_QUEUE_BACKEND', 'sqlite')
+    SQLITE_PATH = os.getenv('INBOUND_QUEUE_PATH', os.path.join(BASE_DIR, 'instance', 'inbound_queue.db'))
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+    WORKERS = int(os.getenv('INBOUND_QUEUE_WORKERS', '4'))
+    MAX_ATTEMPTS = int(os.getenv('INBOUND_QUEUE_MAX_ATTEMPTS', '5'))
+    RETRY_BASE_SECONDS = float(os.getenv('INBOUND_QUEUE_RETRY_BASE_SECONDS', '2'))
+    RETRY_MAX_SECONDS = float(os.getenv('INBOUND_QUEUE_RETRY_MAX_SECONDS', '300'))
+    # Ein Job gilt nach dieser Zeit als verwaist und wird neu vergeben
+    LEASE_SECONDS = float(os.getenv('INBOUND_QUEUE_LEASE_SECONDS', '60'))
+    POLL_INTERVAL = float(os.getenv('INBOUND_QUEUE_POLL_MS', '500')) / 1000
+
+    # Meta stellt Webhooks bis zu 7 Tage lang erneut zu
+    DEDUP_TTL_SECONDS = int(os.getenv('INBOUND_DEDUP_TTL_SECONDS', str(7 * 24 * 3600)))
+    DEDUP_MEMORY_SIZE = int(os.getenv('INBOUND_DEDUP_MEMORY_SIZE', '100000'))
+
+
+class Job:
+    __slots__ = ('id', 'sender', 'payload', 'attempts', 'lease')
+
+    def __init__(self, id, sender: str, payload: dict, attempts: int = 0, lease=None):
+        self.id = id
+        self.sender = sender
+        self.payload = payload
+        self.attempts = attempts
+        # Redis: Lease-Ablauf als Besitznachweis für complete/retry
+        self.lease = lease
+
+
+# =============================================================================
+# STORES
+# =============================================================================
+
+class SQLiteFile:
+    """Eine Verbindung pro Thread und Prozess auf dieselbe WAL-Datei"""
+
+    SCHEMA = ''
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+
+class SQLiteInboundStore(SQLiteFile):
+    """Jobs in einer SQLite-Datei; WAL erlaubt parallele Zugriffe mehrerer Worker-Prozesse"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS inbound_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL,
+            leased_until REAL,
+            last_error TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_inbound_jobs_status_sender_id ON inbound_jobs (status, sender, id);
+    """
+
+    def enqueue(self, sender: str, payload: dict) -> int:
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO inbound_jobs (sender, payload, available_at, created_at) VALUES (?, ?, ?, ?)",
+            (sender, json.dumps(payload, separators=(',', ':')), now, now)
+        )
+        return cur.lastrowid
+
+    def enqueue_many(self, items: list):
+        """Alle Nachrichten eines Webhooks in einer Transaktion (ein WAL-Commit statt N)"""
+        now = time.time()
+        rows = [(sender, json.dumps(payload, separators=(',', ':')), now, now) for sender, payload in items]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO inbound_jobs (sender, payload, available_at, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, lease_seconds: float) -> Optional[Job]:
+        """Ältester fälliger Job, dessen Absender keinen früheren offenen Job hat"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT j.id, j.sender, j.payload, j.attempts FROM inbound_jobs j
+                WHERE j.status = 'pending' AND j.available_at <= ?
+                  AND (j.leased_until IS NULL OR j.leased_until < ?)
+                  AND j.id = (SELECT min(p.id) FROM inbound_jobs p WHERE p.status = 'pending' AND p.sender = j.sender)
+                ORDER BY j.id LIMIT 1
+                """,
+                (now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE inbound_jobs SET leased_until = ? WHERE id = ?", (now + lease_seconds, row[0]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return Job(row[0], row[1], json.loads(row[2]), row[3])
+
+    def complete(self, job: Job):
+        self._conn().execute("DELETE FROM inbound_jobs WHERE id = ?", (job.id,))
+
+    def retry(self, job: Job, delay: float, error: str):
+        self._conn().execute(
+            "UPDATE inbound_jobs SET attempts = attempts + 1, available_at = ?, leased_until = NULL, last_error = ? "
+            "WHERE id = ?",
+            (time.time() + delay, error[:500], job.id)
+        )
+
+    def dead(self, job: Job, error: str):
+        self._conn().execute(
+            "UPDATE inbound_jobs SET status = 'dead', attempts = attempts + 1, leased_until = NULL, last_error = ? "
+            "WHERE id = ?",
+            (error[:500], job.id)
+        )
+
+    def counts(self) -> dict:
+        rows = self._conn().execute("SELECT status, count(*) FROM inbound_jobs GROUP BY status").fetchall()
+        return {'pending': 0, 'dead': 0, **dict(rows)}
+
+
+class RedisInboundStore:
+    """Eine Liste pro Absender; 'ready' enthält Absender, deren Kopf-Job frei ist
+
+    Jeder Absender steht in genau einer von 'ready', 'delayed' oder 'leases' -
+    oder nirgends, wenn seine Liste leer ist. Alle Übergänge laufen als
+    Lua-Skript, damit kein Absender doppelt in 'ready' landet oder nach einem
+    Absturz zwischen zwei Befehlen verloren geht.
+    """
+
+    PREFIX = 'inbound_queue:'
+
+    # KEYS: ready, Absenderlisten...; ARGV: Absender, Body, Absender, Body...
+    ENQUEUE = """
+        for i = 2, #KEYS do
+            if redis.call('RPUSH', KEYS[i], ARGV[2 * i - 2]) == 1 then
+                redis.call('RPUSH', KEYS[1], ARGV[2 * i - 3])
+            end
+        end
+    """
+
+    # KEYS: ready, delayed, leases; ARGV: now, Lease-Ablauf, Präfix der Absenderlisten
+    CLAIM = """
+        for _, zset in ipairs({KEYS[2], KEYS[3]}) do
+            for _, sender in ipairs(redis.call('ZRANGEBYSCORE', zset, 0, ARGV[1], 'LIMIT', 0, 100)) do
+                redis.call('ZREM', zset, sender)
+                redis.call('RPUSH', KEYS[1], sender)
+            end
+        end
+        while true do
+            local sender = redis.call('LPOP', KEYS[1])
+            if not sender then return false end
+            local head = redis.call('LINDEX', ARGV[3] .. sender, 0)
+            if head then
+                redis.call('ZADD', KEYS[3], ARGV[2], sender)
+                return {sender, head}
+            end
+        end
+    """
+
+    # KEYS: Absenderliste, leases, ready, dead; ARGV: Absender, Job-ID, Lease, Dead-Body oder ''
+    COMPLETE = """
+        local owned = tonumber(redis.call('ZSCORE', KEYS[2], ARGV[1])) == tonumber(ARGV[3])
+        local job_id = tonumber(ARGV[2])
+        local head = redis.call('LINDEX', KEYS[1], 0)
+        local removed = 0
+        if head and cjson.decode(head)['id'] == job_id then
+            removed = redis.call('LREM', KEYS[1], 1, head)
+        else
+            for _, item in ipairs(redis.call('LRANGE', KEYS[1], 0, -1)) do
+                if cjson.decode(item)['id'] == job_id then
+                    removed = redis.call('LREM', KEYS[1], 1, item)
+                    break
+                end
+            end
+        end
+        if removed > 0 and ARGV[4] ~= '' then
+            redis.call('RPUSH', KEYS[4], ARGV[4])
+        end
+        -- Abgelaufene Lease: der Absender steht schon wieder in 'ready' oder bei einem anderen Worker
+        if owned then
+            redis.call('ZREM', KEYS[2], ARGV[1])
+            if redis.call('LLEN', KEYS[1]) > 0 then
+                redis.call('RPUSH', KEYS[3], ARGV[1])
+            end
+        end
+        return removed
+    """
+
+    # KEYS: Absenderliste, leases, delayed; ARGV: Absender, Job-ID, Lease, neuer Body, fällig ab
+    RETRY = """
+        if tonumber(redis.call('ZSCORE', KEYS[2], ARGV[1])) ~= tonumber(ARGV[3]) then return 0 end
+        local head = redis.call('LINDEX', KEYS[1], 0)
+        if head and cjson.decode(head)['id'] == tonumber(ARGV[2]) then
+            redis.call('LSET', KEYS[1], 0, ARGV[4])
+        end
+        redis.call('ZREM', KEYS[2], ARGV[1])
+        redis.call('ZADD', KEYS[3], ARGV[5], ARGV[1])
+        return 1
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self.redis = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+        self.ready = self.PREFIX + 'ready'
+        self.delayed = self.PREFIX + 'delayed'
+        self.leases = self.PREFIX + 'leases'
+        self.dead_list = self.PREFIX + 'dead'
+        self._enqueue = self.redis.register_script(self.ENQUEUE)
+        self._claim = self.redis.register_script(self.CLAIM)
+        self._complete = self.redis.register_script(self.COMPLETE)
+        self._retry = self.redis.register_script(self.RETRY)
+
+    def _sender_key(self, sender: str) -> str:
+        return f'{self.PREFIX}sender:{sender}'
+
+    @staticmethod
+    def _body(job_id, sender: str, payload: dict, attempts: int, error: Optional[str] = None) -> str:
+        data = {'id': job_id, 'sender': sender, 'payload': payload, 'attempts': attempts}
+        if error is not None:
+            data['last_error'] = error[:500]
+        return json.dumps(data, separators=(',', ':'))
+
+    def enqueue(self, sender: str, payload: dict) -> int:
+        job_id = self.redis.incr(self.PREFIX + 'seq')
+        self._enqueue(keys=[self.ready, self._sender_key(sender)],
+                      args=[sender, self._body(job_id, sender, payload, 0)])
+        return job_id
+
+    def enqueue_many(self, items: list):
+        first_id = self.redis.incrby(self.PREFIX + 'seq', len(items)) - len(items) + 1
+        keys, args = [self.ready], []
+        for offset, (sender, payload) in enumerate(items):
+            keys.append(self._sender_key(sender))
+            args += [sender, self._body(first_id + offset, sender, payload, 0)]
+        self._enqueue(keys=keys, args=args)
+
+    def claim(self, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        lease = repr(now + lease_seconds)
+        result = self._claim(keys=[self.ready, self.delayed, self.leases],
+                             args=[repr(now), lease, self.PREFIX + 'sender:'])
+        if not result:
+            return None
+        sender, head = result[0].decode(), json.loads(result[1])
+        return Job(head['id'], sender, head['payload'], head['attempts'], lease=lease)
+
+    def _finish(self, job: Job, dead_body: str = ''):
+        self._complete(keys=[self._sender_key(job.sender), self.leases, self.ready, self.dead_list],
+                       args=[job.sender, job.id, job.lease or '', dead_body])
+
+    def complete(self, job: Job):
+        self._finish(job)
+
+    def retry(self, job: Job, delay: float, error: str):
+        self._retry(keys=[self._sender_key(job.sender), self.leases, self.delayed],
+                    args=[job.sender, job.id, job.lease or '',
+                          self._body(job.id, job.sender, job.payload, job.attempts + 1, error),
+                          repr(time.time() + delay)])
+
+    def dead(self, job: Job, error: str):
+        self._finish(job, self._body(job.id, job.sender, job.payload, job.attempts + 1, error))
+
+    def counts(self) -> dict:
+        return {'ready_senders': self.redis.llen(self.ready), 'dead': self.redis.llen(self.dead_list)}
+
+
+# =============================================================================
+# DEDUPLICATION
+# =============================================================================
+
+class SQLiteSeenIds(SQLiteFile):
+    """Gesehene IDs prozessübergreifend; INSERT OR IGNORE entscheidet atomar"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS seen_ids (
+            key TEXT PRIMARY KEY,
+            seen_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS ix_seen_ids_seen_at ON seen_ids (seen_at);
+    """
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._inserts = 0
+        super().__init__(path)
+
+    def add(self, key: str) -> bool:
+        now = time.time()
+        conn = self._conn()
+        cur = conn.execute("INSERT OR IGNORE INTO seen_ids (key, seen_at) VALUES (?, ?)", (key, now))
+        if cur.rowcount == 0:
+            # Abgelaufene Einträge zählen nicht als Duplikat
+            cur = conn.execute("UPDATE seen_ids SET seen_at = ? WHERE key = ? AND seen_at < ?", (now, key, now - self.ttl))
+            if cur.rowcount == 0:
+                return False
+        self._inserts += 1
+        if self._inserts % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM seen_ids WHERE seen_at < ?", (now - self.ttl,))
+        return True
+
+    def contains(self, key: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM seen_ids WHERE key = ? AND seen_at >= ?",
+                                    (key, time.time() - self.ttl)).fetchone() is not None
+
+    def discard(self, key: str):
+        self._conn().execute("DELETE FROM seen_ids WHERE key = ?", (key,))
+
+
+class RedisSeenIds:
+    PREFIX = 'inbound_seen:'
+
+    def __init__(self, url: str, ttl: float):
+        import redis
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.ttl = int(ttl)
+
+    def add(self, key: str) -> bool:
+        return bool(self.redis.set(self.PREFIX + key, 1, nx=True, ex=self.ttl))
+
+    def contains(self, key: str) -> bool:
+        return bool(self.redis.exists(self.PREFIX + key))
+
+    def discard(self, key: str):
+        self.redis.delete(self.PREFIX + key)
+
+
+class MessageDeduplicator:
+    """Erkennt erneut zugestellte Nachrichten- und Status-IDs
+
+    Vorne ein rotierendes Set aus zwei Generationen im Speicher (O(1), ohne I/O
+    für die häufigen Wiederholungen im selben Worker), dahinter der gemeinsame
+    Store, damit auch andere Worker-Prozesse die ID kennen.
+    """
+
+    def __init__(self, shared=None, config=InboundQueueConfig):
+        self.config = config
+        self.shared = shared or self._create_shared()
+        self._current, self._previous = set(), set()
+        self._rotated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.metrics = {'checked': 0, 'duplicates': 0, 'store_errors': 0}
+
+    def _create_shared(self):
+        if self.config.BACKEND == 'redis':
+            try:
+                return RedisSeenIds(self.config.REDIS_URL, self.config.DEDUP_TTL_SECONDS)
+            except ImportError:
+                logger.warning("redis nicht installiert - Deduplizierung nutzt SQLite")
+        return SQLiteSeenIds(self.config.SQLITE_PATH, self.config.DEDUP_TTL_SECONDS)
+
+    def _remember(self, key: str):
+        # Generation wechseln nach halber TTL oder halber Kapazität
+        now = time.monotonic()
+        if (now - self._rotated_at >= self.config.DEDUP_TTL_SECONDS / 2
+                or len(self._current) >= self.config.DEDUP_MEMORY_SIZE // 2):
+            self._previous, self._current = self._current, set()
+            self._rotated_at = now
+        self._current.add(key)
+
+    def first_seen(self, key: str) -> bool:
+        """True genau einmal pro ID; markiert sie gleichzeitig als gesehen"""
+        with self._lock:
+            self.metrics['checked'] += 1
+            if key in self._current or key in self._previous:
+                self.metrics['duplicates'] += 1
+                return False
+        try:
+            new = self.shared.add(key)
+        except Exception as e:
+            # Ohne Store lieber doppelt antworten als Nachrichten verlieren
+            self.metrics['store_errors'] += 1
+            logger.error(f"Dedup store error: {e}")
+            new = True
+        with self._lock:
+            self._remember(key)
+            if not new:
+                self.metrics['duplicates'] += 1
+        return new
+
+    def seen(self, key: str) -> bool:
+        """Nur prüfen, nicht markieren - für Events, die erst nach dem Schreiben als gesehen gelten"""
+        with self._lock:
+            self.metrics['checked'] += 1
+            if key in self._current or key in self._previous:
+                self.metrics['duplicates'] += 1
+                return True
+        try:
+            seen = self.shared.contains(key)
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Dedup store error: {e}")
+            return False
+        if seen:
+            with self._lock:
+                self._remember(key)
+                self.metrics['duplicates'] += 1
+        return seen
+
+    def forget(self, key: str):
+        """ID wieder freigeben, z.B. wenn das Einreihen fehlgeschlagen ist"""
+        with self._lock:
+            self._current.discard(key)
+            self._previous.discard(key)
+        try:
+            self.shared.discard(key)
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Dedup store error: {e}")
+
+
+# =============================================================================
+# WORKER POOL
+# =============================================================================
+
+class InboundQueue:
+    """Nimmt Webhook-Nachrichten an und verarbeitet sie in einem Worker-Pool"""
+
+    def __init__(self, handler: Callable[[dict], None], store=None, config=InboundQueueConfig, app=None):
+        self.handler = handler
+        self.config = config
+        self.app = app
+        self.store = store or self._create_store()
+        self.metrics = {'enqueued': 0, 'processed': 0, 'retried': 0, 'dead': 0, 'store_errors': 0}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def _create_store(self):
+        if self.config.BACKEND == 'redis':
+            try:
+                return RedisInboundStore(self.config.REDIS_URL)
+            except ImportError:
+                logger.warning("redis nicht installiert - Inbound Queue nutzt SQLite")
+        return SQLiteInboundStore(self.config.SQLITE_PATH)
+
+    def enqueue(self, sender: str, payload: dict) -> bool:
+        """Persistiert den Job; False nur wenn der Store nicht erreichbar ist"""
+        return self.enqueue_many([(sender, payload)])
+
+    def enqueue_many(self, items: list) -> bool:
+        """[(sender, payload), ...] gemeinsam persistieren - alle oder keiner"""
+        if not items:
+            return True
+        self._ensure_workers()
+        try:
+            if len(items) == 1:
+                self.store.enqueue(items[0][0] or '', items[0][1])
+            else:
+                self.store.enqueue_many([(sender or '', payload) for sender, payload in items])
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Inbound queue enqueue failed: {e}")
+            return False
+        self.metrics['enqueued'] += len(items)
+        self._wakeup.set()
+        return True
+
+    def start(self):
+        """Worker sofort starten (pro Prozess, nach dem fork) - nicht erst beim nächsten Webhook"""
+        self._ensure_workers()
+
+    def stats(self) -> dict:
+        try:
+            counts = self.store.counts()
+        except Exception:
+            counts = {}
+        return {**self.metrics, **counts, 'workers': sum(t.is_alive() for t in self._threads)}
+
+    def _ensure_workers(self):
+        # Nach einem fork() laufen die Threads des Elternprozesses nicht mit
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            if self._pid != os.getpid():
+                self._pid, self._threads = os.getpid(), []
+            self._stopping.clear()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.config.WORKERS):
+                thread = threading.Thread(target=self._run, name=f'inbound-queue-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.store.claim(self.config.LEASE_SECONDS)
+            except Exception as e:
+                self.metrics['store_errors'] += 1
+                logger.error(f"Inbound queue claim failed: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.config.POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._process(job)
+
+    def _process(self, job: Job):
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    self.handler(job.payload)
+            else:
+                self.handler(job.payload)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            try:
+                if job.attempts + 1 >= self.config.MAX_ATTEMPTS:
+                    self.store.dead(job, error)
+                    self.metrics['dead'] += 1
+                    logger.error(f"Inbound job {job.id} from {job.sender} gave up after {job.attempts + 1} attempts: {error}")
+                else:
+                    self.store.retry(job, self.backoff(job.attempts), error)
+                    self.metrics['retried'] += 1
+            except Exception as store_error:
+                self.metrics['store_errors'] += 1
+                logger.error(f"Inbound queue retry bookkeeping failed: {store_error}")
+            return
+        try:
+            self.store.complete(job)
+            self.metrics['processed'] += 1
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Inbound queue complete failed: {e}")
+
+    def backoff(self, attempts: int) -> float:
+        """Exponentiell mit vollem Jitter"""
+        ceiling = min(self.config.RETRY_MAX_SECONDS, self.config.RETRY_BASE_SECONDS * (2 ** attempts))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Keine neuen Jobs mehr leasen, laufende noch abschließen (complete/retry gibt den Lease frei)"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+
+if __name__ == '__main__':
+    print("Inbound Queue Module loaded")
+    print(f"Backend: {InboundQueueConfig.BACKEND}")
+    print(f"Workers: {InboundQueueConfig.WORKERS}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+🎯 WEST MONEY OS - INTENT MATCHER 🎯
+Schlüsselwort-Erkennung für den WhatsApp-Autoresponder
+
+Features:
+- Treffer nur auf Wortgrenzen ('hi' passt nicht in 'michigan')
+- Präfix-Schlüsselwörter für Beugungsformen: 'mensch*' passt auf 'Menschen'
+- Ein kompilierter Regex (Präfixbaum aller Schlüsselwörter): Kosten hängen von der
+  Nachrichtenlänge ab, nicht von der Anzahl der Intents
+- Feste Prioritäten: exakte Nachricht > höchste Priorität > frühester Treffer
+- Menüziffern ('1', '2', ...) nur als ganze Nachricht - nie in Datum, Uhrzeit oder Preis
+- Intent-Tabelle als JSON, wird bei Änderung der Datei neu geladen
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Iterable, Optional
+
+logger = logging.getLogger('IntentMatcher')
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """Kleinschreibung und Wörter mit einfachem Leerzeichen getrennt"""
+    return ' '.join(TOKEN_RE.findall(text.casefold()))
+
+
+class IntentRule:
+    __slots__ = ('intent', 'priority', 'order')
+
+    def __init__(self, intent: str, priority: int, order: int):
+        self.intent = intent
+        self.priority = priority
+        self.order = order
+
+
+def _trie_pattern(words) -> str:
+    """Regex-Alternative als Präfixbaum - der Regex-Automat prüft jedes Zeichen nur einmal"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node):
+        end = '' in node
+        branches = [(r'\W+' if ch == ' ' else re.escape(ch)) + emit(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if end:
+            return (body if len(branches) > 1 else '(?:' + body + ')') + '?'
+        return body
+
+    return emit(trie)
+
+
+class CompiledIntents:
+    """Unveränderlicher Index; wird beim Neuladen komplett ersetzt"""
+
+    def __init__(self, table: Iterable[dict]):
+        self.phrases = {}
+        self.prefixes = {}
+        order = 0
+        for entry in table:
+            priority = int(entry.get('priority', 0))
+            for keyword in entry.get('keywords', []):
+                is_prefix = keyword.endswith('*')
+                phrase = normalize(keyword.rstrip('*'))
+                if not phrase:
+                    continue
+                rule = IntentRule(entry['intent'], priority, order)
+                order += 1
+                index = self.prefixes if is_prefix else self.phrases
+                current = index.get(phrase)
+                # Doppelte Schlüsselwörter: höhere Priorität gewinnt, sonst der erste Eintrag
+                if current is None or rule.priority > current.priority:
+                    index[phrase] = rule
+
+        alternatives = []
+        # Reine Zahlen sind Menüauswahl nur als ganze Nachricht ('am 1.5.' ist kein Menüpunkt 1)
+        words = [phrase for phrase in self.phrases if not phrase.replace(' ', '').isdigit()]
+        if words:
+            alternatives.append('(?P<word>' + _trie_pattern(words) + r')(?!\w)')
+        if self.prefixes:
+            alternatives.append('(?P<prefix>' + _trie_pattern(self.prefixes) + r')\w*')
+        self.pattern = re.compile(r'(?<!\w)(?:' + '|'.join(alternatives) + ')') if alternatives else None
+
+    def match(self, text: str) -> Optional[str]:
+        if self.pattern is None:
+            return None
+        text = text.casefold()
+
+        exact = self.phrases.get(text.strip(' \t\r\n.,;:!?'))
+        if exact is not None:
+            return exact.intent
+
+        best, best_key = None, None
+        for m in self.pattern.finditer(text):
+            index = self.phrases if m.lastgroup == 'word' else self.prefixes
+            rule = index.get(normalize(m.group(m.lastgroup)))
+            if rule is None:
+                continue
+            key = (-rule.priority, m.start(), rule.order)
+            if best_key is None or key < best_key:
+                best, best_key = rule, key
+        return best.intent if best else None
+
+
+class IntentMatcher:
+    """Intent-Erkennung mit optional hot-reloadbarer JSON-Tabelle
+
+    Format der Datei: [{"intent": "appointment", "priority": 50, "keywords": ["termin*", "rückruf"]}, ...]
+    """
+
+    def __init__(self, table: Iterable[dict], path: str = None, check_interval: float = 5.0):
+        self.default_table = list(table)
+        self.path = path
+        self.check_interval = check_interval
+        self._compiled = CompiledIntents(self.default_table)
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload_if_changed(force=True)
+
+    def load(self, table: Iterable[dict]):
+        """Neue Tabelle übernehmen (atomarer Austausch des Index)"""
+        self._compiled = CompiledIntents(table)
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                return False
+            if mtime == self._mtime:
+                return False
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    table = json.load(f)
+                self.load(table)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Fehlerhafte Datei: alte Tabelle behalten
+                logger.error(f"Intent table {self.path} not loaded: {e}")
+                return False
+            self._mtime = mtime
+            logger.info(f"Intent table reloaded from {self.path}")
+            return True
+
+    def match(self, text: str) -> Optional[str]:
+        self.reload_if_changed()
+        return self._compiled.match(text)
+
+
+if __name__ == '__main__':
+    print("Intent Matcher Module loaded")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Load-test harness: Werkzeug dev server (threaded) vs. gunicorn pre-fork server.
+#
+# - Starts each server mode from run_server.py as a subprocess on its own port and its own
+#   throwaway SQLite database, logs in once as the seeded admin and then drives
+#   GET /, GET /login and GET /api/dashboard/stats with N keep-alive client threads.
+# - Prints requests/s, p50 and p99 latency per route and server mode.
+#
+# Usage:
+#   ./venv/bin/python loadtest.py
+#   ./venv/bin/python loadtest.py --concurrency 32 --duration 20 --modes gunicorn
+#
+# The client runs in this Python process; on small machines it can become the bottleneck
+# before the server does, so compare modes on the same host with the same settings.
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+MODES = {
+    "werkzeug": ["--dev"],
+    "gunicorn": [],
+}
+
+ROUTES = {
+    "landing": "/",
+    "login": "/login",
+    "stats": "/api/dashboard/stats",
+}
+
+
+def start_server(mode: str, port: int, workdir: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "DATABASE_URL": f"sqlite:///{workdir / f'{mode}.db'}",
+        "WEB_ACCESS_LOG": "",
+        "SECRET_KEY": "loadtest",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, str(BASE_DIR / "run_server.py"), *MODES[mode]],
+        cwd=str(workdir), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+def login(port: int) -> str:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    body = urllib.parse.urlencode({"username": "admin", "password": "WestMoney2025!"})
+    conn.request("POST", "/login", body, {"Content-Type": "application/x-www-form-urlencoded"})
+    resp = conn.getresponse()
+    resp.read()
+    cookie = resp.getheader("Set-Cookie", "")
+    return cookie.split(";", 1)[0]
+
+
+def hammer(port: int, path: str, cookie: str, concurrency: int, duration: float) -> dict:
+    latencies: list[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local, local_errors = [], 0
+        headers = {"Cookie": cookie, "Accept-Encoding": "gzip, br"}
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "rps": count / duration,
+        "p50": latencies[count // 2] * 1000 if count else 0.0,
+        "p99": latencies[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+        "errors": errors[0],
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare Werkzeug and gunicorn throughput.")
+    ap.add_argument("--concurrency", type=int, default=16, help="client threads (default: 16)")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per route (default: 10)")
+    ap.add_argument("--modes", default="werkzeug,gunicorn", help="comma separated: werkzeug,gunicorn")
+    ap.add_argument("--port", type=int, default=5801, help="first port to use (default: 5801)")
+    args = ap.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="westmoney_loadtest_"))
+    results = {}
+    try:
+        for offset, mode in enumerate(m.strip() for m in args.modes.split(",") if m.strip()):
+            port = args.port + offset
+            print(f"▶ {mode} on :{port} ...")
+            proc = start_server(mode, port, workdir)
+            try:
+                cookie = login(port)
+                for route, path in ROUTES.items():
+                    results[(mode, route)] = hammer(port, path, cookie, args.concurrency, args.duration)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print(f"{'mode':<10} {'route':<8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for (mode, route), r in results.items():
+        print(f"{mode:<10} {route:<8} {r['rps']:>9.1f} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['errors']:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+🔐 WEST MONEY OS - LOGIN GUARD 🔐
+Brute-Force-Schutz und Passwort-Hash-Kosten für den Login
+
+Features:
+- Sliding-Window-Limiter pro IP und pro Benutzername
+- In-Process-Store, optional Redis (mehrere Worker/Server)
+- Frühe, billige Ablehnung vor DB-Abfrage und Hash-Prüfung
+- Konfigurierbare Hash-Methode mit transparentem Rehash beim Login
+- Benchmark der Hash-Kosten: python login_guard.py --benchmark
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import deque, OrderedDict
+from typing import Optional
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+logger = logging.getLogger('LoginGuard')
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class LoginGuardConfig:
+    """Login Guard Konfiguration"""
+
+    # Fehlversuche pro IP im Zeitfenster
+    MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', '20'))
+    IP_WINDOW_SECONDS = int(os.getenv('LOGIN_IP_WINDOW_SECONDS', '300'))
+
+    # Fehlversuche pro Benutzername im Zeitfenster
+    MAX_FAILURES_PER_USER = int(os.getenv('LOGIN_MAX_FAILURES_PER_USER', '5'))
+    USER_WINDOW_SECONDS = int(os.getenv('LOGIN_USER_WINDOW_SECONDS', '900'))
+
+    # 'memory' oder 'redis'
+    BACKEND = os.getenv('LOGIN_GUARD_BACKEND', 'memory')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    MAX_KEYS = int(os.getenv('LOGIN_GUARD_MAX_KEYS', '100000'))
+
+    # Werkzeug-Methodenstring; Standard ist werkzeugs aktuelles Schema (scrypt:32768:8:1), in dem alle
+    # bestehenden Hashes liegen. Teurere Methoden (z.B. 'pbkdf2:sha256:600000') nur bewusst setzen:
+    # needs_rehash stellt dann jeden Benutzer beim nächsten Login um (siehe --benchmark)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+# =============================================================================
+# SLIDING WINDOW STORES
+# =============================================================================
+
+class MemoryWindowStore:
+    """Sliding Window im Prozessspeicher (pro Worker)"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, key: str, window: float, now: float) -> tuple:
+        """Gibt (Anzahl im Fenster, ältester Zeitstempel) zurück"""
+        with self._lock:
+            hits = self._hits.get(key)
+            if not hits:
+                return 0, None
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if not hits:
+                del self._hits[key]
+                return 0, None
+            return len(hits), hits[0]
+
+    def add(self, key: str, window: float, now: float):
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                if len(self._hits) >= self.max_keys:
+                    # Ältesten Schlüssel verwerfen, Speicher bleibt begrenzt
+                    self._hits.popitem(last=False)
+                hits = self._hits[key] = deque()
+            else:
+                self._hits.move_to_end(key)
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            hits.append(now)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class RedisWindowStore:
+    """Sliding Window in Redis (Sorted Set pro Schlüssel), geteilt zwischen Workern"""
+
+    PREFIX = 'login_guard:'
+
+    def __init__(self, url: str):
+        import redis
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def count(self, key: str, window: float, now: float) -> tuple:
+        key = self.PREFIX + key
+        pipe = self.redis.pipeline()
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.zrange(key, 0, 0, withscores=True)
+        pipe.zcard(key)
+        _, oldest, count = pipe.execute()
+        return count, (oldest[0][1] if oldest else None)
+
+    def add(self, key: str, window: float, now: float):
+        key = self.PREFIX + key
+        pipe = self.redis.pipeline()
+        pipe.zadd(key, {f'{now:.6f}': now})
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.expire(key, int(window) + 1)
+        pipe.execute()
+
+    def reset(self, key: str):
+        self.redis.delete(self.PREFIX + key)
+
+
+# =============================================================================
+# LOGIN GUARD
+# =============================================================================
+
+class LoginGuard:
+    """Begrenzt fehlgeschlagene Logins pro IP und Benutzername"""
+
+    def __init__(self, store=None, config=LoginGuardConfig):
+        self.config = config
+        self.store = store or self._create_store()
+        self.metrics = {'rejected': 0, 'failures': 0, 'store_errors': 0}
+
+    def _create_store(self):
+        if self.config.BACKEND == 'redis':
+            try:
+                return RedisWindowStore(self.config.REDIS_URL)
+            except ImportError:
+                logger.warning("redis nicht installiert - Login Guard nutzt In-Process-Store")
+        return MemoryWindowStore(self.config.MAX_KEYS)
+
+    @staticmethod
+    def _user_key(username: str) -> str:
+        return f'user:{username.strip().lower()}'
+
+    def _limits(self, ip: str, username: str):
+        yield f'ip:{ip}', self.config.MAX_FAILURES_PER_IP, self.config.IP_WINDOW_SECONDS
+        if username:
+            yield self._user_key(username), self.config.MAX_FAILURES_PER_USER, self.config.USER_WINDOW_SECONDS
+
+    def retry_after(self, ip: str, username: str) -> int:
+        """Sekunden bis zum nächsten erlaubten Versuch, 0 wenn erlaubt"""
+        now = time.time()
+        wait = 0
+        try:
+            for key, limit, window in self._limits(ip, username):
+                count, oldest = self.store.count(key, window, now)
+                if count >= limit and oldest is not None:
+                    wait = max(wait, int(oldest + window - now) + 1)
+        except Exception as e:
+            # Limiter-Ausfall darf den Login nicht blockieren
+            self.metrics['store_errors'] += 1
+            logger.error(f"Login guard store error: {e}")
+            return 0
+        if wait:
+            self.metrics['rejected'] += 1
+        return wait
+
+    def register_failure(self, ip: str, username: str):
+        now = time.time()
+        self.metrics['failures'] += 1
+        try:
+            for key, _, window in self._limits(ip, username):
+                self.store.add(key, window, now)
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Login guard store error: {e}")
+
+    def register_success(self, ip: str, username: str):
+        if not username:
+            return
+        try:
+            self.store.reset(self._user_key(username))
+        except Exception as e:
+            self.metrics['store_errors'] += 1
+            logger.error(f"Login guard store error: {e}")
+
+
+# =============================================================================
+# PASSWORD HASH POLICY
+# =============================================================================
+
+class PasswordHashPolicy:
+    """Hash-Methode zentral festlegen; veraltete Hashes beim Login erneuern"""
+
+    def __init__(self, method: str = None):
+        self.method = method or LoginGuardConfig.PASSWORD_HASH_METHOD
+        self._canonical = self.canonical_method(self.method)
+
+    @staticmethod
+    def canonical_method(method: str) -> str:
+        """Kurzformen wie 'scrypt' oder 'pbkdf2' so ausschreiben, wie werkzeug sie im Hash ablegt"""
+        name, *args = method.split(':')
+        if name == 'pbkdf2':
+            hash_name = args[0] if args else 'sha256'
+            iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+            return f'pbkdf2:{hash_name}:{int(iterations)}'
+        if name == 'scrypt':
+            n, r, p = (args + [None] * 3)[:3] if args else (2 ** 15, 8, 1)
+            return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+        return method
+
+    def hash(self, password: str) -> str:
+        return generate_password_hash(password, method=self.method)
+
+    def verify(self, pwhash: Optional[str], password: str) -> bool:
+        if not pwhash:
+            return False
+        return check_password_hash(pwhash, password)
+
+    def needs_rehash(self, pwhash: Optional[str]) -> bool:
+        if not pwhash or '$' not in pwhash:
+            return False
+        stored = pwhash.split('$', 1)[0]
+        try:
+            stored = self.canonical_method(stored)
+        except (TypeError, ValueError):
+            return True
+        return stored != self._canonical
+
+
+def benchmark_hash_methods(methods=None, rounds: int = 5) -> dict:
+    """Misst die Dauer eines Hash-Vergleichs pro Methode (Median, ms)"""
+    methods = methods or [
+        'pbkdf2:sha256:100000',
+        'pbkdf2:sha256:260000',
+        'pbkdf2:sha256:600000',
+        'scrypt:16384:8:1',
+        'scrypt:32768:8:1',
+    ]
+    results = {}
+    for method in methods:
+        pwhash = generate_password_hash('benchmark-password', method=method)
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            check_password_hash(pwhash, 'benchmark-password')
+            timings.append((time.perf_counter() - start) * 1000)
+        results[method] = sorted(timings)[len(timings) // 2]
+    return results
+
+
+if __name__ == '__main__':
+    if '--benchmark' in sys.argv:
+        print("⏱️  Passwort-Hash-Kosten (Median pro Login-Prüfung):")
+        for method, ms in benchmark_hash_methods().items():
+            active = PasswordHashPolicy.canonical_method(LoginGuardConfig.PASSWORD_HASH_METHOD)
+            marker = '  ← aktiv' if PasswordHashPolicy.canonical_method(method) == active else ''
+            print(f"   {method:<24} {ms:8.1f} ms{marker}")
+    else:
+        print("Login Guard Module loaded")
+        print(f"Backend: {LoginGuardConfig.BACKEND}")
+        print(f"Hash-Methode: {LoginGuardConfig.PASSWORD_HASH_METHOD}")
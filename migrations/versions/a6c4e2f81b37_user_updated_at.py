@@ -0,0 +1,36 @@
+"""user updated at
+
+Revision ID: a6c4e2f81b37
+Revises: f2b8d6e1a4c3
+Create Date: 2026-10-19 09:14:27.503316
+
+users.updated_at als Version für den UserCache: Treffer werden gegen diese
+Spalte geprüft, damit Änderungen aus anderen Workern sofort gelten.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c4e2f81b37'
+down_revision = 'f2b8d6e1a4c3'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # Leere Datenbank: `flask init-db` legt users danach vollständig an
+    if not sa.inspect(op.get_bind()).has_table('users'):
+        return
+    if 'updated_at' not in _columns('users'):
+        op.add_column('users', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    if 'updated_at' in _columns('users'):
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,42 @@
+"""campaign lease
+
+Revision ID: b3f7a9d2c5e8
+Revises: a6c4e2f81b37
+Create Date: 2026-10-19 11:02:41.836105
+
+campaigns.lease_owner/lease_until: nur der Worker mit gültigem Lease speist
+Empfänger ein. Empfänger werden vor dem Versand als 'queued' markiert, ein
+Fortsetzen sendet sie nicht erneut.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f7a9d2c5e8'
+down_revision = 'a6c4e2f81b37'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # Leere Datenbank: `flask init-db` legt campaigns danach vollständig an
+    if not sa.inspect(op.get_bind()).has_table('campaigns'):
+        return
+    columns = _columns('campaigns')
+    if 'lease_owner' not in columns:
+        op.add_column('campaigns', sa.Column('lease_owner', sa.String(length=64), nullable=True))
+    if 'lease_until' not in columns:
+        op.add_column('campaigns', sa.Column('lease_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    columns = _columns('campaigns')
+    with op.batch_alter_table('campaigns') as batch_op:
+        for name in ('lease_until', 'lease_owner'):
+            if name in columns:
+                batch_op.drop_column(name)
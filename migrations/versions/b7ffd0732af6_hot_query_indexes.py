@@ -0,0 +1,59 @@
+"""hot query indexes
+
+Revision ID: b7ffd0732af6
+Revises:
+Create Date: 2026-10-18 09:12:41.503117
+
+Erste verwaltete Revision. Die Tabellen selbst legt db.create_all() an;
+diese Revision ergänzt nur die Composite-Indizes für bestehende
+Datenbanken. Indizes, die create_all() bei einer frischen Datenbank
+bereits angelegt hat, werden übersprungen.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7ffd0732af6'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('contacts', 'ix_contacts_created_at_id', ['created_at', 'id']),
+    ('contacts', 'ix_contacts_whatsapp_consent', ['whatsapp_consent']),
+    ('contacts', 'ix_contacts_user_id_created_at', ['user_id', 'created_at']),
+    ('leads', 'ix_leads_created_at_id', ['created_at', 'id']),
+    ('leads', 'ix_leads_status_created_at', ['status', 'created_at']),
+    ('leads', 'ix_leads_contact_id', ['contact_id']),
+    ('leads', 'ix_leads_assigned_to_status', ['assigned_to', 'status']),
+    ('tasks', 'ix_tasks_status_created_at', ['status', 'created_at']),
+    ('tasks', 'ix_tasks_assigned_to_status', ['assigned_to', 'status']),
+    ('messages', 'ix_messages_contact_id_timestamp', ['contact_id', 'timestamp']),
+    ('notifications', 'ix_notifications_user_id_read', ['user_id', 'read']),
+    ('security_events', 'ix_security_events_timestamp', ['timestamp']),
+    ('security_events', 'ix_security_events_event_type_timestamp', ['event_type', 'timestamp']),
+    ('security_events', 'ix_security_events_ip_address_timestamp', ['ip_address', 'timestamp']),
+]
+
+
+def _existing_indexes(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {ix['name'] for ix in inspector.get_indexes(table)}
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        existing = _existing_indexes(table)
+        if existing is not None and name not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        existing = _existing_indexes(table)
+        if existing and name in existing:
+            op.drop_index(name, table_name=table)
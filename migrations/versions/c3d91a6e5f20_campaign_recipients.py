@@ -0,0 +1,47 @@
+"""campaign recipients
+
+Revision ID: c3d91a6e5f20
+Revises: b7ffd0732af6
+Create Date: 2026-10-18 14:02:17.118204
+
+Versandstatus pro Empfänger für den Outbound Dispatcher. Bei frischen
+Datenbanken hat db.create_all() die Tabelle bereits angelegt.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d91a6e5f20'
+down_revision = 'b7ffd0732af6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('campaign_recipients'):
+        return
+    op.create_table(
+        'campaign_recipients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('campaign_id', sa.Integer(), nullable=False),
+        sa.Column('contact_id', sa.Integer(), nullable=False),
+        sa.Column('phone', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('wa_message_id', sa.String(length=128), nullable=True),
+        sa.Column('error', sa.String(length=300), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id']),
+        sa.ForeignKeyConstraint(['contact_id'], ['contacts.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('campaign_id', 'contact_id', name='uq_campaign_recipients_campaign_contact')
+    )
+    op.create_index('ix_campaign_recipients_campaign_id_status_id', 'campaign_recipients',
+                    ['campaign_id', 'status', 'id'])
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('campaign_recipients'):
+        return
+    op.drop_index('ix_campaign_recipients_campaign_id_status_id', table_name='campaign_recipients')
+    op.drop_table('campaign_recipients')
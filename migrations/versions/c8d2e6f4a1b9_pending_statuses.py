@@ -0,0 +1,37 @@
+"""pending statuses
+
+Revision ID: c8d2e6f4a1b9
+Revises: b3f7a9d2c5e8
+Create Date: 2026-10-19 12:26:08.114592
+
+Status-Updates, deren Nachricht noch nicht in messages steht, werden hier
+geparkt und beim nächsten Schreiben des Conversation Logs angewendet.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8d2e6f4a1b9'
+down_revision = 'b3f7a9d2c5e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('pending_statuses'):
+        op.create_table(
+            'pending_statuses',
+            sa.Column('wa_message_id', sa.String(length=128), nullable=False),
+            sa.Column('status', sa.String(length=50), nullable=False),
+            sa.Column('rank', sa.Integer(), nullable=False),
+            sa.Column('received_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('wa_message_id')
+        )
+        op.create_index('ix_pending_statuses_received_at', 'pending_statuses', ['received_at'])
+
+
+def downgrade():
+    if sa.inspect(op.get_bind()).has_table('pending_statuses'):
+        op.drop_index('ix_pending_statuses_received_at', table_name='pending_statuses')
+        op.drop_table('pending_statuses')
@@ -0,0 +1,78 @@
+"""contact phone normalized, message wa id
+
+Revision ID: d58e2b4c7a91
+Revises: c3d91a6e5f20
+Create Date: 2026-10-18 16:40:05.271830
+
+contacts.phone_normalized (E.164, eindeutig) für die Kontaktauflösung
+eingehender WhatsApp-Nachrichten und messages.wa_message_id für die
+gebündelten Status-Updates. Bestehende Nummern werden normalisiert;
+bei Dubletten behält der älteste Kontakt die Nummer.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from phone_numbers import normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision = 'd58e2b4c7a91'
+down_revision = 'c3d91a6e5f20'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(table):
+    # Leere Datenbank: `flask init-db` legt die Tabelle danach vollständig an
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _upgrade_contacts(bind):
+    if 'phone_normalized' not in _columns('contacts'):
+        op.add_column('contacts', sa.Column('phone_normalized', sa.String(length=20), nullable=True))
+        contacts = sa.table('contacts', sa.column('id', sa.Integer), sa.column('phone', sa.String),
+                            sa.column('phone_normalized', sa.String))
+        seen, updates = set(), []
+        for contact_id, phone in bind.execute(sa.select(contacts.c.id, contacts.c.phone).order_by(contacts.c.id)):
+            normalized = normalize_phone(phone)
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                updates.append({'contact_id': contact_id, 'normalized': normalized})
+        if updates:
+            bind.execute(contacts.update().where(contacts.c.id == sa.bindparam('contact_id'))
+                         .values(phone_normalized=sa.bindparam('normalized')), updates)
+    if 'uq_contacts_phone_normalized' not in _indexes('contacts'):
+        op.create_index('uq_contacts_phone_normalized', 'contacts', ['phone_normalized'], unique=True)
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if _has_table('contacts'):
+        _upgrade_contacts(bind)
+    if _has_table('messages'):
+        if 'wa_message_id' not in _columns('messages'):
+            op.add_column('messages', sa.Column('wa_message_id', sa.String(length=128), nullable=True))
+        if 'uq_messages_wa_message_id' not in _indexes('messages'):
+            op.create_index('uq_messages_wa_message_id', 'messages', ['wa_message_id'], unique=True)
+
+
+def downgrade():
+    if 'uq_messages_wa_message_id' in _indexes('messages'):
+        op.drop_index('uq_messages_wa_message_id', table_name='messages')
+    if 'wa_message_id' in _columns('messages'):
+        with op.batch_alter_table('messages') as batch_op:
+            batch_op.drop_column('wa_message_id')
+    if 'uq_contacts_phone_normalized' in _indexes('contacts'):
+        op.drop_index('uq_contacts_phone_normalized', table_name='contacts')
+    if 'phone_normalized' in _columns('contacts'):
+        with op.batch_alter_table('contacts') as batch_op:
+            batch_op.drop_column('phone_normalized')
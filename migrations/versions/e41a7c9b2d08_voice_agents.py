@@ -0,0 +1,41 @@
+"""voice agents
+
+Revision ID: e41a7c9b2d08
+Revises: d58e2b4c7a91
+Create Date: 2026-10-18 16:41:05.302917
+
+Persistente Registry der ElevenLabs Voice Agents (ein Agent pro Typ für alle
+Worker). Bei frischen Datenbanken hat db.create_all() die Tabelle bereits angelegt.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41a7c9b2d08'
+down_revision = 'd58e2b4c7a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('voice_agents'):
+        return
+    op.create_table(
+        'voice_agents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('agent_type', sa.String(length=50), nullable=False),
+        sa.Column('agent_id', sa.String(length=100), nullable=True),
+        sa.Column('name', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('agent_type')
+    )
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('voice_agents'):
+        return
+    op.drop_table('voice_agents')
@@ -0,0 +1,88 @@
+"""call log
+
+Revision ID: f2b8d6e1a4c3
+Revises: e41a7c9b2d08
+Create Date: 2026-10-18 18:12:44.640219
+
+Call-Events aus den Twilio Status-Callbacks, Rollup pro Anruf und
+Tageszähler pro Agent-Typ. Bei frischen Datenbanken hat db.create_all()
+die Tabellen bereits angelegt.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d6e1a4c3'
+down_revision = 'e41a7c9b2d08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('call_events'):
+        op.create_table(
+            'call_events',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('call_sid', sa.String(length=64), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('agent_type', sa.String(length=50), nullable=True),
+            sa.Column('direction', sa.String(length=20), nullable=True),
+            sa.Column('from_number', sa.String(length=20), nullable=True),
+            sa.Column('to_number', sa.String(length=20), nullable=True),
+            sa.Column('duration', sa.Integer(), nullable=True),
+            sa.Column('contact_id', sa.Integer(), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['contact_id'], ['contacts.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('uq_call_events_call_sid_status', 'call_events', ['call_sid', 'status'], unique=True)
+    if not inspector.has_table('calls'):
+        op.create_table(
+            'calls',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('call_sid', sa.String(length=64), nullable=False),
+            sa.Column('direction', sa.String(length=20), nullable=True),
+            sa.Column('from_number', sa.String(length=20), nullable=True),
+            sa.Column('to_number', sa.String(length=20), nullable=True),
+            sa.Column('agent_type', sa.String(length=50), nullable=True),
+            sa.Column('contact_id', sa.Integer(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('answered', sa.Boolean(), nullable=True),
+            sa.Column('duration', sa.Integer(), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('ended_at', sa.DateTime(), nullable=True),
+            sa.Column('counted', sa.Boolean(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['contact_id'], ['contacts.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('call_sid')
+        )
+        op.create_index('ix_calls_started_at', 'calls', ['started_at'])
+        op.create_index('ix_calls_contact_id_started_at', 'calls', ['contact_id', 'started_at'])
+    if not inspector.has_table('call_stats_daily'):
+        op.create_table(
+            'call_stats_daily',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('agent_type', sa.String(length=50), nullable=False),
+            sa.Column('calls', sa.Integer(), nullable=True),
+            sa.Column('answered', sa.Integer(), nullable=True),
+            sa.Column('duration_total', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('day', 'agent_type', name='uq_call_stats_daily_day_agent_type')
+        )
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('call_stats_daily'):
+        op.drop_table('call_stats_daily')
+    if inspector.has_table('calls'):
+        op.drop_index('ix_calls_contact_id_started_at', table_name='calls')
+        op.drop_index('ix_calls_started_at', table_name='calls')
+        op.drop_table('calls')
+    if inspector.has_table('call_events'):
+        op.drop_index('uq_call_events_call_sid_status', table_name='call_events')
+        op.drop_table('call_events')
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+📤 WEST MONEY OS - OUTBOUND DISPATCHER 📤
+Versand-Scheduler für die WhatsApp Cloud API
+
+Features:
+- Token Bucket pro WHATSAPP_PHONE_ID (Meta-Durchsatz pro Nummer), ein gemeinsamer Bucket
+  für alle Worker-Prozesse (SQLite-Datei oder Redis)
+- Zwei Spuren: 'transactional' (Antworten im Gespräch) vor 'campaign'
+- Kampagnen nutzen höchstens CAMPAIGN_SHARE der Rate - Live-Antworten haben immer Luft
+- Parallele Sender-Threads innerhalb des Limits, 429 bremst den Bucket aus
+- Ergebnisse der Kampagnen-Spur werden gesammelt und gebündelt gemeldet
+- 429/5xx in Kampagnen: verzögert neu einreihen, danach 'retry' (Empfänger bleibt offen)
+"""
+
+import os
+import time
+import heapq
+import itertools
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Iterable, Optional
+
+from http_client import http_client
+from inbound_queue import SQLiteFile
+
+logger = logging.getLogger('OutboundDispatcher')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TRANSACTIONAL = 'transactional'
+CAMPAIGN = 'campaign'
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class OutboundConfig:
+    """Outbound Dispatcher Konfiguration"""
+
+    API_VERSION = os.getenv('WHATSAPP_API_VERSION', 'v21.0')
+    DEFAULT_PHONE_ID = os.getenv('WHATSAPP_PHONE_ID') or os.getenv('WHATSAPP_PHONE_NUMBER_ID', '')
+
+    # Nachrichten pro Sekunde und Nummer (Cloud API Standard: 80/s)
+    RATE_PER_SECOND = float(os.getenv('WHATSAPP_SEND_RATE', '80'))
+    BURST = int(os.getenv('WHATSAPP_SEND_BURST', '20'))
+    CAMPAIGN_SHARE = float(os.getenv('WHATSAPP_CAMPAIGN_SHARE', '0.8'))
+
+    SENDERS = int(os.getenv('WHATSAPP_SEND_CONCURRENCY', '16'))
+    # Gegendruck für Kampagnen: so viele Empfänger höchstens im Speicher
+    CAMPAIGN_QUEUE_SIZE = int(os.getenv('WHATSAPP_CAMPAIGN_QUEUE_SIZE', '2000'))
+
+    # 429/5xx: so oft insgesamt versuchen, Wartezeit verdoppelt sich ab RETRY_BASE_SECONDS
+    CAMPAIGN_MAX_ATTEMPTS = int(os.getenv('WHATSAPP_CAMPAIGN_MAX_ATTEMPTS', '3'))
+    CAMPAIGN_RETRY_BASE_SECONDS = float(os.getenv('WHATSAPP_CAMPAIGN_RETRY_BASE_SECONDS', '5'))
+    CAMPAIGN_RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+    RESULT_BATCH_SIZE = int(os.getenv('WHATSAPP_RESULT_BATCH_SIZE', '500'))
+    RESULT_FLUSH_INTERVAL = float(os.getenv('WHATSAPP_RESULT_FLUSH_MS', '1000')) / 1000
+
+    # Rate gilt für alle Worker zusammen: gemeinsamer Bucket in 'sqlite' (ein Server) oder 'redis'
+    LIMITER_BACKEND = os.getenv('WHATSAPP_LIMITER_BACKEND', 'sqlite')
+    LIMITER_PATH = os.getenv('WHATSAPP_LIMITER_PATH', os.path.join(BASE_DIR, 'instance', 'outbound_limiter.db'))
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+
+# =============================================================================
+# TOKEN BUCKET
+# =============================================================================
+
+class TokenBucket:
+    """Klassischer Token Bucket; try_acquire gibt die Wartezeit bis zum nächsten Token zurück"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def refund(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def pause(self, seconds: float):
+        """Nach 429: Bucket leeren und eine Weile nichts ausgeben"""
+        with self._lock:
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class SharedTokenBucket:
+    """Ein Bucket für alle Prozesse; fällt der gemeinsame Speicher aus, bremst der lokale Bucket weiter"""
+
+    def __init__(self, key: str, rate: float, burst: int):
+        self.key = key
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.errors = 0
+        self._fallback = TokenBucket(rate, burst)
+
+    def _take(self, take: int) -> float:
+        """take=1 entnimmt (Wartezeit zurück), take=0 gibt ein Token zurück"""
+        raise NotImplementedError
+
+    def _pause(self, until: float):
+        raise NotImplementedError
+
+    def try_acquire(self) -> float:
+        try:
+            return self._take(1)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Shared rate limiter unavailable, using local bucket: {e}")
+            return self._fallback.try_acquire()
+
+    def refund(self):
+        try:
+            self._take(0)
+        except Exception:
+            self._fallback.refund()
+
+    def pause(self, seconds: float):
+        self._fallback.pause(seconds)
+        try:
+            self._pause(time.time() + seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Shared rate limiter pause failed: {e}")
+
+
+class RedisTokenBucket(SharedTokenBucket):
+    """Auffüllen und Entnehmen atomar in einem Lua-Skript"""
+
+    SCRIPT = """
+        local rate, burst, now, take = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'paused_until')
+        local tokens = tonumber(state[1]) or burst
+        local updated = tonumber(state[2]) or now
+        local paused_until = tonumber(state[3]) or 0
+        if take > 0 and now < paused_until then
+            return tostring(paused_until - now)
+        end
+        tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+        local wait = 0
+        if take > 0 then
+            if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+        else
+            tokens = math.min(burst, tokens + 1)
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', math.max(now, updated))
+        redis.call('EXPIRE', KEYS[1], 3600)
+        return tostring(wait)
+    """
+
+    def __init__(self, client, key: str, rate: float, burst: int):
+        super().__init__(key, rate, burst)
+        self.redis = client
+        self._script = client.register_script(self.SCRIPT)
+
+    def _take(self, take: int) -> float:
+        return float(self._script(keys=[self.key], args=[self.rate, self.burst, time.time(), take]))
+
+    def _pause(self, until: float):
+        self.redis.hset(self.key, mapping={'tokens': 0, 'updated': time.time(), 'paused_until': until})
+
+
+class SQLiteBuckets(SQLiteFile):
+    """Bucket-Zustand pro Nummer und Spur; BEGIN IMMEDIATE macht Auffüllen und Entnehmen atomar"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbound_buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            paused_until REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+    """
+
+    def take(self, key: str, rate: float, burst: int, take: int) -> float:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Zeit erst unter der Sperre nehmen, sonst zählt ein wartender Prozess Auffüllzeit doppelt
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated, paused_until FROM outbound_buckets WHERE key = ?",
+                               (key,)).fetchone()
+            tokens, updated, paused_until = row or (float(burst), now, 0.0)
+            if take and now < paused_until:
+                conn.execute("COMMIT")
+                return paused_until - now
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0
+            if take:
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+            else:
+                tokens = min(burst, tokens + 1)
+            conn.execute(
+                "INSERT INTO outbound_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def pause(self, key: str, until: float):
+        self._conn().execute(
+            "INSERT INTO outbound_buckets (key, tokens, updated, paused_until) VALUES (?, 0, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET tokens = 0, updated = excluded.updated, "
+            "paused_until = max(paused_until, excluded.paused_until)",
+            (key, time.time(), until))
+
+
+class SQLiteTokenBucket(SharedTokenBucket):
+    """Gemeinsamer Bucket in der Limiter-Datei - wie Redis, nur für einen Server"""
+
+    def __init__(self, store: SQLiteBuckets, key: str, rate: float, burst: int):
+        super().__init__(key, rate, burst)
+        self.store = store
+
+    def _take(self, take: int) -> float:
+        return self.store.take(self.key, self.rate, self.burst, take)
+
+    def _pause(self, until: float):
+        self.store.pause(self.key, until)
+
+
+class RateLimiter:
+    """Erzeugt die Buckets pro Nummer; die Summe aller Prozesse bleibt unter RATE_PER_SECOND
+
+    Alle Prozesse entnehmen aus einem gemeinsamen Bucket pro Nummer und Spur
+    (SQLite-Datei oder Redis). Wer gerade nicht sendet, belegt nichts - ein
+    einzelner Kampagnen-Feeder bekommt die volle Rate, Live-Antworten anderer
+    Worker zählen trotzdem mit.
+    """
+
+    def __init__(self, config=OutboundConfig):
+        self.config = config
+        self.redis = None
+        self.store = None
+        if config.LIMITER_BACKEND == 'redis':
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(config.REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2)
+            except ImportError:
+                logger.warning("redis nicht installiert - Senderate wird per SQLite geteilt")
+        if self.redis is None:
+            self.store = SQLiteBuckets(config.LIMITER_PATH)
+        self._buckets = {}
+
+    def bucket(self, phone_id: str, lane: str, rate: float, burst: int):
+        key = f'outbound:bucket:{phone_id}:{lane}'
+        if self.redis is not None:
+            bucket = RedisTokenBucket(self.redis, key, rate, burst)
+        else:
+            bucket = SQLiteTokenBucket(self.store, key, rate, burst)
+        self._buckets[(phone_id, lane)] = bucket
+        return bucket
+
+    def pause(self, phone_id: str, seconds: float):
+        """429 gilt für die Nummer, nicht nur für diesen Prozess"""
+        bucket = self._buckets.get((phone_id, TRANSACTIONAL))
+        if bucket is not None:
+            bucket.pause(seconds)
+
+    @property
+    def metrics(self) -> dict:
+        return {'limiter_backend': 'redis' if self.redis is not None else 'sqlite',
+                'limiter_errors': sum(bucket.errors for bucket in list(self._buckets.values()))}
+
+
+class OutboundItem:
+    __slots__ = ('phone_id', 'to', 'payload', 'lane', 'meta', 'future', 'attempts')
+
+    def __init__(self, phone_id, to, payload, lane, meta=None):
+        self.phone_id = phone_id
+        self.to = to
+        self.payload = payload
+        self.lane = lane
+        self.meta = meta
+        self.future = Future()
+        self.attempts = 0
+
+
+# =============================================================================
+# DISPATCHER
+# =============================================================================
+
+class OutboundDispatcher:
+    """Priorisierter, ratenbegrenzter Versand über einen Pool von Sender-Threads"""
+
+    def __init__(self, token: str = '', config=OutboundConfig,
+                 on_campaign_results: Optional[Callable[[list], None]] = None):
+        self.token = token
+        self.config = config
+        self.on_campaign_results = on_campaign_results
+        self._lanes = {TRANSACTIONAL: deque(), CAMPAIGN: deque()}
+        # (fällig ab, seq, item): Kampagnen-Empfänger nach 429/5xx
+        self._delayed = []
+        self._delayed_seq = itertools.count()
+        self._cond = threading.Condition()
+        self._buckets = {}
+        self._limiter = None
+        self._results = []
+        self._results_lock = threading.Lock()
+        self._threads = []
+        self._feeders = []
+        self._pid = None
+        self._stopping = threading.Event()
+        self.metrics = {'sent': 0, 'failed': 0, 'rate_limited': 0, 'throttled_waits': 0,
+                        'transactional': 0, 'campaign': 0, 'campaign_retries': 0, 'result_flushes': 0}
+
+    # -------------------------------------------------------------------------
+    # Einreihen
+    # -------------------------------------------------------------------------
+
+    def submit(self, to: str, payload: dict, lane: str = TRANSACTIONAL, phone_id: str = None,
+               meta=None, block: bool = True) -> Optional[Future]:
+        """Reiht eine Nachricht ein; Kampagnen blockieren, wenn ihre Spur voll ist"""
+        self._ensure_workers()
+        item = OutboundItem(phone_id or self.config.DEFAULT_PHONE_ID, to, payload, lane, meta)
+        with self._cond:
+            if lane == CAMPAIGN:
+                while len(self._lanes[CAMPAIGN]) + len(self._delayed) >= self.config.CAMPAIGN_QUEUE_SIZE:
+                    if not block or self._stopping.is_set():
+                        return None
+                    self._cond.wait(0.5)
+            self._lanes[lane].append(item)
+            self._cond.notify_all()
+        return item.future
+
+    def send_text(self, to: str, body: str, timeout: float = 30.0) -> dict:
+        """Antwort im Gespräch: höchste Priorität, wartet auf das Ergebnis"""
+        payload = {'recipient_type': 'individual', 'type': 'text', 'text': {'body': body}}
+        try:
+            return self.submit(to, payload, TRANSACTIONAL).result(timeout)
+        except FutureTimeout:
+            return {'ok': False, 'status': None, 'message_id': None, 'error': 'dispatcher timeout'}
+
+    def submit_campaign(self, recipients: Iterable, payload: dict, phone_id: str = None) -> threading.Thread:
+        """Speist (to, meta)-Paare im Hintergrund ein, mit Gegendruck über die Spurgröße
+
+        Beim Herunterfahren wird der zuletzt gelieferte, nicht mehr eingereihte
+        Empfänger als 'released' gemeldet und der Iterator geschlossen.
+        """
+        def feed():
+            count = 0
+            try:
+                for to, meta in recipients:
+                    if self.submit(to, payload, CAMPAIGN, phone_id, meta) is None:
+                        with self._results_lock:
+                            self._results.append((meta, self._released()))
+                        break
+                    count += 1
+            finally:
+                close = getattr(recipients, 'close', None)
+                if close is not None:
+                    close()
+            logger.info(f"Campaign feeder queued {count} recipients")
+
+        thread = threading.Thread(target=feed, name='campaign-feeder', daemon=True)
+        self._feeders = [t for t in self._feeders if t.is_alive()] + [thread]
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = {lane: len(items) for lane, items in self._lanes.items()}
+            depth['delayed'] = len(self._delayed)
+        limiter = self._limiter.metrics if self._limiter is not None else {}
+        return {**self.metrics, **limiter, 'queued': depth, 'senders': sum(t.is_alive() for t in self._threads)}
+
+    # -------------------------------------------------------------------------
+    # Sender-Threads
+    # -------------------------------------------------------------------------
+
+    def _ensure_workers(self):
+        # Nach einem fork() laufen die Threads des Elternprozesses nicht mit
+        if self._pid == os.getpid() and self._threads:
+            return
+        with self._cond:
+            if self._pid == os.getpid() and self._threads:
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._buckets = {}
+            self._limiter = RateLimiter(self.config)
+            self._threads = [threading.Thread(target=self._run, name=f'outbound-{i}', daemon=True)
+                             for i in range(self.config.SENDERS)]
+            self._threads.append(threading.Thread(target=self._flush_loop, name='outbound-results', daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def _buckets_for(self, phone_id: str):
+        buckets = self._buckets.get(phone_id)
+        if buckets is None:
+            with self._cond:
+                buckets = self._buckets.get(phone_id)
+                if buckets is None:
+                    rate, burst = self.config.RATE_PER_SECOND, self.config.BURST
+                    share = self.config.CAMPAIGN_SHARE
+                    buckets = self._buckets[phone_id] = (
+                        self._limiter.bucket(phone_id, TRANSACTIONAL, rate, burst),
+                        self._limiter.bucket(phone_id, CAMPAIGN, rate * share, max(1, int(burst * share)))
+                    )
+        return buckets
+
+    def _next(self) -> Optional[OutboundItem]:
+        with self._cond:
+            while not self._stopping.is_set():
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._lanes[CAMPAIGN].append(heapq.heappop(self._delayed)[2])
+                for lane in (TRANSACTIONAL, CAMPAIGN):
+                    if self._lanes[lane]:
+                        item = self._lanes[lane].popleft()
+                        self._cond.notify_all()
+                        return item
+                self._cond.wait(min(1.0, self._delayed[0][0] - now) if self._delayed else 1.0)
+        return None
+
+    def _retry_later(self, item: OutboundItem, result: dict, retry_after: str) -> bool:
+        """Kampagnen-Empfänger nach 429/5xx verzögert neu einreihen; False wenn die Versuche aufgebraucht sind
+
+        Ohne Antwort (Timeout, Abbruch) bleibt es bei 'failed': ob Meta die
+        Nachricht schon angenommen hat, ist dann unklar.
+        """
+        if item.lane != CAMPAIGN or result['status'] not in self.config.CAMPAIGN_RETRY_STATUS:
+            return False
+        if item.attempts >= self.config.CAMPAIGN_MAX_ATTEMPTS or self._stopping.is_set():
+            return False
+        delay = self.config.CAMPAIGN_RETRY_BASE_SECONDS * (2 ** (item.attempts - 1))
+        if retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        with self._cond:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._delayed_seq), item))
+            self._cond.notify_all()
+        self.metrics['campaign_retries'] += 1
+        return True
+
+    def _acquire(self, item: OutboundItem):
+        shared, campaign = self._buckets_for(item.phone_id)
+        while True:
+            if item.lane == CAMPAIGN:
+                wait = campaign.try_acquire()
+                if wait:
+                    self.metrics['throttled_waits'] += 1
+                    time.sleep(min(wait, 1.0))
+                    continue
+            wait = shared.try_acquire()
+            if not wait:
+                return
+            if item.lane == CAMPAIGN:
+                campaign.refund()
+            self.metrics['throttled_waits'] += 1
+            time.sleep(min(wait, 1.0))
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            self._acquire(item)
+            self._send(item)
+
+    def _send(self, item: OutboundItem):
+        url = f'https://graph.facebook.com/{self.config.API_VERSION}/{item.phone_id}/messages'
+        headers = {'Authorization': f'Bearer {self.token}', 'Content-Type': 'application/json'}
+        payload = {'messaging_product': 'whatsapp', 'to': item.to, **item.payload}
+        result = {'ok': False, 'status': None, 'message_id': None, 'error': None}
+        retry_after = ''
+        item.attempts += 1
+        try:
+            response = http_client.post(url, headers=headers, json=payload, upstream='graph', timeout=10)
+            result['status'] = response.status_code
+            if response.status_code == 200:
+                messages = response.json().get('messages') or [{}]
+                result.update(ok=True, message_id=messages[0].get('id'))
+            else:
+                result['error'] = response.text[:300]
+                retry_after = response.headers.get('Retry-After', '')
+                if response.status_code == 429:
+                    self.metrics['rate_limited'] += 1
+                    self._limiter.pause(item.phone_id, float(retry_after) if retry_after.isdigit() else 1.0)
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+
+        if not result['ok'] and self._retry_later(item, result, retry_after):
+            return
+        if item.lane == CAMPAIGN and not result['ok'] and result['status'] in self.config.CAMPAIGN_RETRY_STATUS:
+            # Versuche aufgebraucht: offen lassen, ein Fortsetzen der Kampagne sendet erneut
+            result['retry'] = True
+        self.metrics['sent' if result['ok'] else 'failed'] += 1
+        self.metrics[item.lane] += 1
+        item.future.set_result(result)
+        if item.lane == CAMPAIGN:
+            with self._results_lock:
+                self._results.append((item.meta, result))
+                full = len(self._results) >= self.config.RESULT_BATCH_SIZE
+            if full:
+                self.flush_results()
+
+    # -------------------------------------------------------------------------
+    # Kampagnen-Ergebnisse gebündelt melden
+    # -------------------------------------------------------------------------
+
+    def _flush_loop(self):
+        while not self._stopping.wait(self.config.RESULT_FLUSH_INTERVAL):
+            self.flush_results()
+
+    @staticmethod
+    def _released() -> dict:
+        """Nicht gesendet: der Empfänger kann beim Fortsetzen wieder eingespeist werden"""
+        return {'ok': False, 'status': None, 'message_id': None, 'error': 'shutdown', 'released': True}
+
+    def flush_results(self):
+        with self._results_lock:
+            batch, self._results = self._results, []
+        if not batch or self.on_campaign_results is None:
+            return
+        try:
+            self.on_campaign_results(batch)
+            self.metrics['result_flushes'] += 1
+        except Exception as e:
+            logger.error(f"Campaign result flush failed ({len(batch)} results): {e}")
+
+    def shutdown(self, timeout: float = 5.0):
+        """Laufende Sendungen abschließen, nicht gesendete Kampagnen-Empfänger freigeben, Ergebnisse schreiben"""
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        for thread in self._threads + self._feeders:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            unsent = [item for lane in self._lanes.values() for item in lane]
+            unsent += [entry[2] for entry in self._delayed]
+            for lane in self._lanes.values():
+                lane.clear()
+            self._delayed = []
+        for item in unsent:
+            item.future.set_result(self._released())
+        with self._results_lock:
+            self._results.extend((item.meta, self._released()) for item in unsent if item.lane == CAMPAIGN)
+        self.flush_results()
+
+
+if __name__ == '__main__':
+    print("Outbound Dispatcher Module loaded")
+    print(f"Rate: {OutboundConfig.RATE_PER_SECOND}/s pro Nummer, Kampagnen-Anteil {OutboundConfig.CAMPAIGN_SHARE:.0%}")
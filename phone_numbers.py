@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+📞 WEST MONEY OS - PHONE NUMBERS 📞
+Telefonnummern einheitlich im E.164-Format (+4915112345678)
+
+WhatsApp liefert '4915112345678', Twilio '+4915112345678', im CRM stehen
+Nummern wie '0151 / 123 456 78' - für Suche und Unique-Index zählt nur die
+normalisierte Form.
+"""
+
+import os
+import re
+from typing import Optional
+
+DEFAULT_COUNTRY_CODE = os.getenv('DEFAULT_COUNTRY_CODE', '49')
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_phone(phone: Optional[str], country_code: str = None) -> Optional[str]:
+    """E.164 oder None, wenn keine plausible Nummer übrig bleibt"""
+    if not phone:
+        return None
+    phone = phone.strip()
+    plus = phone.startswith('+')
+    digits = _NON_DIGITS.sub('', phone)
+    if not digits:
+        return None
+    if not plus:
+        if digits.startswith('00'):
+            digits = digits[2:]
+        elif digits.startswith('0'):
+            # Nationale Schreibweise: führende 0 durch Ländervorwahl ersetzen
+            digits = (country_code or DEFAULT_COUNTRY_CODE) + digits[1:]
+    # E.164: höchstens 15 Ziffern, kürzere als 8 sind keine Rufnummern
+    if not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
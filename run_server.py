@@ -6,16 +6,35 @@ import sys
 os.environ['FLASK_DEBUG'] = '0'
 os.environ['FLASK_ENV'] = 'production'
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
 
-from app import app
 
-if __name__ == '__main__':
-    print("🚀 Starting West Money OS Production Server...")
+def run_gunicorn():
+    """Pre-Fork-Server mit gunicorn.conf.py (Worker, Keep-Alive, Timeouts)"""
+    from gunicorn.app.wsgiapp import run
+    sys.argv = ['gunicorn', '--config', os.path.join(BASE_DIR, 'gunicorn.conf.py'), 'app:app']
+    run()
+
+
+def run_werkzeug():
+    """Werkzeug-Entwicklungsserver (nur lokal / zum Vergleich im Lasttest)"""
+    from app import app, initialize_app, start_background_workers
+    initialize_app()
+    start_background_workers()
     app.run(
         host='0.0.0.0',
-        port=5000,
+        port=int(os.getenv('PORT', '5000')),
         debug=False,
         use_reloader=False,
         threaded=True
     )
+
+
+if __name__ == '__main__':
+    if '--dev' in sys.argv:
+        print("🚀 Starting West Money OS Development Server...")
+        run_werkzeug()
+    else:
+        print("🚀 Starting West Money OS Production Server...")
+        run_gunicorn()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+🔊 WEST MONEY OS - TTS CACHE 🔊
+Inhaltsadressierter Datei-Cache für ElevenLabs Text-to-Speech
+
+Features:
+- Schlüssel = SHA-256 über (Text, Voice, Modell, Voice Settings) - gleiche Ansage, gleiche Datei
+- Dateien unter instance/tts_cache, gemeinsam für alle Worker und über Neustarts
+- Auslieferung per mmap, ETag/If-None-Match und Range (Twilio/Browser springen im Audio)
+- LRU-Verdrängung unter einem Größenbudget
+- Single-Flight: gleichzeitige Anfragen nach derselben neuen Ansage synthetisieren nur einmal
+- Streaming: ein durchgereichter Upstream-Stream wird nebenbei in den Cache geschrieben
+"""
+
+import os
+import json
+import mmap
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from flask import Response
+
+logger = logging.getLogger('TTSCache')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class TTSCacheConfig:
+    """TTS Cache Konfiguration"""
+
+    DIR = os.getenv('TTS_CACHE_DIR', os.path.join(BASE_DIR, 'instance', 'tts_cache'))
+    MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_MB', '512')) * 1024 * 1024
+    CHUNK_SIZE = 64 * 1024
+    # mtime als LRU-Zeitstempel für Neustarts; höchstens so oft pro Datei aktualisieren
+    TOUCH_INTERVAL = 60.0
+    SUFFIX = '.mp3'
+
+
+def cache_key(text: str, voice_id: str, model_id: str, voice_settings: dict) -> str:
+    """Stabiler Schlüssel: jede Änderung an Text, Stimme oder Settings ergibt eine neue Datei"""
+    material = json.dumps({'text': text, 'voice_id': voice_id, 'model_id': model_id,
+                           'voice_settings': voice_settings}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class TTSCache:
+    """Datei pro Schlüssel; Index (Größe, LRU-Reihenfolge) im Speicher, aus dem Verzeichnis rekonstruiert"""
+
+    def __init__(self, config=TTSCacheConfig):
+        self.config = config
+        self.dir = config.DIR
+        self._index = OrderedDict()     # key -> [size, zuletzt berührt (monotonic)]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.metrics = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'not_modified': 0,
+                        'partial': 0, 'single_flight_waits': 0}
+        os.makedirs(self.dir, exist_ok=True)
+        self._scan()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.dir, key[:2], key + self.config.SUFFIX)
+
+    # -------------------------------------------------------------------------
+    # Index
+    # -------------------------------------------------------------------------
+
+    def _scan(self):
+        """Index aus dem Verzeichnis (älteste mtime zuerst) - nach Start oder Budget-Überschreitung"""
+        entries = []
+        for shard in os.scandir(self.dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.config.SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, entry.name[:-len(self.config.SUFFIX)], st.st_size))
+        entries.sort()
+        with self._lock:
+            self._index = OrderedDict((key, [size, 0.0]) for _, key, size in entries)
+            self._bytes = sum(size for _, _, size in entries)
+
+    def _touch(self, key: str, size: int):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                # Von einem anderen Worker geschrieben
+                entry = self._index[key] = [size, 0.0]
+                self._bytes += size
+            self._index.move_to_end(key)
+            touch = now - entry[1] > self.config.TOUCH_INTERVAL
+            if touch:
+                entry[1] = now
+        if touch:
+            try:
+                os.utime(self.path_for(key))
+            except OSError:
+                pass
+
+    def _forget(self, key: str):
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[0]
+
+    def _evict(self):
+        if self._bytes <= self.config.MAX_BYTES:
+            return
+        # Andere Worker schreiben ins selbe Verzeichnis: vor dem Löschen den echten Stand lesen
+        self._scan()
+        while True:
+            with self._lock:
+                if self._bytes <= self.config.MAX_BYTES or len(self._index) <= 1:
+                    return
+                key, (size, _) = self._index.popitem(last=False)
+                self._bytes -= size
+            try:
+                os.unlink(self.path_for(key))
+            except OSError:
+                pass
+            self.metrics['evictions'] += 1
+
+    # -------------------------------------------------------------------------
+    # Lesen / Schreiben
+    # -------------------------------------------------------------------------
+
+    def _open(self, key: str):
+        """(Datei, Größe) oder None; offene Dateien bleiben auch nach einer Verdrängung lesbar"""
+        try:
+            f = open(self.path_for(key), 'rb')
+        except OSError:
+            self._forget(key)
+            return None
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            f.close()
+            return None
+        return f, size
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self.path_for(key))
+
+    def put(self, key: str, data: bytes) -> bool:
+        if not data:
+            return False
+        try:
+            writer = self.writer(key)
+            writer.write(data)
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+            return False
+        return writer.commit()
+
+    def writer(self, key: str) -> 'CacheWriter':
+        """Schrittweise schreiben (Streaming); erst commit() macht den Eintrag sichtbar"""
+        return CacheWriter(self, key)
+
+    def _stored(self, key: str, size: int):
+        with self._lock:
+            previous = self._index.pop(key, None)
+            self._bytes += size - (previous[0] if previous else 0)
+            self._index[key] = [size, time.monotonic()]
+        self.metrics['stores'] += 1
+        self._evict()
+
+    def single_flight(self, key: str) -> 'SingleFlight':
+        """with cache.single_flight(key): ... - nur ein Thread pro Schlüssel synthetisiert"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = SingleFlight(self, key)
+            flight.users += 1
+        return flight
+
+    def try_lead(self, key: str) -> Optional['SingleFlight']:
+        """Ohne Warten: Flight, wenn niemand sonst den Schlüssel gerade erzeugt (danach leave())"""
+        flight = self.single_flight(key)
+        if flight.lock.acquire(blocking=False):
+            return flight
+        self._release_flight(flight)
+        return None
+
+    def _release_flight(self, flight: 'SingleFlight'):
+        with self._lock:
+            flight.users -= 1
+            if not flight.users:
+                self._flights.pop(flight.key, None)
+
+    # -------------------------------------------------------------------------
+    # HTTP
+    # -------------------------------------------------------------------------
+
+    def response(self, key: str, request, mimetype: str = 'audio/mpeg') -> Optional[Response]:
+        """Antwort aus dem Cache (200/206/304/416) oder None bei Fehlgriff"""
+        opened = self._open(key)
+        if opened is None:
+            self.metrics['misses'] += 1
+            return None
+        f, size = opened
+        self.metrics['hits'] += 1
+        self._touch(key, size)
+
+        etag = f'"{key}"'
+        headers = {'ETag': etag, 'Accept-Ranges': 'bytes',
+                   # Inhaltsadressiert: dieselbe URL + Body liefert nie anderes Audio
+                   'Cache-Control': 'private, max-age=31536000, immutable'}
+        if request.if_none_match.contains(key):
+            f.close()
+            self.metrics['not_modified'] += 1
+            return Response(status=304, headers=headers)
+
+        start, stop, status = 0, size, 200
+        rng = request.range
+        # If-Range nur mit ETag sinnvoll - eine Datei ändert sich unter ihrem Schlüssel nie
+        if_range = request.headers.get('If-Range')
+        if rng is not None and len(rng.ranges) == 1 and (if_range is None or request.if_range.etag == key):
+            bounds = rng.range_for_length(size)
+            if bounds is None:
+                f.close()
+                return Response(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+            start, stop = bounds
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+            self.metrics['partial'] += 1
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        headers['Content-Length'] = str(stop - start)
+        return Response(self._iter_mmap(mm, start, stop), status=status, mimetype=mimetype,
+                        headers=headers, direct_passthrough=True)
+
+    def _iter_mmap(self, mm, start: int, stop: int):
+        try:
+            view = memoryview(mm)
+            try:
+                for offset in range(start, stop, self.config.CHUNK_SIZE):
+                    yield bytes(view[offset:min(offset + self.config.CHUNK_SIZE, stop)])
+            finally:
+                view.release()
+        finally:
+            mm.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = len(self._index), self._bytes
+        return {**self.metrics, 'entries': entries, 'bytes': size, 'max_bytes': self.config.MAX_BYTES}
+
+
+class SingleFlight:
+    """Pro Schlüssel ein Lock; Wartende prüfen danach den Cache, statt selbst zu synthetisieren"""
+
+    def __init__(self, cache: TTSCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.lock = threading.Lock()
+        self.users = 0
+
+    def __enter__(self):
+        if not self.lock.acquire(blocking=False):
+            self.cache.metrics['single_flight_waits'] += 1
+            self.lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.leave()
+        return False
+
+    def leave(self):
+        self.lock.release()
+        self.cache._release_flight(self)
+
+
+class CacheWriter:
+    """Temporäre Datei im Shard-Verzeichnis; commit() benennt atomar um, abort() verwirft"""
+
+    def __init__(self, cache: TTSCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.path = cache.path_for(key)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> bool:
+        try:
+            self.file.close()
+            if not self.size:
+                raise OSError('leere Audiodatei')
+            os.replace(self.tmp, self.path)
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+            self.abort()
+            return False
+        self.cache._stored(self.key, self.size)
+        return True
+
+    def abort(self):
+        try:
+            self.file.close()
+            os.unlink(self.tmp)
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    print("TTS Cache Module loaded")
+    print(f"Verzeichnis: {TTSCacheConfig.DIR}")
+    print(f"Budget: {TTSCacheConfig.MAX_BYTES // (1024 * 1024)} MB")
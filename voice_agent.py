@@ -14,11 +14,20 @@ Features:
 
 import os
 import json
+import time
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
+from functools import wraps
 from typing import Dict, Optional
+from urllib.parse import urlencode
 from flask import Blueprint, request, jsonify, Response
-import requests
+
+from http_client import http_client
+from phone_numbers import normalize_phone
+from tts_cache import TTSCache, cache_key
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,11 +47,20 @@ class VoiceConfig:
     # ElevenLabs
     ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY', '')
     ELEVENLABS_VOICE_ID = os.getenv('ELEVENLABS_VOICE_ID', '21m00Tcm4TlvDq8ikWAM')  # Rachel
+    TTS_MODEL_ID = os.getenv('ELEVENLABS_TTS_MODEL_ID', 'eleven_multilingual_v2')
+    TTS_VOICE_SETTINGS = {'stability': 0.5, 'similarity_boost': 0.75}
     
     # Twilio
     TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', '')
     TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', '')
     TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER', '')
+    # Nur lokale Entwicklung: Twilio-Webhooks ohne X-Twilio-Signature annehmen, solange kein Auth Token gesetzt ist
+    TWILIO_ALLOW_UNSIGNED = os.getenv('TWILIO_ALLOW_UNSIGNED_WEBHOOKS', '').lower() in ('1', 'true', 'yes')
+    
+    # Caller-ID: CRM-Kontext muss innerhalb dieses Budgets da sein, sonst 'support' ohne Kontext
+    CALLER_LOOKUP_BUDGET_MS = int(os.getenv('CALLER_LOOKUP_BUDGET_MS', '800'))
+    CALLER_CACHE_TTL = float(os.getenv('CALLER_CACHE_TTL', '300'))
+    CALLER_CACHE_MAX = int(os.getenv('CALLER_CACHE_MAX', '5000'))
     
     # App
     APP_URL = os.getenv('APP_URL', 'https://westmoney.de')
@@ -191,7 +209,7 @@ class ElevenLabsService:
         }
         
         try:
-            response = requests.post(url, headers=cls._headers(), json=data, timeout=30)
+            response = http_client.post(url, headers=cls._headers(), json=data, upstream='elevenlabs', timeout=30)
             result = response.json()
             
             if response.status_code in [200, 201]:
@@ -202,14 +220,20 @@ class ElevenLabsService:
             logger.error(f"ElevenLabs create_agent error: {e}")
             return {'success': False, 'error': str(e)}
     
+    # Obergrenze für get_all_agents - schützt vor einer Endlosschleife bei kaputtem Cursor
+    MAX_AGENT_PAGES = 100
+    
     @classmethod
-    def get_agents(cls) -> Dict:
-        """Listet alle Agents"""
+    def get_agents(cls, cursor: str = None) -> Dict:
+        """Listet eine Seite Agents ({'agents': [...], 'has_more': ..., 'next_cursor': ...})"""
         
         url = f"{cls.BASE_URL}/convai/agents"
+        params = {'page_size': 100}
+        if cursor:
+            params['cursor'] = cursor
         
         try:
-            response = requests.get(url, headers=cls._headers(), timeout=30)
+            response = http_client.get(url, headers=cls._headers(), params=params, upstream='elevenlabs', timeout=30)
             
             if response.status_code == 200:
                 return {'success': True, 'agents': response.json()}
@@ -218,6 +242,29 @@ class ElevenLabsService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @classmethod
+    def get_all_agents(cls) -> Dict:
+        """Alle Seiten bis has_more false; schlägt eine Seite fehl, ist das ganze Ergebnis ein Fehler"""
+        agents, cursor = [], None
+        for _ in range(cls.MAX_AGENT_PAGES):
+            result = cls.get_agents(cursor)
+            if not result.get('success'):
+                return result
+            agents.extend(upstream_agents(result))
+            page = result['agents'] if isinstance(result['agents'], dict) else {}
+            cursor = page.get('next_cursor')
+            if not page.get('has_more'):
+                return {'success': True, 'agents': agents}
+            if not cursor:
+                break
+        return {'success': False, 'error': 'Agent-Liste unvollständig (Paginierung)'}
+    
+    @classmethod
+    def tts_cache_key(cls, text: str, voice_id: str = None) -> str:
+        """Cache-Schlüssel für genau die Parameter, die text_to_speech an ElevenLabs schickt"""
+        return cache_key(text, voice_id or VoiceConfig.ELEVENLABS_VOICE_ID,
+                         VoiceConfig.TTS_MODEL_ID, VoiceConfig.TTS_VOICE_SETTINGS)
+    
     @classmethod
     def text_to_speech(cls, text: str, voice_id: str = None) -> bytes:
         """Konvertiert Text zu Sprache"""
@@ -226,18 +273,16 @@ class ElevenLabsService:
         
         data = {
             'text': text,
-            'model_id': 'eleven_multilingual_v2',
-            'voice_settings': {
-                'stability': 0.5,
-                'similarity_boost': 0.75
-            }
+            'model_id': VoiceConfig.TTS_MODEL_ID,
+            'voice_settings': VoiceConfig.TTS_VOICE_SETTINGS
         }
         
         try:
-            response = requests.post(
+            response = http_client.post(
                 url, 
                 headers={**cls._headers(), 'Accept': 'audio/mpeg'}, 
                 json=data, 
+                upstream='elevenlabs',
                 timeout=30
             )
             
@@ -248,6 +293,37 @@ class ElevenLabsService:
         except Exception as e:
             logger.error(f"TTS error: {e}")
             return None
+    
+    @classmethod
+    def text_to_speech_stream(cls, text: str, voice_id: str = None):
+        """Streaming-Endpunkt: Response mit iter_content(), sobald ElevenLabs den ersten Chunk schickt"""
+        
+        url = f"{cls.BASE_URL}/text-to-speech/{voice_id or VoiceConfig.ELEVENLABS_VOICE_ID}/stream"
+        
+        data = {
+            'text': text,
+            'model_id': VoiceConfig.TTS_MODEL_ID,
+            'voice_settings': VoiceConfig.TTS_VOICE_SETTINGS
+        }
+        
+        try:
+            response = http_client.post(
+                url,
+                headers={**cls._headers(), 'Accept': 'audio/mpeg'},
+                json=data,
+                upstream='elevenlabs',
+                timeout=30,
+                stream=True
+            )
+            
+            if response.status_code == 200:
+                return response
+            response.close()
+            return None
+            
+        except Exception as e:
+            logger.error(f"TTS stream error: {e}")
+            return None
 
 
 # =============================================================================
@@ -280,7 +356,7 @@ class TwilioService:
                 to=to_number,
                 from_=VoiceConfig.TWILIO_PHONE_NUMBER,
                 url=f"{VoiceConfig.APP_URL}/api/voice/outbound-handler?agent={agent_type}",
-                status_callback=f"{VoiceConfig.APP_URL}/api/voice/status",
+                status_callback=f"{VoiceConfig.APP_URL}/api/voice/call/status?agent={agent_type}",
                 status_callback_event=['initiated', 'ringing', 'answered', 'completed']
             )
             
@@ -323,73 +399,441 @@ class TwilioService:
 
 
 # =============================================================================
-# VOICE AGENT MANAGER
+# CALLER ID
 # =============================================================================
 
-class VoiceAgentManager:
-    """Verwaltet Voice Agents"""
+class CallerDirectory:
+    """E.164-Nummer -> CRM-Kontext für eingehende Anrufe
     
-    # Cache für erstellte Agents
-    _agents = {}
+    lookup(phone) wird von app.py gesetzt (attach_caller_lookup) und liefert
+    {'contact_id', 'name', 'open_leads', 'last_messages'} oder None. Ergebnisse
+    landen in einem LRU mit TTL; Wiederholungsanrufe und die <Redirect>-Runden
+    eines Anrufs gehen nicht mehr an die Datenbank. Eine Abfrage, die das Budget
+    überschreitet, läuft im Hintergrund weiter und füllt den Cache.
+    """
     
-    @classmethod
-    def get_or_create_agent(cls, agent_type: str) -> Optional[str]:
-        """Holt oder erstellt Agent"""
-        
-        if agent_type in cls._agents:
-            return cls._agents[agent_type]
+    def __init__(self, lookup=None, config=VoiceConfig):
+        self.lookup = lookup
+        self.config = config
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.metrics = {'hits': 0, 'misses': 0, 'lookups': 0, 'timeouts': 0, 'errors': 0}
+    
+    def _get(self, phone):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(phone)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(phone)
+                return entry
+        return None
+    
+    def _put(self, phone, caller):
+        with self._lock:
+            self._entries[phone] = (caller, time.monotonic() + self.config.CALLER_CACHE_TTL)
+            self._entries.move_to_end(phone)
+            while len(self._entries) > self.config.CALLER_CACHE_MAX:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, phone):
+        with self._lock:
+            self._entries.pop(phone, None)
+    
+    def _pool(self) -> ThreadPoolExecutor:
+        # Nach einem fork() gehören die Threads des Executors dem Elternprozess
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._inflight = {}
+                    self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='caller-lookup')
+        return self._executor
+    
+    def _load(self, phone):
+        try:
+            caller = self.lookup(phone)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.error(f"Caller lookup failed: {e}")
+            return None
+        self._put(phone, caller)
+        return caller
+    
+    def resolve(self, phone: str, budget_ms: int = None) -> tuple:
+        """(Kontext oder None, rechtzeitig?) - blockiert höchstens budget_ms"""
+        entry = self._get(phone)
+        if entry is not None:
+            self.metrics['hits'] += 1
+            return entry[0], True
+        self.metrics['misses'] += 1
+        if self.lookup is None:
+            return None, True
         
-        # Erstelle neuen Agent
-        system_prompt = VOICE_SYSTEM_PROMPTS.get(agent_type, VOICE_SYSTEM_PROMPTS['support'])
+        pool = self._pool()
+        with self._lock:
+            future = self._inflight.get(phone)
+            if future is None:
+                self.metrics['lookups'] += 1
+                future = self._inflight[phone] = pool.submit(self._load, phone)
+                future.add_done_callback(lambda _: self._inflight.pop(phone, None))
+        budget = self.config.CALLER_LOOKUP_BUDGET_MS if budget_ms is None else budget_ms
+        try:
+            return future.result(timeout=budget / 1000), True
+        except FutureTimeout:
+            self.metrics['timeouts'] += 1
+            logger.warning(f"Caller lookup over budget ({budget} ms) - fallback to support")
+            return None, False
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self.metrics, 'cached': len(self._entries), 'inflight': len(self._inflight)}
+
+
+def select_agent_type(caller: Optional[Dict]) -> str:
+    """Offene Leads -> Vertrieb, sonst Kundenservice"""
+    if caller and caller.get('open_leads'):
+        return 'sales'
+    return 'support'
+
+
+def caller_context(caller: Optional[Dict]) -> str:
+    """Kurzer Kontext für den Agent (Name, offene Leads, letzte Nachrichten)"""
+    if not caller:
+        return ''
+    lines = [f"Anrufer: {caller.get('name')}"]
+    leads = caller.get('open_leads') or []
+    if leads:
+        lines.append('Offene Anfragen: ' + '; '.join(f"{lead['title']} ({lead['status']})" for lead in leads))
+    messages = caller.get('last_messages') or []
+    if messages:
+        lines.append('Letzte Nachrichten: ' + ' | '.join(
+            f"{'Kunde' if m['direction'] == 'inbound' else 'Wir'}: {(m['content'] or '')[:120]}" for m in messages))
+    return '\n'.join(lines)
+
+
+caller_directory = CallerDirectory()
+
+# Von app.py gesetzt: record(call_sid, status, ...) puffert Call-Events, get(call_sid) liest den Rollup
+call_log = None
+
+
+def attach_caller_lookup(lookup):
+    """lookup(phone_e164) -> Kontext-Dict oder None - läuft in einem Thread-Pool, nicht im Request"""
+    caller_directory.lookup = lookup
+
+
+def attach_call_log(log):
+    global call_log
+    call_log = log
+
+
+# =============================================================================
+# AGENT REGISTRY
+# =============================================================================
+
+AGENT_FIRST_MESSAGES = {
+    'support': "Guten Tag! Hier ist Lisa von West Money. Wie kann ich Ihnen helfen?",
+    'sales': "Guten Tag! Hier ist Max von West Money. Schön, dass Sie sich für unsere Lösungen interessieren!",
+    'termin': "Guten Tag! Ich helfe Ihnen gerne bei der Terminvereinbarung."
+}
+
+
+def agent_name(agent_type: str) -> str:
+    return f"WestMoney_{agent_type}"
+
+
+class AgentRegistry:
+    """agent_type -> ElevenLabs agent_id für alle Worker
+    
+    Der Store (Tabelle voice_agents, von app.py gesetzt) überlebt Neustarts und
+    dient als Sperre zwischen Prozessen: nur wer claim() gewinnt, legt den Agent an.
+    Ohne Store bleibt die Registry im Prozessspeicher.
+    """
+    
+    # create_agent hat 30 s Timeout - so lange auf einen anderen Worker warten
+    CLAIM_WAIT_SECONDS = 35.0
+    # So alt darf der lokale Stand höchstens sein - reconcile() eines anderen Workers gilt danach auch hier
+    REVALIDATE_SECONDS = float(os.getenv('VOICE_AGENT_REVALIDATE_SECONDS', '30'))
+    
+    def __init__(self, store=None):
+        self.store = store
+        self._agents = {}
+        self._locks = {}
+        self._pending = set()
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'created': 0, 'adopted': 0, 'create_errors': 0,
+                        'background_creates': 0, 'claim_waits': 0, 'reconciled_removed': 0, 'revalidations': 0}
+    
+    def attach_store(self, store):
+        # Geladen wird beim Start (warm) bzw. beim ersten get() - nicht beim Import
+        self.store = store
+    
+    def warm(self) -> dict:
+        """Stand aus dem Store laden (ersetzt den lokalen) - beim Start, ohne ElevenLabs-Aufruf"""
+        if self.store is None:
+            return {}
+        try:
+            agents = self.store.load()
+        except Exception as e:
+            logger.error(f"Voice agent registry load failed: {e}")
+            return {}
+        with self._lock:
+            # Vom Store entfernte Agents (forget() in einem anderen Worker) fallen auch hier weg
+            self._agents = dict(agents)
+            self._loaded_at = time.monotonic()
+        return agents
+    
+    def get(self, agent_type: str) -> Optional[str]:
+        """Nie blockierend: bekannte ID oder None; fehlende Agents entstehen im Hintergrund"""
+        if self.store is not None and time.monotonic() - self._loaded_at >= self.REVALIDATE_SECONDS:
+            self.metrics['revalidations'] += 1
+            self.warm()
+        agent_id = self._agents.get(agent_type)
+        if agent_id is None:
+            # Evtl. hat ein anderer Worker ihn inzwischen angelegt
+            agent_id = self.warm().get(agent_type)
+        self.metrics['hits' if agent_id else 'misses'] += 1
+        if agent_id is None:
+            self.ensure_async(agent_type)
+        return agent_id
+    
+    def ensure_async(self, agent_type: str):
+        with self._lock:
+            if agent_type in self._pending:
+                return
+            self._pending.add(agent_type)
+        self.metrics['background_creates'] += 1
         
-        first_messages = {
-            'support': "Guten Tag! Hier ist Lisa von West Money. Wie kann ich Ihnen helfen?",
-            'sales': "Guten Tag! Hier ist Max von West Money. Schön, dass Sie sich für unsere Lösungen interessieren!",
-            'termin': "Guten Tag! Ich helfe Ihnen gerne bei der Terminvereinbarung."
-        }
+        def run():
+            try:
+                self.get_or_create(agent_type)
+            finally:
+                with self._lock:
+                    self._pending.discard(agent_type)
         
+        threading.Thread(target=run, name=f'voice-agent-{agent_type}', daemon=True).start()
+    
+    def _type_lock(self, agent_type: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(agent_type, threading.Lock())
+    
+    def get_or_create(self, agent_type: str) -> Optional[str]:
+        """Blockierend, Single-Flight pro Typ: im Prozess per Lock, zwischen Workern per claim()"""
+        with self._type_lock(agent_type):
+            agent_id = self._agents.get(agent_type) or self.warm().get(agent_type)
+            if agent_id:
+                return agent_id
+            
+            if self.store is not None and not self.store.claim(agent_type):
+                return self._wait_for_other_worker(agent_type)
+            
+            agent_id = None
+            try:
+                agent_id = self._find_upstream(agent_type) or self._create_upstream(agent_type)
+            finally:
+                if self.store is not None:
+                    if agent_id:
+                        self.store.save(agent_type, agent_id, agent_name(agent_type))
+                    else:
+                        self.store.release(agent_type)
+            if agent_id:
+                with self._lock:
+                    self._agents[agent_type] = agent_id
+            return agent_id
+    
+    def _wait_for_other_worker(self, agent_type: str) -> Optional[str]:
+        self.metrics['claim_waits'] += 1
+        deadline = time.monotonic() + self.CLAIM_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(0.5)
+            agent_id = self.warm().get(agent_type)
+            if agent_id:
+                return agent_id
+        return None
+    
+    def _find_upstream(self, agent_type: str) -> Optional[str]:
+        """Agent mit unserem Namen existiert schon (z.B. Datenbank neu) - übernehmen statt duplizieren"""
+        result = ElevenLabsService.get_all_agents()
+        if not result.get('success'):
+            return None
+        for agent in upstream_agents(result):
+            if agent.get('name') == agent_name(agent_type) and agent.get('agent_id'):
+                self.metrics['adopted'] += 1
+                logger.info(f"Adopted agent: {agent_type} -> {agent['agent_id']}")
+                return agent['agent_id']
+        return None
+    
+    def _create_upstream(self, agent_type: str) -> Optional[str]:
         result = ElevenLabsService.create_agent(
-            name=f"WestMoney_{agent_type}",
-            system_prompt=system_prompt,
-            first_message=first_messages.get(agent_type, first_messages['support'])
+            name=agent_name(agent_type),
+            system_prompt=VOICE_SYSTEM_PROMPTS.get(agent_type, VOICE_SYSTEM_PROMPTS['support']),
+            first_message=AGENT_FIRST_MESSAGES.get(agent_type, AGENT_FIRST_MESSAGES['support'])
         )
-        
         if result.get('success'):
             agent_id = result['agent'].get('agent_id')
-            cls._agents[agent_type] = agent_id
+            self.metrics['created'] += 1
             logger.info(f"Created agent: {agent_type} -> {agent_id}")
             return agent_id
-        
+        self.metrics['create_errors'] += 1
         logger.error(f"Failed to create agent: {result.get('error')}")
         return None
     
+    def reconcile(self) -> Dict:
+        """Registry mit ElevenLabs abgleichen: gelöschte Agents entfernen, vorhandene übernehmen
+        
+        Doppelte Agents (gleicher Name) werden nur gemeldet, nicht gelöscht. Entfernt
+        wird nur nach vollständig gelesener Liste (alle Seiten).
+        """
+        result = ElevenLabsService.get_all_agents()
+        if not result.get('success'):
+            return result
+        by_name = {}
+        for agent in upstream_agents(result):
+            by_name.setdefault(agent.get('name'), []).append(agent.get('agent_id'))
+        known = {agent_id for ids in by_name.values() for agent_id in ids}
+        
+        report = {'success': True, 'agents': {}, 'removed': [], 'adopted': [], 'duplicates': {}}
+        for agent_type in VOICE_SYSTEM_PROMPTS:
+            with self._type_lock(agent_type):
+                current = self._agents.get(agent_type)
+                candidates = by_name.get(agent_name(agent_type), [])
+                if current and current not in known:
+                    with self._lock:
+                        self._agents.pop(agent_type, None)
+                    if self.store is not None:
+                        self.store.forget(agent_type)
+                    self.metrics['reconciled_removed'] += 1
+                    report['removed'].append(agent_type)
+                    current = None
+                if current is None and candidates:
+                    current = candidates[0]
+                    with self._lock:
+                        self._agents[agent_type] = current
+                    if self.store is not None:
+                        self.store.save(agent_type, current, agent_name(agent_type))
+                    report['adopted'].append(agent_type)
+                extra = [agent_id for agent_id in candidates if agent_id != current]
+                if extra:
+                    report['duplicates'][agent_type] = extra
+                report['agents'][agent_type] = current
+        return report
+    
+    def stats(self) -> Dict:
+        return {**self.metrics, 'agents': dict(self._agents), 'pending': sorted(self._pending)}
+
+
+def upstream_agents(result: Dict) -> list:
+    """get_agents liefert {'agents': [...], 'has_more': ...} - nur die Liste"""
+    agents = result.get('agents')
+    if isinstance(agents, dict):
+        agents = agents.get('agents', [])
+    return agents or []
+
+
+agent_registry = AgentRegistry()
+
+
+# =============================================================================
+# VOICE AGENT MANAGER
+# =============================================================================
+
+class VoiceAgentManager:
+    """Verwaltet Voice Agents"""
+    
+    # Höchstens so oft per <Redirect> auf einen neuen Agent warten (Twilio: 15 s pro Webhook)
+    MAX_CONNECT_ATTEMPTS = 3
+    
+    @classmethod
+    def get_agent(cls, agent_type: str) -> Optional[str]:
+        """Für TwiML: nie auf eine Agent-Erstellung warten"""
+        return agent_registry.get(agent_type)
+    
+    @classmethod
+    def get_or_create_agent(cls, agent_type: str) -> Optional[str]:
+        """Holt oder erstellt Agent (blockierend, z.B. für die Admin-API)"""
+        return agent_registry.get_or_create(agent_type)
+    
     @classmethod
     def handle_incoming_call(cls, caller_number: str) -> Dict:
-        """Verarbeitet eingehenden Anruf"""
+        """Verarbeitet eingehenden Anruf: CRM-Lookup im Zeitbudget, danach Agent-Auswahl"""
         
-        # Hier könnte CRM-Lookup stattfinden
-        # contact = Contact.query.filter_by(phone=caller_number).first()
+        phone = normalize_phone(caller_number)
+        caller, in_time = caller_directory.resolve(phone) if phone else (None, True)
         
         return {
-            'caller': caller_number,
-            'agent_type': 'support',
-            'context': '',
+            'caller': phone or caller_number,
+            'contact_id': caller.get('contact_id') if caller else None,
+            'name': caller.get('name') if caller else None,
+            'agent_type': select_agent_type(caller),
+            'context': caller_context(caller),
+            'in_time': in_time,
             'timestamp': datetime.utcnow().isoformat()
         }
 
 
+# =============================================================================
+# ZUGRIFF
+# =============================================================================
+
+# Von register_voice_blueprint gesetzt: login_required der App für die Verwaltungs-Routen
+_login_required = None
+
+
+def admin_route(view):
+    """Verwaltungs-Routen nur mit angemeldeter Sitzung; ohne Prüfung immer 401"""
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        if _login_required is None:
+            return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+        return _login_required(view)(*args, **kwargs)
+    return decorated
+
+
+def valid_twilio_request() -> bool:
+    """X-Twilio-Signature über URL (inkl. Query) und Formularfelder, signiert mit dem Auth Token"""
+    if not VoiceConfig.TWILIO_AUTH_TOKEN:
+        return VoiceConfig.TWILIO_ALLOW_UNSIGNED
+    signature = request.headers.get('X-Twilio-Signature', '')
+    if not signature:
+        return False
+    try:
+        from twilio.request_validator import RequestValidator
+    except ImportError:
+        logger.error("Twilio SDK nicht installiert - Webhook-Signatur kann nicht geprüft werden")
+        return False
+    # Hinter dem Proxy liefert ProxyFix Schema und Host, wie Twilio sie aufgerufen hat
+    return RequestValidator(VoiceConfig.TWILIO_AUTH_TOKEN).validate(request.url, request.form.to_dict(), signature)
+
+
+def twilio_route(view):
+    """Twilio-Webhooks: ohne gültige Signatur 403"""
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        if not valid_twilio_request():
+            logger.warning(f"Rejected Twilio webhook without valid signature: {request.path}")
+            return jsonify({'error': 'invalid signature'}), 403
+        return view(*args, **kwargs)
+    return decorated
+
+
 # =============================================================================
 # API ROUTES
 # =============================================================================
 
 @voice_bp.route('/agents', methods=['GET'])
+@admin_route
 def list_agents():
-    """Listet alle Voice Agents"""
-    result = ElevenLabsService.get_agents()
+    """Listet die Voice Agents seitenweise (?cursor=... aus next_cursor)"""
+    result = ElevenLabsService.get_agents(request.args.get('cursor'))
     return jsonify(result)
 
 
 @voice_bp.route('/agents', methods=['POST'])
+@admin_route
 def create_agent():
     """Erstellt neuen Voice Agent"""
     data = request.get_json() or {}
@@ -402,7 +846,23 @@ def create_agent():
     return jsonify({'success': False, 'error': 'Agent konnte nicht erstellt werden'}), 500
 
 
+@voice_bp.route('/agents/reconcile', methods=['POST'])
+@admin_route
+def reconcile_agents():
+    """Registry mit ElevenLabs abgleichen"""
+    result = agent_registry.reconcile()
+    return jsonify(result), (200 if result.get('success') else 502)
+
+
+@voice_bp.route('/agents/registry', methods=['GET'])
+@admin_route
+def agent_registry_stats():
+    """Bekannte Agents und Registry-Metriken"""
+    return jsonify({**agent_registry.stats(), 'callers': caller_directory.stats()})
+
+
 @voice_bp.route('/call/outbound', methods=['POST'])
+@admin_route
 def initiate_outbound_call():
     """Startet ausgehenden Anruf"""
     data = request.get_json() or {}
@@ -425,6 +885,8 @@ def initiate_outbound_call():
 
 
 @voice_bp.route('/call/status', methods=['POST'])
+@voice_bp.route('/status', methods=['POST'])
+@twilio_route
 def call_status_callback():
     """Twilio Status Callback"""
     
@@ -434,17 +896,55 @@ def call_status_callback():
     
     logger.info(f"Call {call_sid}: {call_status} ({duration}s)")
     
-    # Hier könnte Logging in Datenbank erfolgen
+    # Nur puffern - geschrieben wird gebündelt im Hintergrund
+    if call_log is not None:
+        call_log.record(call_sid, call_status, agent_type=request.args.get('agent'),
+                        direction=request.form.get('Direction'), from_number=request.form.get('From'),
+                        to_number=request.form.get('To'), duration=duration)
     
     return '', 200
 
 
+def connect_agent(response, agent_type: str, context: Dict = None):
+    """Mit dem Agent verbinden oder - solange er noch angelegt wird - kurz halten und neu anfragen
+    
+    Twilio wartet höchstens 15 s auf TwiML; eine Agent-Erstellung darf hier nie blockieren.
+    """
+    from twilio.twiml.voice_response import Connect, Stream
+    
+    agent_id = VoiceAgentManager.get_agent(agent_type)
+    if agent_id:
+        connect = Connect()
+        stream = Stream(url=f"wss://api.elevenlabs.io/v1/convai/conversation?agent_id={agent_id}")
+        # Kommen als customParameters im 'start'-Event des Media Streams an
+        for key in ('caller', 'contact_id', 'name', 'context'):
+            if context and context.get(key):
+                stream.parameter(name=key, value=str(context[key]))
+        connect.append(stream)
+        response.append(connect)
+        return response
+    
+    attempt = request.args.get('attempt', 0, type=int)
+    if attempt >= VoiceAgentManager.MAX_CONNECT_ATTEMPTS:
+        response.say("Entschuldigung, der Service ist momentan nicht verfügbar. Bitte versuchen Sie es später erneut.", voice='alice', language='de-DE')
+        return response
+    
+    if attempt == 0:
+        response.say("Einen Moment bitte.", voice='alice', language='de-DE')
+    response.pause(length=3)
+    # Agent-Auswahl festhalten: Folgerunden verbinden mit demselben Agent
+    args = {**request.args.to_dict(), 'agent': agent_type, 'attempt': attempt + 1}
+    response.redirect(f"{request.path}?{urlencode(args)}", method='POST')
+    return response
+
+
 @voice_bp.route('/incoming', methods=['POST'])
+@twilio_route
 def handle_incoming():
     """Twilio Webhook für eingehende Anrufe"""
     
     try:
-        from twilio.twiml.voice_response import VoiceResponse, Connect, Stream
+        from twilio.twiml.voice_response import VoiceResponse
     except ImportError:
         return jsonify({'error': 'Twilio SDK nicht installiert'}), 500
     
@@ -455,68 +955,148 @@ def handle_incoming():
     # Anruf-Kontext laden
     context = VoiceAgentManager.handle_incoming_call(caller)
     
-    # TwiML Response erstellen
-    response = VoiceResponse()
+    # TwiML Response erstellen und mit ElevenLabs Agent verbinden
+    agent_type = request.args.get('agent') or context['agent_type']
+    response = connect_agent(VoiceResponse(), agent_type, context)
     
-    # Mit ElevenLabs Agent verbinden
-    connect = Connect()
-    stream = Stream(
-        url=f"wss://api.elevenlabs.io/v1/convai/conversation?agent_id={VoiceAgentManager.get_or_create_agent('support')}"
-    )
-    connect.append(stream)
-    response.append(connect)
+    # Folgerunden (Agent wird noch angelegt) sind derselbe Anruf - nur die erste zählt
+    if call_log is not None and request.args.get('attempt', 0, type=int) == 0:
+        call_log.record(request.form.get('CallSid'), 'routed', agent_type=agent_type, direction='inbound',
+                        from_number=caller, to_number=request.form.get('To'), contact_id=context['contact_id'])
     
     return Response(str(response), mimetype='application/xml')
 
 
 @voice_bp.route('/outbound-handler', methods=['POST'])
+@twilio_route
 def outbound_handler():
     """Handler für ausgehende Anrufe"""
     
     try:
-        from twilio.twiml.voice_response import VoiceResponse, Connect, Stream
+        from twilio.twiml.voice_response import VoiceResponse
     except ImportError:
         return jsonify({'error': 'Twilio SDK nicht installiert'}), 500
     
     agent_type = request.args.get('agent', 'support')
     
-    response = VoiceResponse()
-    
     # Mit entsprechendem Agent verbinden
-    agent_id = VoiceAgentManager.get_or_create_agent(agent_type)
-    
-    if agent_id:
-        connect = Connect()
-        stream = Stream(
-            url=f"wss://api.elevenlabs.io/v1/convai/conversation?agent_id={agent_id}"
-        )
-        connect.append(stream)
-        response.append(connect)
-    else:
-        response.say("Entschuldigung, der Service ist momentan nicht verfügbar. Bitte versuchen Sie es später erneut.", voice='alice', language='de-DE')
+    response = connect_agent(VoiceResponse(), agent_type)
     
     return Response(str(response), mimetype='application/xml')
 
 
+# Wiederkehrende Ansagen (Begrüßungen, Menüs) nur einmal synthetisieren
+tts_cache = TTSCache()
+
+
 @voice_bp.route('/tts', methods=['POST'])
+@admin_route
 def text_to_speech():
-    """Text-to-Speech API"""
+    """Text-to-Speech API (Cache: ETag, Range, keine ElevenLabs-Anfrage bei Wiederholung)
+
+    {"stream": true}: Audio wird schon während der Synthese ausgeliefert.
+    """
     data = request.get_json() or {}
     
     text = data.get('text')
     if not text:
         return jsonify({'error': 'Text erforderlich'}), 400
     
-    audio = ElevenLabsService.text_to_speech(text)
+    key = ElevenLabsService.tts_cache_key(text)
+    cached = tts_cache.response(key, request)
+    if cached is not None:
+        return cached
+    
+    if data.get('stream'):
+        return stream_text_to_speech(text, key)
+    
+    audio = None
+    with tts_cache.single_flight(key):
+        # Ein paralleler Request hat die Ansage evtl. gerade erzeugt
+        if tts_cache.contains(key):
+            cached = tts_cache.response(key, request)
+        if cached is None:
+            audio = ElevenLabsService.text_to_speech(text)
+            if audio and tts_cache.put(key, audio):
+                cached = tts_cache.response(key, request)
     
+    if cached is not None:
+        return cached
     if audio:
         return Response(audio, mimetype='audio/mpeg')
     return jsonify({'error': 'TTS fehlgeschlagen'}), 500
 
 
+def stream_text_to_speech(text, key):
+    """Chunks von ElevenLabs direkt weiterreichen und dabei in den Cache schreiben"""
+    # Erzeugt gerade ein anderer Request dieselbe Ansage, nur durchreichen statt zu warten
+    flight = tts_cache.try_lead(key)
+    upstream = ElevenLabsService.text_to_speech_stream(text)
+    if upstream is None:
+        if flight is not None:
+            flight.leave()
+        return jsonify({'error': 'TTS fehlgeschlagen'}), 500
+
+    released = threading.Event()
+
+    def release():
+        # Einmal, egal ob aus dem Generator oder aus Response.close()
+        if released.is_set():
+            return
+        released.set()
+        upstream.close()
+        if flight is not None:
+            flight.leave()
+
+    def relay():
+        writer = None
+        committed = False
+        try:
+            if flight is not None:
+                try:
+                    writer = tts_cache.writer(key)
+                except OSError as e:
+                    logger.warning(f"TTS cache write failed: {e}")
+            for chunk in upstream.iter_content(chunk_size=None):
+                if not chunk:
+                    continue
+                if writer is not None:
+                    try:
+                        writer.write(chunk)
+                    except OSError as e:
+                        # Platte voll o.ä.: Audio trotzdem zu Ende ausliefern
+                        logger.warning(f"TTS cache write failed: {e}")
+                        writer.abort()
+                        writer = None
+                yield chunk
+            if writer is not None:
+                committed = writer.commit()
+        finally:
+            # Abbruch durch den Client oder Upstream-Fehler: keine halbe Datei im Cache
+            if writer is not None and not committed:
+                writer.abort()
+            release()
+
+    response = Response(relay(), mimetype='audio/mpeg', headers={'Cache-Control': 'no-store'})
+    # Trennt der Client vor dem ersten Chunk, läuft der Generator nie an und sein finally nicht
+    response.call_on_close(release)
+    return response
+
+
+@voice_bp.route('/tts/stats', methods=['GET'])
+@admin_route
+def tts_stats():
+    """Trefferquote und Größe des TTS-Caches"""
+    return jsonify(tts_cache.stats())
+
+
 @voice_bp.route('/call/<call_sid>', methods=['GET'])
+@admin_route
 def get_call(call_sid):
-    """Holt Anrufdetails"""
+    """Holt Anrufdetails - aus den Status-Callbacks, Twilio nur für unbekannte Anrufe"""
+    call = call_log.get(call_sid) if call_log is not None else None
+    if call is not None:
+        return jsonify({'success': True, 'call': call, 'source': 'local'})
     result = TwilioService.get_call_details(call_sid)
     return jsonify(result)
 
@@ -618,9 +1198,21 @@ def get_voice_widget():
 # EXPORT
 # =============================================================================
 
-def register_voice_blueprint(app):
-    """Registriert Voice Blueprint"""
+def register_voice_blueprint(app, login_required, agent_store=None):
+    """Registriert Voice Blueprint
+
+    login_required schützt die Verwaltungs-Routen (Agents, Anrufe, TTS);
+    agent_store (load/claim/save/release/forget) persistiert die Agents.
+    """
+    global _login_required
+    _login_required = login_required
+    if agent_store is not None:
+        agent_registry.attach_store(agent_store)
     app.register_blueprint(voice_bp)
+    if not VoiceConfig.TWILIO_AUTH_TOKEN and VoiceConfig.TWILIO_ALLOW_UNSIGNED:
+        print("⚠️ TWILIO_ALLOW_UNSIGNED_WEBHOOKS aktiv - Twilio-Webhooks ohne Signatur (nur Entwicklung!)")
+    elif not VoiceConfig.TWILIO_AUTH_TOKEN:
+        print("⚠️ TWILIO_AUTH_TOKEN nicht gesetzt - Twilio-Webhooks werden mit 403 abgelehnt")
     print("✅ Voice Agent Blueprint registered")
 
 
@@ -5,9 +5,12 @@ Enterprise Universe GmbH - West Money OS
 """
 
 import os
-import requests
+import time
 from dotenv import load_dotenv
 
+from http_client import http_client
+from whatsapp_templates import TemplateConfig, TemplateRegistry
+
 load_dotenv()
 
 class WhatsAppSetup:
@@ -19,45 +22,65 @@ class WhatsAppSetup:
         self.business_id = os.getenv('WHATSAPP_BUSINESS_ID', '412877065246901')
         self.api_version = 'v21.0'
         self.base_url = f'https://graph.facebook.com/{self.api_version}'
+        # Erfolgreiche Verbindungsprüfung kurz zwischenspeichern (Dashboard/Health fragen oft)
+        self.connection_cache_seconds = float(os.getenv('WHATSAPP_CONNECTION_CACHE_SECONDS', '60'))
+        self._connection = (0.0, None)
     
-    def check_connection(self):
+    def check_connection(self, refresh=False):
         """Test API connection"""
         if not self.token or self.token.startswith('EAAG...'):
             return {'success': False, 'error': 'WHATSAPP_TOKEN nicht konfiguriert'}
         
+        expires, cached = self._connection
+        if cached is not None and not refresh and time.monotonic() < expires:
+            return cached
+        
         url = f'{self.base_url}/{self.phone_id}'
         headers = {'Authorization': f'Bearer {self.token}'}
         
         try:
-            response = requests.get(url, headers=headers)
+            response = http_client.get(url, headers=headers, upstream='graph')
             if response.status_code == 200:
                 data = response.json()
-                return {
+                result = {
                     'success': True,
                     'phone_number': data.get('display_phone_number'),
                     'verified_name': data.get('verified_name'),
                     'quality_rating': data.get('quality_rating')
                 }
+                self._connection = (time.monotonic() + self.connection_cache_seconds, result)
+                return result
             else:
                 return {'success': False, 'error': response.json()}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_message_templates(self):
-        """Get available message templates"""
+    def get_message_templates(self, refresh=False):
+        """Get available message templates (aus der lokalen Registry, Graph nur beim Sync)"""
+        if refresh:
+            try:
+                template_registry.refresh()
+            except Exception:
+                pass
+        return template_registry.all()
+    
+    def fetch_template_page(self, after=None):
+        """Eine Seite message_templates von Graph: (templates, after-Cursor der nächsten Seite)"""
         if not self.token or self.token.startswith('EAAG...'):
-            return []
+            raise RuntimeError('WHATSAPP_TOKEN nicht konfiguriert')
         
         url = f'{self.base_url}/{self.business_id}/message_templates'
         headers = {'Authorization': f'Bearer {self.token}'}
+        params = {'fields': ','.join(TemplateConfig.FIELDS), 'limit': TemplateConfig.PAGE_SIZE}
+        if after:
+            params['after'] = after
         
-        try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                return response.json().get('data', [])
-            return []
-        except:
-            return []
+        response = http_client.get(url, headers=headers, params=params, upstream='graph')
+        if response.status_code != 200:
+            raise RuntimeError(f'Graph API {response.status_code}: {response.text[:200]}')
+        data = response.json()
+        paging = data.get('paging', {})
+        return data.get('data', []), paging.get('cursors', {}).get('after') if paging.get('next') else None
     
     def create_template(self, name, category, language, body):
         """Create a new message template"""
@@ -80,7 +103,9 @@ class WhatsAppSetup:
         }
         
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = http_client.post(url, headers=headers, json=payload, upstream='graph')
+            # Neues Template (PENDING) beim nächsten Sync übernehmen
+            template_registry.request_refresh()
             return response.json()
         except Exception as e:
             return {'error': str(e)}
@@ -102,12 +127,16 @@ class WhatsAppSetup:
         }
         
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = http_client.post(url, headers=headers, json=payload, upstream='graph')
             return response.json()
         except Exception as e:
             return {'error': str(e)}
 
 
+# Gemeinsame Registry für App und Webhook; Lookups kommen aus dem Speicher
+template_registry = TemplateRegistry(lambda after: WhatsAppSetup().fetch_template_page(after))
+
+
 # Recommended Templates
 RECOMMENDED_TEMPLATES = [
     {
@@ -163,7 +192,7 @@ if __name__ == '__main__':
         
         print()
         print("📋 Vorhandene Templates:")
-        templates = wa.get_message_templates()
+        templates = wa.get_message_templates(refresh=True)
         for t in templates[:5]:
             print(f"   • {t.get('name')} ({t.get('status')})")
     else:
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+📋 WEST MONEY OS - WHATSAPP TEMPLATE REGISTRY 📋
+Lokale Kopie der Meta Message Templates
+
+Features:
+- Lookup nach (Name, Sprache) aus dem Speicher - kein Graph-Aufruf pro Versand
+- Sync im Hintergrund: seitenweise abholen, nur geänderte Einträge übernehmen
+- Status-Webhooks (message_template_status_update) aktualisieren einzelne Templates sofort
+- JSON-Datei als gemeinsamer Stand für alle Worker und nach Neustarts
+- Metriken: Alter des Stands, Syncs, Fehler, Änderungen, Treffer
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger('WhatsAppTemplates')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class TemplateConfig:
+    """Template Registry Konfiguration"""
+
+    PATH = os.getenv('WHATSAPP_TEMPLATES_PATH', os.path.join(BASE_DIR, 'instance', 'whatsapp_templates.json'))
+    REFRESH_SECONDS = float(os.getenv('WHATSAPP_TEMPLATE_REFRESH_SECONDS', '900'))
+    # Nach einem Fehler früher erneut versuchen, aber nicht im Sekundentakt
+    RETRY_SECONDS = float(os.getenv('WHATSAPP_TEMPLATE_RETRY_SECONDS', '60'))
+    PAGE_SIZE = int(os.getenv('WHATSAPP_TEMPLATE_PAGE_SIZE', '100'))
+    MAX_PAGES = 50
+
+    FIELDS = ('id', 'name', 'language', 'status', 'category', 'components')
+
+
+def template_key(name: str, language: str) -> str:
+    return f'{name}:{language}'
+
+
+def _digest(template: dict) -> str:
+    return hashlib.sha1(json.dumps(template, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+class TemplateRegistry:
+    """Templates im Speicher; fetch_page(after) -> (templates, next_after) holt eine Graph-Seite"""
+
+    def __init__(self, fetch_page: Callable[[Optional[str]], tuple], config=TemplateConfig):
+        self.fetch_page = fetch_page
+        self.config = config
+        self._templates = {}
+        self._digests = {}
+        self._synced_at = None      # Wall-Clock des letzten vollständigen Syncs (auch aus der Datei)
+        self._file_mtime = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._requested = False
+        self.metrics = {'hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0, 'file_loads': 0,
+                        'added': 0, 'updated': 0, 'removed': 0, 'status_updates': 0}
+        self.last_error = None
+        self._load_file()
+
+    # -------------------------------------------------------------------------
+    # Lookups (nie blockierend)
+    # -------------------------------------------------------------------------
+
+    def get(self, name: str, language: str = 'de') -> Optional[dict]:
+        self._ensure_worker()
+        template = self._templates.get(template_key(name, language))
+        self.metrics['hits' if template else 'misses'] += 1
+        if template is None:
+            self.request_refresh()
+        elif self.stale:
+            self._wakeup.set()
+        return template
+
+    def request_refresh(self):
+        """Sync im Hintergrund anstoßen (höchstens alle RETRY_SECONDS), ohne zu warten"""
+        self._ensure_worker()
+        self._requested = True
+        self._wakeup.set()
+
+    def all(self) -> list:
+        self._ensure_worker()
+        return sorted(self._templates.values(), key=lambda t: (t.get('name', ''), t.get('language', '')))
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        return None if self._synced_at is None else max(0.0, time.time() - self._synced_at)
+
+    @property
+    def stale(self) -> bool:
+        age = self.age_seconds
+        return age is None or age > self.config.REFRESH_SECONDS
+
+    def stats(self) -> dict:
+        age = self.age_seconds
+        return {**self.metrics, 'templates': len(self._templates), 'stale': self.stale,
+                'age_seconds': None if age is None else round(age, 1), 'last_error': self.last_error}
+
+    # -------------------------------------------------------------------------
+    # Sync
+    # -------------------------------------------------------------------------
+
+    def refresh(self) -> dict:
+        """Alle Seiten abholen und nur die Unterschiede übernehmen; bei Fehlern bleibt der alte Stand"""
+        fetched, after = {}, None
+        try:
+            for _ in range(self.config.MAX_PAGES):
+                page, after = self.fetch_page(after)
+                for template in page:
+                    record = {field: template.get(field) for field in self.config.FIELDS}
+                    fetched[template_key(record['name'], record['language'])] = record
+                if not after:
+                    break
+        except Exception as e:
+            self.metrics['refresh_errors'] += 1
+            self.last_error = f'{type(e).__name__}: {e}'
+            logger.error(f"Template sync failed: {self.last_error}")
+            raise
+
+        with self._lock:
+            templates, digests = dict(self._templates), dict(self._digests)
+            changes = {'added': 0, 'updated': 0, 'removed': 0}
+            for key, record in fetched.items():
+                digest = _digest(record)
+                if key not in digests:
+                    changes['added'] += 1
+                elif digests[key] != digest:
+                    changes['updated'] += 1
+                else:
+                    continue
+                templates[key], digests[key] = record, digest
+            for key in set(templates) - set(fetched):
+                del templates[key], digests[key]
+                changes['removed'] += 1
+            # Referenz austauschen: Leser sehen immer einen vollständigen Stand
+            self._templates, self._digests = templates, digests
+            self._synced_at = time.time()
+            self._save_file()
+        for name, count in changes.items():
+            self.metrics[name] += count
+        self.metrics['refreshes'] += 1
+        self.last_error = None
+        return changes
+
+    def apply_status_update(self, value: dict) -> bool:
+        """Webhook-Feld message_template_status_update: APPROVED, REJECTED, PAUSED, ..."""
+        key = template_key(value.get('message_template_name'), value.get('message_template_language'))
+        with self._lock:
+            current = self._templates.get(key)
+            if current is None:
+                self._requested = True
+                self._wakeup.set()
+                return False
+            record = {**current, 'status': value.get('event') or current.get('status')}
+            templates, digests = dict(self._templates), dict(self._digests)
+            templates[key], digests[key] = record, _digest(record)
+            self._templates, self._digests = templates, digests
+            self._save_file()
+        self.metrics['status_updates'] += 1
+        return True
+
+    # -------------------------------------------------------------------------
+    # Datei (gemeinsamer Stand aller Worker)
+    # -------------------------------------------------------------------------
+
+    def _save_file(self):
+        path = self.config.PATH
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'synced_at': self._synced_at, 'templates': list(self._templates.values())},
+                          f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self._file_mtime = os.stat(path).st_mtime
+        except OSError as e:
+            logger.warning(f"Template file {path} not written: {e}")
+
+    def _load_file(self) -> bool:
+        try:
+            mtime = os.stat(self.config.PATH).st_mtime
+            if mtime == self._file_mtime:
+                return False
+            with open(self.config.PATH, encoding='utf-8') as f:
+                data = json.load(f)
+            templates = {template_key(t['name'], t['language']): t for t in data.get('templates', [])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self._lock:
+            self._templates = templates
+            self._digests = {key: _digest(t) for key, t in templates.items()}
+            self._synced_at = data.get('synced_at')
+            self._file_mtime = mtime
+        self.metrics['file_loads'] += 1
+        return True
+
+    # -------------------------------------------------------------------------
+    # Hintergrund-Sync
+    # -------------------------------------------------------------------------
+
+    def _ensure_worker(self):
+        # Nach einem fork() läuft der Thread des Elternprozesses nicht mit
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='whatsapp-templates', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            # Ein anderer Worker hat evtl. schon synchronisiert - dann reicht die Datei
+            self._load_file()
+            age = self.age_seconds
+            # Unbekannte Namen lösen höchstens alle RETRY_SECONDS einen Sync aus
+            requested = self._requested and (age is None or age > self.config.RETRY_SECONDS)
+            if self.stale or requested:
+                self._requested = False
+                try:
+                    self.refresh()
+                except Exception:
+                    self._wakeup.wait(self.config.RETRY_SECONDS)
+                    self._wakeup.clear()
+                    continue
+            self._wakeup.wait(max(1.0, self.config.REFRESH_SECONDS - (self.age_seconds or 0)))
+            self._wakeup.clear()
+
+
+if __name__ == '__main__':
+    print("WhatsApp Template Registry Module loaded")
+    print(f"Datei: {TemplateConfig.PATH}")
+    print(f"Sync alle {TemplateConfig.REFRESH_SECONDS:.0f}s")
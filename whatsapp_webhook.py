@@ -11,35 +11,93 @@ import hashlib
 import json
 from datetime import datetime
 
+from inbound_queue import InboundQueue, MessageDeduplicator
+from intent_matcher import IntentMatcher
+from conversation_sessions import ConversationSessions, Flow
+from outbound_dispatcher import OutboundDispatcher
+from whatsapp_setup import template_registry
+
 whatsapp_webhook_bp = Blueprint('whatsapp_webhook', __name__)
 
-VERIFY_TOKEN = os.getenv('WEBHOOK_SECRET', 'westmoney_webhook_2025')
-WHATSAPP_TOKEN = os.getenv('WHATSAPP_TOKEN', '')
+# Gleiche Variablen wie der frühere Node-Bot (whatsapp-bot/app.js), damit dessen .env weiter passt
+VERIFY_TOKEN = (os.getenv('WHATSAPP_WEBHOOK_VERIFY_TOKEN') or os.getenv('WEBHOOK_SECRET')
+                or 'westmoney_webhook_2025')
+WHATSAPP_TOKEN = os.getenv('WHATSAPP_TOKEN') or os.getenv('WHATSAPP_ACCESS_TOKEN', '')
+# App-Secret der Meta-App: Meta signiert jeden Webhook-POST damit (X-Hub-Signature-256)
+APP_SECRET = os.getenv('WHATSAPP_APP_SECRET', '')
+# Nur lokale Entwicklung: unsignierte POSTs annehmen, solange kein App-Secret gesetzt ist
+ALLOW_UNSIGNED = os.getenv('WHATSAPP_ALLOW_UNSIGNED_WEBHOOKS', '').lower() in ('1', 'true', 'yes')
 
 # Message Handlers
 MESSAGE_HANDLERS = {
     '1': 'smart_home_info',
-    '2': 'automation_inquiry',
+    '2': 'construction_info',
     '3': 'pricing_info',
-    '4': 'support_request',
+    '4': 'contact_info',
     'hallo': 'welcome',
     'hi': 'welcome',
+    'menu': 'welcome',
+    'menü': 'welcome',
     'hilfe': 'help_menu',
     'help': 'help_menu',
     'termin': 'appointment',
     'preis': 'pricing_info',
     'angebot': 'quote_request',
+    'support': 'support_request',
+    'kontakt': 'contact_info',
+    'bau': 'construction_info',
+    # Button-/Listen-IDs aus den interaktiven Nachrichten
+    'smart_home': 'smart_home_info',
+}
+
+HANDOFF_WORDS = ['mensch*', 'mitarbeiter*', 'agent', 'person']
+
+# Zusätzliche Beugungs-/Wortformen (Präfix mit '*'), nur für die Teiltreffer-Suche
+INTENT_PREFIXES = {
+    'appointment': ['termin*'],
+    'pricing_info': ['preis*'],
+    'quote_request': ['angebot*'],
 }
 
+# Bei mehreren Treffern gewinnt die höhere Priorität, dann der frühere Treffer.
+# Konkrete Anliegen schlagen Begrüßung und Menü ("Hallo, ich hätte gern einen Termin").
+INTENT_PRIORITIES = {
+    'human_handoff': 60,
+    'appointment': 50,
+    'quote_request': 50,
+    'pricing_info': 40,
+    'smart_home_info': 30,
+    'construction_info': 30,
+    'support_request': 30,
+    'contact_info': 30,
+    'help_menu': 20,
+    'welcome': 10,
+}
+
+
+def default_intent_table():
+    table = {}
+    for keyword, intent in MESSAGE_HANDLERS.items():
+        table.setdefault(intent, []).append(keyword)
+    table['human_handoff'] = list(HANDOFF_WORDS)
+    for intent, prefixes in INTENT_PREFIXES.items():
+        table.setdefault(intent, []).extend(prefixes)
+    return [{'intent': intent, 'priority': INTENT_PRIORITIES.get(intent, 0), 'keywords': keywords}
+            for intent, keywords in table.items()]
+
+
+# WHATSAPP_INTENTS_PATH: optionale JSON-Tabelle, ersetzt die Standard-Intents und wird live neu geladen
+intent_matcher = IntentMatcher(default_intent_table(), path=os.getenv('WHATSAPP_INTENTS_PATH'))
+
 RESPONSES = {
     'welcome': '''Willkommen bei West Money OS! 👋
 
 Ich bin Ihr digitaler Assistent. Wie kann ich Ihnen helfen?
 
 1️⃣ Smart Home Beratung
-2️⃣ Automation Anfrage  
+2️⃣ Bauservice
 3️⃣ Preise & Angebote
-4️⃣ Support
+4️⃣ Kontakt
 
 Antworten Sie einfach mit der Nummer oder schreiben Sie Ihre Frage.''',
     
@@ -51,6 +109,7 @@ Hier sind die verfügbaren Optionen:
 • "preis" - Preisanfrage
 • "angebot" - Angebot anfordern
 • "support" - Technischer Support
+• "kontakt" - Telefon, E-Mail, Web
 • "mensch" - Mit einem Mitarbeiter sprechen
 
 Oder beschreiben Sie einfach Ihr Anliegen!''',
@@ -69,6 +128,29 @@ Wir bieten professionelle Smart Home Integration:
 
 Möchten Sie eine kostenlose Beratung? Antworten Sie mit "termin"''',
     
+    'construction_info': '''🏗️ *West Money Bau*
+
+• Barrierefreies Bauen nach DIN 18040
+• Energetische Sanierung
+• Smart Home Integration im Neubau und Bestand
+
+Für eine Beratung antworten Sie mit "angebot"''',
+    
+    'contact_info': '''📞 *Kontakt*
+
+Tel: +49 177 454 7727
+E-Mail: info@west-money.com
+Web: west-money.com
+
+Mo-Fr: 09:00 - 17:00 Uhr''',
+    
+    'support_request': '''🛠️ *Technischer Support*
+
+Beschreiben Sie bitte kurz das Problem (System, was passiert, seit wann).
+Ein Techniker meldet sich schnellstmöglich bei Ihnen.
+
+Dringend? Tel: +49 177 454 7727''',
+    
     'pricing_info': '''💰 *Preisübersicht West Money Bau*
 
 🏠 Smart Home Paket Basic: ab €15.000
@@ -85,17 +167,16 @@ Für ein individuelles Angebot antworten Sie mit "angebot"''',
     
     'appointment': '''📅 *Terminvereinbarung*
 
-Wann passt es Ihnen am besten?
-
 Mo-Fr: 09:00 - 17:00 Uhr
 Sa: Nach Vereinbarung
 
-Bitte nennen Sie mir:
-1. Ihren Wunschtermin
-2. Ihr Anliegen
-3. Ihre Kontaktdaten
+Ich frage kurz drei Dinge ab (Abbruch jederzeit mit "abbrechen").''',
+    
+    'quote_request': '''📝 *Angebotsanfrage*
+
+Gern erstellen wir Ihnen ein individuelles Angebot.
 
-Ein Mitarbeiter wird sich umgehend bei Ihnen melden.''',
+Ich frage kurz drei Dinge ab (Abbruch jederzeit mit "abbrechen").''',
     
     'human_handoff': '''👤 *Weiterleitung an Mitarbeiter*
 
@@ -115,15 +196,35 @@ In der Zwischenzeit können Sie:
 • "preis" für Preisinformationen'''
 }
 
+# Mehrstufige Abläufe: Intent -> Fragen; das Ergebnis legt app.py als Task bzw. Lead an
+CONVERSATION_FLOWS = {
+    'appointment': Flow('appointment', [
+        ('wish_date', '1️⃣ Wann passt es Ihnen am besten? Bitte nennen Sie Ihren Wunschtermin.'),
+        ('concern', '2️⃣ Worum geht es? (z.B. Smart Home Beratung, barrierefreier Umbau, Support)'),
+        ('contact', '3️⃣ Wie erreichen wir Sie? Bitte Name und E-Mail oder Telefonnummer.'),
+    ], '''✅ *Terminanfrage erhalten*
+
+Vielen Dank! Ein Mitarbeiter bestätigt Ihren Termin umgehend.'''),
+    'quote_request': Flow('quote_request', [
+        ('property', '1️⃣ Um welches Objekt geht es? (Einfamilienhaus, Wohnung, Gewerbe, ...)'),
+        ('scope', '2️⃣ Was soll umgesetzt werden? (z.B. Licht, Heizung, Sprachsteuerung, DIN 18040)'),
+        ('contact', '3️⃣ Wie erreichen wir Sie? Bitte Name und E-Mail oder Telefonnummer.'),
+    ], '''✅ *Angebotsanfrage erhalten*
+
+Vielen Dank! Sie erhalten Ihr Angebot in Kürze von unserem Team.'''),
+}
 
+
+# /webhook: Callback-URL des früheren Node-Bots, damit Meta ohne Umkonfiguration hierher zustellt
 @whatsapp_webhook_bp.route('/api/whatsapp/webhook', methods=['GET'])
+@whatsapp_webhook_bp.route('/webhook', methods=['GET'])
 def verify_webhook():
     """Webhook verification for Meta"""
     mode = request.args.get('hub.mode')
-    token = request.args.get('hub.verify_token')
+    token = request.args.get('hub.verify_token') or ''
     challenge = request.args.get('hub.challenge')
     
-    if mode == 'subscribe' and token == VERIFY_TOKEN:
+    if mode == 'subscribe' and hmac.compare_digest(token.encode(), VERIFY_TOKEN.encode()):
         print(f"✅ Webhook verified!")
         return challenge, 200
     
@@ -131,26 +232,129 @@ def verify_webhook():
 
 
 @whatsapp_webhook_bp.route('/api/whatsapp/webhook', methods=['POST'])
+@whatsapp_webhook_bp.route('/webhook', methods=['POST'])
 def receive_webhook():
-    """Handle incoming WhatsApp messages"""
-    data = request.get_json()
+    """Handle incoming WhatsApp messages
+
+    Nur annehmen und persistieren - Antworten verschickt der Worker-Pool,
+    damit Meta die 200 sofort bekommt und nicht erneut zustellt. Alle
+    Nachrichten aus entry[].changes[].value.messages[] werden gemeinsam
+    eingereiht und danach parallel (pro Absender in Reihenfolge) beantwortet.
+    """
+    # Rohdaten genau einmal lesen: erst die Signatur, dann ein einziges json.loads
+    raw = request.get_data(cache=False)
+    unsigned_ok = ALLOW_UNSIGNED and not APP_SECRET
+    if not unsigned_ok and not valid_signature(raw, request.headers.get('X-Hub-Signature-256', '')):
+        webhook_metrics['rejected_signature'] += 1
+        return jsonify({'status': 'invalid signature'}), 401
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        data = None
     
     if not data:
         return jsonify({'status': 'no data'}), 400
     
-    # Process messages
+    jobs, keys = [], []
+    duplicates = 0
+    statuses_dropped = False
     try:
         for entry in data.get('entry', []):
             for change in entry.get('changes', []):
                 value = change.get('value', {})
+                if change.get('field') == 'message_template_status_update':
+                    template_registry.apply_status_update(value)
+                    continue
                 messages = value.get('messages', [])
                 
                 for message in messages:
-                    process_message(message, value.get('contacts', []))
+                    key = f"msg:{message.get('id')}"
+                    if message.get('id') and not deduplicator.first_seen(key):
+                        duplicates += 1
+                        continue
+                    keys.append(key)
+                    jobs.append((message.get('from'), {'message': message, 'contacts': value.get('contacts', [])}))
+                
+                # Status-Updates (sent/delivered/read) kommen pro Nachricht mehrfach an;
+                # als gesehen gelten sie erst, wenn das Conversation Log sie geschrieben hat
+                for status in value.get('statuses', []):
+                    key = f"status:{status.get('id')}:{status.get('status')}"
+                    if deduplicator.seen(key):
+                        duplicates += 1
+                    elif conversation_log is not None:
+                        if conversation_log.status(status.get('id'), status.get('status'), seen_key=key) is False:
+                            statuses_dropped = True
     except Exception as e:
         print(f"Error processing webhook: {e}")
     
-    return jsonify({'status': 'ok'}), 200
+    if not inbound_queue.enqueue_many(jobs):
+        # Nicht persistiert: Meta soll später erneut zustellen
+        for key in keys:
+            deduplicator.forget(key)
+        return jsonify({'status': 'retry later'}), 503
+    if conversation_log is not None:
+        for sender, job in jobs:
+            message = job['message']
+            conversation_log.inbound(sender, profile_name(job['contacts']), message_text(message),
+                                     message.get('id'), message.get('timestamp'))
+    if statuses_dropped:
+        # Puffer voll: Meta stellt erneut zu, Nachrichten sind dann Duplikate
+        return jsonify({'status': 'retry later'}), 503
+    
+    return jsonify({'status': 'ok', 'queued': len(jobs), 'duplicates': duplicates}), 200
+
+
+def valid_signature(raw, header):
+    """X-Hub-Signature-256 = 'sha256=' + HMAC-SHA256(App-Secret, Rohdaten), zeitkonstant verglichen"""
+    if not APP_SECRET or not header.startswith('sha256='):
+        return False
+    expected = hmac.new(APP_SECRET.encode(), raw, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected.encode(), header[7:].strip().lower().encode())
+
+
+def profile_name(contacts):
+    if contacts:
+        return contacts[0].get('profile', {}).get('name')
+    return None
+
+
+def message_text(message):
+    """Lesbarer Inhalt für das Nachrichtenprotokoll"""
+    msg_type = message.get('type')
+    if msg_type == 'text':
+        return message.get('text', {}).get('body', '')
+    if msg_type == 'interactive':
+        interactive = message.get('interactive', {})
+        reply = interactive.get('button_reply') or interactive.get('list_reply') or {}
+        return reply.get('title') or reply.get('id') or '[interactive]'
+    return f'[{msg_type}]'
+
+
+def handle_queued_message(job):
+    """Worker-Einstieg: ein Job aus der Inbound Queue"""
+    process_message(job['message'], job.get('contacts', []))
+
+
+webhook_metrics = {'rejected_signature': 0}
+inbound_queue = InboundQueue(handle_queued_message)
+deduplicator = MessageDeduplicator()
+outbound = OutboundDispatcher(WHATSAPP_TOKEN)
+
+# Von app.py gesetzt (ConversationLog): schreibt Nachrichten und Zustellstatus in Message
+conversation_log = None
+
+# Gesprächszustand pro Absender; die Inbound Queue stellt pro Absender der Reihe nach zu
+conversation_sessions = ConversationSessions(CONVERSATION_FLOWS)
+
+
+def attach_conversation_log(log):
+    global conversation_log
+    conversation_log = log
+
+
+def attach_flow_recorder(recorder):
+    """recorder(flow, phone, name, fields) - wird beim Abschluss eines Ablaufs aufgerufen"""
+    conversation_sessions.on_complete = recorder
 
 
 def process_message(message, contacts):
@@ -169,16 +373,18 @@ def process_message(message, contacts):
     
     # Handle text messages
     if msg_type == 'text':
-        text = message.get('text', {}).get('body', '').lower().strip()
-        response = get_response(text)
+        text = message.get('text', {}).get('body', '').strip()
+        response = conversation_sessions.handle(from_number, text, msg_id)
+        if response is None:
+            response = get_response(text.lower(), from_number, contact_name, msg_id)
         send_reply(from_number, response)
     
     # Handle interactive (button) responses
     elif msg_type == 'interactive':
         interactive = message.get('interactive', {})
-        if interactive.get('type') == 'button_reply':
-            button_id = interactive.get('button_reply', {}).get('id')
-            response = get_response(button_id)
+        reply = interactive.get('button_reply') or interactive.get('list_reply')
+        if reply:
+            response = get_response(reply.get('id'), from_number, contact_name, msg_id)
             send_reply(from_number, response)
     
     # Handle other message types
@@ -186,56 +392,42 @@ def process_message(message, contacts):
         send_reply(from_number, RESPONSES['default'])
 
 
-def get_response(text):
-    """Get appropriate response for message"""
-    text = text.lower().strip()
-    
-    # Check for exact matches
-    if text in MESSAGE_HANDLERS:
-        handler = MESSAGE_HANDLERS[text]
-        return RESPONSES.get(handler, RESPONSES['default'])
-    
-    # Check for partial matches
-    for keyword, handler in MESSAGE_HANDLERS.items():
-        if keyword in text:
-            return RESPONSES.get(handler, RESPONSES['default'])
-    
-    # Check for human handoff requests
-    if any(word in text for word in ['mensch', 'mitarbeiter', 'agent', 'person']):
-        return RESPONSES['human_handoff']
-    
-    return RESPONSES['default']
+def get_response(text, sender=None, name=None, message_id=None):
+    """Get appropriate response for message; Termin/Angebot starten einen Ablauf"""
+    intent = intent_matcher.match(text or '')
+    if sender and intent in CONVERSATION_FLOWS:
+        return conversation_sessions.start(sender, intent, name, message_id, intro=RESPONSES[intent])
+    return RESPONSES.get(intent, RESPONSES['default'])
+
+
+class ReplyFailed(Exception):
+    """Vorübergehender Fehler beim Senden - der Queue-Worker versucht es erneut"""
 
 
 def send_reply(to_number, message):
-    """Send reply via WhatsApp API"""
-    import requests
-    
+    """Send reply via WhatsApp API (transaktionale Spur des Outbound Dispatchers)"""
     if not WHATSAPP_TOKEN or WHATSAPP_TOKEN.startswith('EAAG...'):
         print(f"⚠️ WhatsApp Token nicht konfiguriert")
         return
     
-    phone_id = os.getenv('WHATSAPP_PHONE_ID', '')
-    url = f'https://graph.facebook.com/v21.0/{phone_id}/messages'
-    
-    headers = {
-        'Authorization': f'Bearer {WHATSAPP_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-    
-    payload = {
-        'messaging_product': 'whatsapp',
-        'recipient_type': 'individual',
-        'to': to_number,
-        'type': 'text',
-        'text': {'body': message}
-    }
-    
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            print(f"✅ Reply sent to {to_number}")
-        else:
-            print(f"❌ Failed to send: {response.text}")
-    except Exception as e:
-        print(f"❌ Error sending message: {e}")
+    result = outbound.send_text(to_number, message)
+    if result['ok']:
+        print(f"✅ Reply sent to {to_number}")
+        if conversation_log is not None:
+            conversation_log.outbound(to_number, message, result['message_id'])
+    elif result['status'] is None or result['status'] == 429 or result['status'] >= 500:
+        raise ReplyFailed(f"Graph API {result['status']}: {result['error']}")
+    else:
+        # 4xx wird durch Wiederholen nicht besser
+        print(f"❌ Failed to send: {result['error']}")
+
+
+def register_whatsapp_webhook(app):
+    """Registriert den Webhook; Worker laufen im App-Kontext"""
+    inbound_queue.app = app
+    if not APP_SECRET and ALLOW_UNSIGNED:
+        print("⚠️ WHATSAPP_ALLOW_UNSIGNED_WEBHOOKS aktiv - Webhook-POSTs werden ohne Signatur angenommen (nur Entwicklung!)")
+    elif not APP_SECRET:
+        print("⚠️ WHATSAPP_APP_SECRET nicht gesetzt - Webhook-POSTs werden mit 401 abgelehnt")
+    app.register_blueprint(whatsapp_webhook_bp)
+    print("✅ WhatsApp Webhook Blueprint registered")